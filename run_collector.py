@@ -166,7 +166,7 @@ def main():
         filename = f"market_data_{timestamp}.json"
         
         # Salva os dados
-        collector.save_to_file(market_data, filename)
+        filename = collector.save_to_file(market_data, filename)
         print(f"\nDados salvos com sucesso em: {filename}")
         
         # Mostra o resumo completo
@@ -3,9 +3,9 @@ import sys
 import schedule
 import time
 import logging
-import glob
-import json
+from collections import deque
 from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
@@ -14,6 +14,13 @@ load_dotenv()
 # Importa os módulos do projeto
 from src.market_data_collector import MarketDataCollector
 from src.utils.email_sender import EmailSender
+from src.utils import json_codec
+from src.utils.snapshot_store import SnapshotStore
+from src.utils.compression import SUFFIXES, CompressedWriter, method_name
+from src.config import (JSON_COMPACT_OUTPUT, SNAPSHOT_STORE_DIR, SNAPSHOT_RETENTION_HOURS,
+                        SNAPSHOT_RETENTION_COUNT, SNAPSHOT_SEGMENT_MINUTES, CONSOLIDATED_SNAPSHOTS,
+                        CONSOLIDATED_INCLUDE_RAW, SNAPSHOT_NORMALIZE_CANDLES, SNAPSHOT_COMPRESSION,
+                        ATTACHMENT_COMPRESSION, COMPRESSION_LEVEL)
 
 # Configuração de logging
 logging.basicConfig(
@@ -27,6 +34,13 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+class RingEntry(NamedTuple):
+    """Snapshot já transformado (e serializado) para o JSON consolidado"""
+    file_timestamp: str
+    collection_time: str
+    body: Dict
+    encoded: bytes
+
 class MarketEmailScheduler:
     def __init__(self):
         self.collector = MarketDataCollector()
@@ -38,6 +52,23 @@ class MarketEmailScheduler:
         if not os.path.exists(self.json_folder):
             os.makedirs(self.json_folder)
             self.logger.info(f"[FOLDER] Pasta criada: {self.json_folder}")
+
+        # Histórico de snapshots: retenção por idade/quantidade feita pelo próprio store
+        self.store = SnapshotStore(
+            SNAPSHOT_STORE_DIR,
+            retention_seconds=SNAPSHOT_RETENTION_HOURS * 3600,
+            retention_count=SNAPSHOT_RETENTION_COUNT,
+            segment_seconds=SNAPSHOT_SEGMENT_MINUTES * 60,
+            normalize_candles=SNAPSHOT_NORMALIZE_CANDLES,
+            compression=SNAPSHOT_COMPRESSION,
+            compression_level=COMPRESSION_LEVEL
+        )
+
+        # Anel dos últimos snapshots transformados (mais recente à esquerda), carregado
+        # do histórico só na inicialização; depois cada ciclo adiciona apenas o novo
+        self.snapshot_ring: deque = deque(maxlen=CONSOLIDATED_SNAPSHOTS)
+        for stored_at, data in reversed(self.store.latest(CONSOLIDATED_SNAPSHOTS)):
+            self.add_snapshot(stored_at, data)
         
     def collect_and_send_email(self):
         """Coleta dados e envia por email"""
@@ -47,26 +78,19 @@ class MarketEmailScheduler:
             # Coleta os dados
             market_data = self.collector.collect_market_data()
             
-            # Gera nome do arquivo com timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"market_data_{timestamp}.json"
-            filepath = os.path.join(self.json_folder, filename)
-            
-            # Salva os dados localmente
-            self.collector.save_to_file(market_data, filepath)
-            self.logger.info(f"[FILE] Dados salvos em: {filepath}")
-            
-            # Limpa arquivos antigos, mantendo apenas os 15 mais recentes
-            self.cleanup_old_files()
+            # Grava o snapshot no histórico local
+            stored_at = self.store.append(market_data)
+            self.logger.info(f"[STORE] Snapshot gravado ({len(self.store)} no histórico; {self.store.last_write.describe()})")
+            self.add_snapshot(stored_at, market_data)
             
             # Gera JSON consolidado com todos os dados
             consolidated_file = self.generate_consolidated_json()
             
-            # Envia por email apenas com o arquivo consolidado
-            success = self.email_sender.send_market_data(market_data, attach_json=False, json_folder=None, consolidated_file=consolidated_file)
+            # Agenda o email (só com o arquivo consolidado); o envio acontece em segundo plano
+            success = self.email_sender.submit_market_data(market_data, attach_json=False, json_folder=None, consolidated_file=consolidated_file)
             
             if success:
-                self.logger.info("[OK] Email enviado com sucesso!")
+                self.logger.info("[OK] Email agendado para envio")
                 # Log resumo
                 price = market_data['current_price']
                 self.logger.info(f"[PRICE] Preço BTC: ${price:,.2f}")
@@ -74,257 +98,269 @@ class MarketEmailScheduler:
                     total_liqs = market_data['liquidations']['total_liqs_24h']
                     self.logger.info(f"[LIQ] Liquidações 24h: ${total_liqs:,.2f}")
             else:
-                self.logger.error("[ERROR] Falha ao enviar email")
+                self.logger.error("[ERROR] Falha ao agendar/enviar email")
                 
         except Exception as e:
             self.logger.error(f"[ERROR] Erro na coleta/envio: {str(e)}")
     
-    def cleanup_old_files(self):
-        """Remove arquivos antigos, mantendo apenas os 15 mais recentes"""
+    def _transform_snapshot(self, stored_at: float, data: Dict) -> Optional[RingEntry]:
+        """Transforma um snapshot para o JSON consolidado (feito uma vez por snapshot)"""
         try:
-            # Busca APENAS os arquivos JSON individuais (exclui consolidados)
-            json_files = glob.glob(os.path.join(self.json_folder, "market_data_2*.json"))  # Só pega os com timestamp
-            
-            # Ordena por data de modificação (mais recente primeiro)
-            json_files.sort(key=os.path.getmtime, reverse=True)
-            
-            # Remove arquivos além dos 15 mais recentes
-            files_to_delete = json_files[15:]  # Mantém apenas os 15 primeiros
-            
-            for file_path in files_to_delete:
-                os.remove(file_path)
-                filename = os.path.basename(file_path)
-                self.logger.info(f"[DEL] Arquivo removido: {filename}")
-                
-            if files_to_delete:
-                self.logger.info(f"[CLEAN] Limpeza concluída. {len(files_to_delete)} arquivo(s) removido(s)")
-            
-            # Log do total de arquivos mantidos
-            remaining_files = len(json_files) - len(files_to_delete)
-            self.logger.info(f"[KEEP] Total de arquivos mantidos: {remaining_files}")
-                
+            body = {
+                "price_data": {
+                    "current_price_usdt": data.get('current_price', 0),
+                    "price_change_24h_percent": data.get('price_change_24h', 0),
+                    "high_24h": data.get('high_24h', 0),
+                    "low_24h": data.get('low_24h', 0)
+                },
+                # NOVO: VWAP em múltiplos timeframes
+                "vwap_analysis": data.get('vwap', {
+                    "1h": 0,
+                    "4h": 0,
+                    "d": 0
+                }),
+                "volume_data": {
+                    "volume_24h_usdt": data.get('stats', {}).get('volume_24h', 0),
+                    "taker_buy_volume_24h": data.get('stats', {}).get('taker_buy_vol_24h', 0),
+                    "taker_sell_volume_24h": data.get('stats', {}).get('taker_sell_vol_24h', 0),
+                    "buy_sell_ratio": data.get('stats', {}).get('taker_buy_vol_24h', 0) / max(data.get('stats', {}).get('taker_sell_vol_24h', 1), 1)
+                },
+                # NOVO: Flow analysis com delta volume
+                "flow_analysis": {
+                    "delta_volume_absolute": data.get('flow', {}).get('delta_volume_absolute', 0),
+                    "delta_volume_cumulative": data.get('flow', {}).get('delta_volume_cumulative', []),
+                    "perp_cvd": data.get('flow', {}).get('perp_cvd', 0),
+                    "spot_cvd": data.get('flow', {}).get('spot_cvd', 0)
+                },
+                "derivatives_data": {
+                    "open_interest_usd": data.get('derivatives', {}).get('open_interest_usd', 0),
+                    "open_interest_btc": data.get('derivatives', {}).get('open_interest_coin', 0),
+                    "oi_change_4h_percent": data.get('derivatives', {}).get('oi_change_4h_pct', 0),
+                    "funding_rate_percent": data.get('derivatives', {}).get('funding_rate', 0) * 100,
+                    "next_funding_time": data.get('derivatives', {}).get('funding_next', ''),
+                    # NOVO: Histórico de funding
+                    "funding_history": data.get('derivatives', {}).get('funding_history', [])
+                },
+                "liquidations_data": {
+                    **data.get('liquidations', {
+                        "long_liquidations_24h": 0,
+                        "short_liquidations_24h": 0,
+                        "total_liquidations_24h": 0
+                    }),
+                    # NOVO: Clusters de liquidação
+                    "liquidations_clusters": data.get('liquidations', {}).get('liquidations_clusters', [])
+                },
+                "order_book_analysis": {
+                    "bid_ask_spread": data.get('order_book', {}).get('spread', 0),
+                    "imbalance_percent": data.get('order_book', {}).get('imbalance_pct', 0),
+                    # NOVO: Imbalance score
+                    "imbalance_score": data.get('order_book', {}).get('imbalance_score', 0),
+                    "market_pressure": "bullish" if data.get('order_book', {}).get('imbalance_score', 0) > 0.3 else "bearish" if data.get('order_book', {}).get('imbalance_score', 0) < -0.3 else "neutral",
+                    "depth_analysis": data.get('order_book', {}).get('depth_pct', {})
+                },
+                # MELHORADO: Indicadores técnicos de múltiplos timeframes
+                "technical_indicators": {
+                    "15m": data.get('timeframes', {}).get('15m', {}).get('indicators', {}),
+                    "1h": data.get('timeframes', {}).get('1h', {}).get('indicators', {}),
+                    "4h": data.get('timeframes', {}).get('4h', {}).get('indicators', {}),
+                    "advanced_1h": data.get('timeframes', {}).get('1h', {}).get('indicators', {}).get('advanced', {})
+                },
+                # NOVO: Volume Profile 4h
+                "volume_profile_4h": data.get('timeframes', {}).get('4h', {}).get('volume_profile_4h', {
+                    "poc": 0,
+                    "vah": 0,
+                    "val": 0
+                }),
+                # NOVO: Flags de absorção (apenas para 15m)
+                "absorption_flags_15m": {
+                    "detected_absorption_candles": len([
+                        c for c in data.get('timeframes', {}).get('15m', {}).get('candles', [])
+                        if isinstance(c, dict) and c.get('absorcao', False)
+                    ]),
+                    "last_5_candles_absorption": [
+                        c.get('absorcao', False) for c in data.get('timeframes', {}).get('15m', {}).get('candles', [])[-5:]
+                        if isinstance(c, dict)
+                    ]
+                }
+            }
+            # Dados originais completos dobram o tamanho do arquivo: só se configurado
+            if CONSOLIDATED_INCLUDE_RAW:
+                body["raw_data_reference"] = {
+                    "note": "Este snapshot contém todos os dados originais da API com novos campos implementados",
+                    # Normalizado: candles fechados ficam uma única vez em candle_tables
+                    "full_data": self.store.normalize(data) if SNAPSHOT_NORMALIZE_CANDLES else data
+                }
+            else:
+                body["raw_data_reference"] = {
+                    "note": f"Dados originais completos no histórico local ({SNAPSHOT_STORE_DIR})"
+                }
+
+            return RingEntry(
+                file_timestamp=datetime.fromtimestamp(stored_at).strftime("%Y%m%d_%H%M%S"),
+                collection_time=data.get('timestamp', ''),
+                body=body,
+                encoded=json_codec.dumpb(body, compact=JSON_COMPACT_OUTPUT)
+            )
         except Exception as e:
-            self.logger.error(f"[ERROR] Erro na limpeza de arquivos: {str(e)}")
-    
+            self.logger.error(f"[ERROR] Erro ao processar snapshot de {datetime.fromtimestamp(stored_at)}: {str(e)}")
+            return None
+
+    def add_snapshot(self, stored_at: float, data: Dict):
+        """Adiciona um snapshot ao anel do JSON consolidado (o mais antigo sai)"""
+        entry = self._transform_snapshot(stored_at, data)
+        if entry is not None:
+            self.snapshot_ring.appendleft(entry)
+
+    def _encode_snapshot(self, entry: RingEntry, sequence_number: int) -> bytes:
+        """Snapshot serializado: snapshot_info (depende da posição) + corpo já serializado"""
+        snapshot_info = {
+            "sequence_number": sequence_number,
+            "file_timestamp": entry.file_timestamp,
+            "collection_time": entry.collection_time,
+            "data_age_minutes": (sequence_number - 1) * 2,
+            "is_most_recent": sequence_number == 1
+        }
+        return b'{"snapshot_info":' + json_codec.dumpb(snapshot_info, compact=JSON_COMPACT_OUTPUT) + b',' + entry.encoded[1:]
+
+    def _candle_tables(self, snapshots: List[RingEntry]) -> Dict[str, List]:
+        """Candles fechados referenciados pelos snapshots, uma vez por intervalo"""
+        spans: Dict[str, List[int]] = {}
+        for entry in snapshots:
+            full_data = entry.body["raw_data_reference"].get("full_data") or {}
+            for data in full_data.get("timeframes", {}).values():
+                reference = data.get("candles_ref")
+                if reference and reference["count"]:
+                    span = spans.setdefault(reference["interval"], [reference["from"], reference["to"]])
+                    span[0] = min(span[0], reference["from"])
+                    span[1] = max(span[1], reference["to"])
+        return {interval: self.store.candles(interval, start, end) for interval, (start, end) in spans.items()}
+
+    def _quick_insights(self, metadata: Dict, snapshots: List[RingEntry]):
+        """Adiciona análise de tendências expandida com novos campos"""
+        if len(snapshots) >= 2:
+            recent_snapshot = snapshots[0].body
+            oldest_snapshot = snapshots[-1].body
+
+            recent_price = recent_snapshot["price_data"]["current_price_usdt"]
+            oldest_price = oldest_snapshot["price_data"]["current_price_usdt"]
+            price_trend = ((recent_price - oldest_price) / oldest_price) * 100 if oldest_price > 0 else 0
+
+            # Análise de delta volume
+            recent_delta = recent_snapshot["flow_analysis"]["delta_volume_absolute"]
+            delta_cumulative = recent_snapshot["flow_analysis"]["delta_volume_cumulative"]
+            delta_trend = "bullish" if recent_delta > 0 else "bearish" if recent_delta < 0 else "neutral"
+
+            # Análise de funding
+            funding_history = recent_snapshot["derivatives_data"]["funding_history"]
+            funding_trend = "increasing" if len(funding_history) >= 2 and funding_history[-1] > funding_history[-2] else "decreasing" if len(funding_history) >= 2 and funding_history[-1] < funding_history[-2] else "stable"
+
+            # Análise de imbalance
+            recent_imbalance = recent_snapshot["order_book_analysis"]["imbalance_score"]
+            imbalance_pressure = recent_snapshot["order_book_analysis"]["market_pressure"]
+
+            # Análise de absorção
+            absorption_count = recent_snapshot["absorption_flags_15m"]["detected_absorption_candles"]
+
+            metadata["quick_insights"] = {
+                "price_analysis": {
+                    "price_trend_percent": round(price_trend, 4),
+                    "trend_direction": "upward" if price_trend > 0 else "downward" if price_trend < 0 else "sideways",
+                    "most_recent_price": recent_price,
+                    "oldest_price_in_dataset": oldest_price
+                },
+                "flow_analysis": {
+                    "current_delta_volume": recent_delta,
+                    "delta_trend": delta_trend,
+                    "cumulative_data_points": len(delta_cumulative)
+                },
+                "market_structure": {
+                    "funding_trend": funding_trend,
+                    "current_funding_rate": funding_history[-1] if funding_history else 0,
+                    "order_book_imbalance_score": recent_imbalance,
+                    "market_pressure": imbalance_pressure
+                },
+                "absorption_activity": {
+                    "total_absorption_candles": absorption_count,
+                    "absorption_detected": absorption_count > 0
+                },
+                "dataset_info": {
+                    "data_timespan_minutes": len(snapshots) * 2,
+                    "vwap_available": bool(recent_snapshot["vwap_analysis"]["1h"]),
+                    "volume_profile_available": bool(recent_snapshot["volume_profile_4h"]["poc"])
+                }
+            }
+
     def generate_consolidated_json(self):
-        """Gera JSON consolidado otimizado para análise de IA"""
+        """
+        Gera JSON consolidado otimizado para análise de IA a partir do anel de
+        snapshots em memória: nada é relido do disco e cada snapshot já está
+        serializado, então o custo por ciclo é só o de escrever o arquivo.
+        """
         try:
-            # Remove arquivo consolidado antigo se existir
-            old_consolidated = os.path.join(self.json_folder, "market_data_consolidated_for_ai.json")
-            if os.path.exists(old_consolidated):
-                os.remove(old_consolidated)
-                self.logger.info("[DEL] Arquivo consolidado antigo removido")
-            
-            # Busca APENAS os arquivos JSON individuais (exclui consolidados)
-            json_files = glob.glob(os.path.join(self.json_folder, "market_data_2*.json"))  # Só pega os com timestamp
-            
-            # Ordena por data de modificação (mais recente primeiro)
-            json_files.sort(key=os.path.getmtime, reverse=True)
-            
-            # Pega apenas os 15 mais recentes
-            json_files = json_files[:15]
-            
+            # Snapshots do anel (mais recente primeiro)
+            snapshots = list(self.snapshot_ring)
+
             # Estrutura otimizada para IA com novos campos
-            consolidated_data = {
-                "ai_analysis_metadata": {
-                    "description": "Dados históricos de Bitcoin para análise técnica profissional",
-                    "data_source": "Binance Futures API",
-                    "consolidated_at": datetime.now().isoformat(),
-                    "total_snapshots": len(json_files),
-                    "time_interval_minutes": 2,
-                    "data_points_explanation": "Cada snapshot representa uma coleta completa de dados de mercado com indicadores avançados",
-                    "new_features": [
-                        "VWAP em múltiplos timeframes (1h, 4h, diário)",
-                        "Delta Volume absoluto e cumulativo para análise de fluxo",
-                        "Imbalance Score baseado na posição no spread",
-                        "Histórico de Funding Rate (últimos 3 valores)",
-                        "Flags de Absorção em velas de 15m",
-                        "Volume Profile 4h com POC, VAH, VAL",
-                        "Clusters de liquidação estimados",
-                        "Indicadores técnicos avançados"
-                    ],
-                    "analysis_suggestions": [
-                        "Compare VWAP entre timeframes para identificar tendências",
-                        "Use delta volume cumulativo para detectar divergências",
-                        "Monitore imbalance_score para timing de entrada/saída",
-                        "Observe flags de absorção para identificar reversões",
-                        "Analise volume profile para suporte/resistência dinâmicos",
-                        "Use funding_history para identificar extremos de sentiment",
-                        "Correlacione clusters de liquidação com movimentos de preço"
-                    ]
-                },
-                "market_snapshots": []
+            metadata = {
+                "description": "Dados históricos de Bitcoin para análise técnica profissional",
+                "data_source": "Binance Futures API",
+                "consolidated_at": datetime.now().isoformat(),
+                "total_snapshots": len(snapshots),
+                "time_interval_minutes": 2,
+                "data_points_explanation": "Cada snapshot representa uma coleta completa de dados de mercado com indicadores avançados",
+                "new_features": [
+                    "VWAP em múltiplos timeframes (1h, 4h, diário)",
+                    "Delta Volume absoluto e cumulativo para análise de fluxo",
+                    "Imbalance Score baseado na posição no spread",
+                    "Histórico de Funding Rate (últimos 3 valores)",
+                    "Flags de Absorção em velas de 15m",
+                    "Volume Profile 4h com POC, VAH, VAL",
+                    "Clusters de liquidação estimados",
+                    "Indicadores técnicos avançados"
+                ],
+                "analysis_suggestions": [
+                    "Compare VWAP entre timeframes para identificar tendências",
+                    "Use delta volume cumulativo para detectar divergências",
+                    "Monitore imbalance_score para timing de entrada/saída",
+                    "Observe flags de absorção para identificar reversões",
+                    "Analise volume profile para suporte/resistência dinâmicos",
+                    "Use funding_history para identificar extremos de sentiment",
+                    "Correlacione clusters de liquidação com movimentos de preço"
+                ]
             }
-            
-            # Carrega e organiza dados de cada arquivo
-            snapshot_counter = 1
-            for file_path in json_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    # Extrai timestamp do nome do arquivo
-                    file_timestamp = os.path.basename(file_path).replace('market_data_', '').replace('.json', '')
-                    
-                    # Estrutura cada snapshot de forma clara com novos campos
-                    snapshot = {
-                        "snapshot_info": {
-                            "sequence_number": snapshot_counter,
-                            "file_timestamp": file_timestamp,
-                            "collection_time": data.get('timestamp', ''),
-                            "data_age_minutes": (snapshot_counter - 1) * 2,
-                            "is_most_recent": snapshot_counter == 1
-                        },
-                        "price_data": {
-                            "current_price_usdt": data.get('current_price', 0),
-                            "price_change_24h_percent": data.get('price_change_24h', 0),
-                            "high_24h": data.get('high_24h', 0),
-                            "low_24h": data.get('low_24h', 0)
-                        },
-                        # NOVO: VWAP em múltiplos timeframes
-                        "vwap_analysis": data.get('vwap', {
-                            "1h": 0,
-                            "4h": 0,
-                            "d": 0
-                        }),
-                        "volume_data": {
-                            "volume_24h_usdt": data.get('stats', {}).get('volume_24h', 0),
-                            "taker_buy_volume_24h": data.get('stats', {}).get('taker_buy_vol_24h', 0),
-                            "taker_sell_volume_24h": data.get('stats', {}).get('taker_sell_vol_24h', 0),
-                            "buy_sell_ratio": data.get('stats', {}).get('taker_buy_vol_24h', 0) / max(data.get('stats', {}).get('taker_sell_vol_24h', 1), 1)
-                        },
-                        # NOVO: Flow analysis com delta volume
-                        "flow_analysis": {
-                            "delta_volume_absolute": data.get('flow', {}).get('delta_volume_absolute', 0),
-                            "delta_volume_cumulative": data.get('flow', {}).get('delta_volume_cumulative', []),
-                            "perp_cvd": data.get('flow', {}).get('perp_cvd', 0),
-                            "spot_cvd": data.get('flow', {}).get('spot_cvd', 0)
-                        },
-                        "derivatives_data": {
-                            "open_interest_usd": data.get('derivatives', {}).get('open_interest_usd', 0),
-                            "open_interest_btc": data.get('derivatives', {}).get('open_interest_coin', 0),
-                            "oi_change_4h_percent": data.get('derivatives', {}).get('oi_change_4h_pct', 0),
-                            "funding_rate_percent": data.get('derivatives', {}).get('funding_rate', 0) * 100,
-                            "next_funding_time": data.get('derivatives', {}).get('funding_next', ''),
-                            # NOVO: Histórico de funding
-                            "funding_history": data.get('derivatives', {}).get('funding_history', [])
-                        },
-                        "liquidations_data": {
-                            **data.get('liquidations', {
-                                "long_liquidations_24h": 0,
-                                "short_liquidations_24h": 0,
-                                "total_liquidations_24h": 0
-                            }),
-                            # NOVO: Clusters de liquidação
-                            "liquidations_clusters": data.get('liquidations', {}).get('liquidations_clusters', [])
-                        },
-                        "order_book_analysis": {
-                            "bid_ask_spread": data.get('order_book', {}).get('spread', 0),
-                            "imbalance_percent": data.get('order_book', {}).get('imbalance_pct', 0),
-                            # NOVO: Imbalance score
-                            "imbalance_score": data.get('order_book', {}).get('imbalance_score', 0),
-                            "market_pressure": "bullish" if data.get('order_book', {}).get('imbalance_score', 0) > 0.3 else "bearish" if data.get('order_book', {}).get('imbalance_score', 0) < -0.3 else "neutral",
-                            "depth_analysis": data.get('order_book', {}).get('depth_pct', {})
-                        },
-                        # MELHORADO: Indicadores técnicos de múltiplos timeframes
-                        "technical_indicators": {
-                            "15m": data.get('timeframes', {}).get('15m', {}).get('indicators', {}),
-                            "1h": data.get('timeframes', {}).get('1h', {}).get('indicators', {}),
-                            "4h": data.get('timeframes', {}).get('4h', {}).get('indicators', {}),
-                            "advanced_1h": data.get('timeframes', {}).get('1h', {}).get('indicators', {}).get('advanced', {})
-                        },
-                        # NOVO: Volume Profile 4h
-                        "volume_profile_4h": data.get('timeframes', {}).get('4h', {}).get('volume_profile_4h', {
-                            "poc": 0,
-                            "vah": 0,
-                            "val": 0
-                        }),
-                        # NOVO: Flags de absorção (apenas para 15m)
-                        "absorption_flags_15m": {
-                            "detected_absorption_candles": len([
-                                c for c in data.get('timeframes', {}).get('15m', {}).get('candles', [])
-                                if isinstance(c, dict) and c.get('absorcao', False)
-                            ]),
-                            "last_5_candles_absorption": [
-                                c.get('absorcao', False) for c in data.get('timeframes', {}).get('15m', {}).get('candles', [])[-5:]
-                                if isinstance(c, dict)
-                            ]
-                        },
-                        "raw_data_reference": {
-                            "note": "Este snapshot contém todos os dados originais da API com novos campos implementados",
-                            "full_data": data
-                        }
-                    }
-                    
-                    consolidated_data["market_snapshots"].append(snapshot)
-                    snapshot_counter += 1
-                    
-                except Exception as e:
-                    self.logger.error(f"[ERROR] Erro ao processar arquivo {file_path}: {str(e)}")
-                    continue
-            
-            # Adiciona análise de tendências expandida com novos campos
-            if len(consolidated_data["market_snapshots"]) >= 2:
-                recent_snapshot = consolidated_data["market_snapshots"][0]
-                oldest_snapshot = consolidated_data["market_snapshots"][-1]
-                
-                recent_price = recent_snapshot["price_data"]["current_price_usdt"]
-                oldest_price = oldest_snapshot["price_data"]["current_price_usdt"]
-                price_trend = ((recent_price - oldest_price) / oldest_price) * 100 if oldest_price > 0 else 0
-                
-                # Análise de delta volume
-                recent_delta = recent_snapshot["flow_analysis"]["delta_volume_absolute"]
-                delta_cumulative = recent_snapshot["flow_analysis"]["delta_volume_cumulative"]
-                delta_trend = "bullish" if recent_delta > 0 else "bearish" if recent_delta < 0 else "neutral"
-                
-                # Análise de funding
-                funding_history = recent_snapshot["derivatives_data"]["funding_history"]
-                funding_trend = "increasing" if len(funding_history) >= 2 and funding_history[-1] > funding_history[-2] else "decreasing" if len(funding_history) >= 2 and funding_history[-1] < funding_history[-2] else "stable"
-                
-                # Análise de imbalance
-                recent_imbalance = recent_snapshot["order_book_analysis"]["imbalance_score"]
-                imbalance_pressure = recent_snapshot["order_book_analysis"]["market_pressure"]
-                
-                # Análise de absorção
-                absorption_count = recent_snapshot["absorption_flags_15m"]["detected_absorption_candles"]
-                
-                consolidated_data["ai_analysis_metadata"]["quick_insights"] = {
-                    "price_analysis": {
-                        "price_trend_percent": round(price_trend, 4),
-                        "trend_direction": "upward" if price_trend > 0 else "downward" if price_trend < 0 else "sideways",
-                        "most_recent_price": recent_price,
-                        "oldest_price_in_dataset": oldest_price
-                    },
-                    "flow_analysis": {
-                        "current_delta_volume": recent_delta,
-                        "delta_trend": delta_trend,
-                        "cumulative_data_points": len(delta_cumulative)
-                    },
-                    "market_structure": {
-                        "funding_trend": funding_trend,
-                        "current_funding_rate": funding_history[-1] if funding_history else 0,
-                        "order_book_imbalance_score": recent_imbalance,
-                        "market_pressure": imbalance_pressure
-                    },
-                    "absorption_activity": {
-                        "total_absorption_candles": absorption_count,
-                        "absorption_detected": absorption_count > 0
-                    },
-                    "dataset_info": {
-                        "data_timespan_minutes": len(consolidated_data["market_snapshots"]) * 2,
-                        "vwap_available": bool(recent_snapshot["vwap_analysis"]["1h"]),
-                        "volume_profile_available": bool(recent_snapshot["volume_profile_4h"]["poc"])
-                    }
-                }
-            
-            # Salva o arquivo consolidado
-            consolidated_filename = "market_data_consolidated_for_ai.json"
+            self._quick_insights(metadata, snapshots)
+
+            candle_tables = self._candle_tables(snapshots) if CONSOLIDATED_INCLUDE_RAW else {}
+            if candle_tables:
+                metadata["candle_storage"] = (
+                    "Em full_data, timeframes[tf].candles_ref referencia os candles fechados de "
+                    "candle_tables[interval] com abertura entre from e to; tail é o candle em formação "
+                    "e absorcao traz as flags de cada vela (15m)"
+                )
+
+            # Escreve o documento em partes (comprimidas em streaming com ATTACHMENT_COMPRESSION)
+            # em um arquivo temporário e substitui o anterior
+            method = method_name(ATTACHMENT_COMPRESSION)
+            consolidated_filename = "market_data_consolidated_for_ai.json" + (SUFFIXES[method] if method else "")
             consolidated_path = os.path.join(self.json_folder, consolidated_filename)
+            tmp_path = f"{consolidated_path}.tmp"
+            with CompressedWriter(tmp_path, method, COMPRESSION_LEVEL) as f:
+                f.write(b'{"ai_analysis_metadata":')
+                f.write(json_codec.dumpb(metadata, compact=JSON_COMPACT_OUTPUT))
+                f.write(b',"market_snapshots":[')
+                for sequence_number, entry in enumerate(snapshots, 1):
+                    if sequence_number > 1:
+                        f.write(b',')
+                    f.write(self._encode_snapshot(entry, sequence_number))
+                f.write(b']')
+                if candle_tables:
+                    f.write(b',"candle_tables":')
+                    f.write(json_codec.dumpb(candle_tables, compact=JSON_COMPACT_OUTPUT))
+                f.write(b'}')
+            os.replace(tmp_path, consolidated_path)
             
-            with open(consolidated_path, 'w', encoding='utf-8') as f:
-                json.dump(consolidated_data, f, indent=2, ensure_ascii=False)
-            
-            self.logger.info(f"[AI] JSON para IA gerado: {consolidated_filename} ({len(json_files)} snapshots)")
+            self.logger.info(f"[AI] JSON para IA gerado: {consolidated_filename} "
+                             f"({len(snapshots)} snapshots; {f.stats.describe()})")
             return consolidated_path
             
         except Exception as e:
@@ -370,6 +406,8 @@ class MarketEmailScheduler:
             self.logger.info("\n=== Scheduler interrompido pelo usuário ===")
         except Exception as e:
             self.logger.error(f"Erro no scheduler: {str(e)}")
+        finally:
+            self.email_sender.close()
 
 def main():
     """Função principal"""
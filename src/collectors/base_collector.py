@@ -1,32 +1,112 @@
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional
 import logging
-from ..config import MAX_RETRIES, INITIAL_BACKOFF, MAX_BACKOFF
+from .response_cache import ResponseCache
+from .rate_limiter import WeightRateLimiter, get_shared_limiter, endpoint_weight
+from ..config import (MAX_RETRIES, INITIAL_BACKOFF, MAX_BACKOFF, RESPONSE_CACHE_TTLS,
+                      FUTURES_WEIGHT_LIMIT, HTTP_POOL_SIZE)
 
 class BaseCollector:
-    def __init__(self, base_url: str):
+    # Endpoint leve usado para abrir conexões no aquecimento
+    ping_endpoint: Optional[str] = None
+
+    def __init__(self, base_url: str, cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[WeightRateLimiter] = None, weight_limit: int = FUTURES_WEIGHT_LIMIT,
+                 session: Optional[requests.Session] = None):
         self.base_url = base_url
-        self.session = requests.Session()
+        # Sessão (pool de conexões) pode ser compartilhada entre coletores do mesmo host
+        self.session = session if session is not None else self._create_session()
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.cache = cache if cache is not None else ResponseCache(RESPONSE_CACHE_TTLS)
+        # Limitador de peso compartilhado por todos os coletores do mesmo host
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_shared_limiter(base_url, weight_limit)
+
+    @staticmethod
+    def _create_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+        """Cria sessão HTTP keep-alive com pool dimensionado para a coleta concorrente"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def warm_up(self, connections: int = 1) -> bool:
+        """Abre conexões (TCP+TLS) antecipadamente para que a primeira coleta já as reutilize"""
+        if not self.ping_endpoint:
+            return False
+
+        errors = []
+
+        def ping():
+            try:
+                self.rate_limiter.acquire(endpoint_weight(self.ping_endpoint))
+                response = self.session.get(f"{self.base_url}{self.ping_endpoint}", timeout=10)
+                self.rate_limiter.update_from_headers(response.headers)
+                response.raise_for_status()
+            except Exception as e:
+                errors.append(e)
+
+        # Pings simultâneos forçam o pool a abrir conexões distintas
+        threads = [threading.Thread(target=ping, daemon=True) for _ in range(max(1, connections))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=15)
 
-    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict:
+        if errors:
+            self.logger.warning(f"Aquecimento de conexões falhou: {errors[0]}")
+            return False
+        self.logger.info(f"{len(threads)} conexão(ões) aquecida(s) com {self.base_url}")
+        return True
+
+    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> Dict:
+        """
+        Faz uma requisição HTTP passando pelo cache de respostas.
+        Requisições idênticas simultâneas compartilham um único fetch.
         """
-        Faz uma requisição HTTP com retry exponencial em caso de rate limit
+        if not use_cache:
+            return self._request_with_retry(endpoint, params)
+        return self.cache.get_or_fetch(
+            endpoint, params,
+            lambda: self._request_with_retry(endpoint, params)
+        )
+
+    def _retry_after(self, response: requests.Response, default: float) -> float:
+        """Lê o header Retry-After (segundos) da resposta"""
+        try:
+            return float(response.headers.get('Retry-After', default))
+        except ValueError:
+            return default
+
+    def _request_with_retry(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict:
         """
+        Faz uma requisição HTTP respeitando o orçamento de peso da Binance,
+        com retry exponencial em caso de erro e Retry-After em caso de rate limit
+        """
+        weight = endpoint_weight(endpoint, params)
         backoff = INITIAL_BACKOFF
         for attempt in range(MAX_RETRIES):
             try:
+                self.rate_limiter.acquire(weight)
                 response = self.session.get(
                     f"{self.base_url}{endpoint}",
                     params=params,
                     timeout=30
                 )
+                self.rate_limiter.update_from_headers(response.headers)
                 
+                if response.status_code == 418:  # IP banido: não insiste até o fim do ban
+                    self.rate_limiter.block(self._retry_after(response, MAX_BACKOFF))
+                    self.logger.error("IP banido temporariamente pela Binance (418)")
+                    response.raise_for_status()
+
                 if response.status_code == 429:  # Rate limit
+                    self.rate_limiter.block(self._retry_after(response, backoff))
                     if attempt < MAX_RETRIES - 1:
                         self.logger.warning(f"Rate limit atingido. Tentativa {attempt + 1}/{MAX_RETRIES}")
-                        time.sleep(backoff)
                         backoff = min(backoff * 2, MAX_BACKOFF)
                         continue
                 
@@ -34,14 +114,19 @@ class BaseCollector:
                 return response.json()
                 
             except requests.exceptions.RequestException as e:
-                if attempt == MAX_RETRIES - 1:
-                    self.logger.error(f"Erro na requisição após {MAX_RETRIES} tentativas: {str(e)}")
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if attempt == MAX_RETRIES - 1 or status == 418:
+                    self.logger.error(f"Erro na requisição após {attempt + 1} tentativa(s): {str(e)}")
                     raise
                 time.sleep(backoff)
                 backoff = min(backoff * 2, MAX_BACKOFF)
         
         raise Exception("Número máximo de tentativas excedido")
 
+    def get_rate_limit_usage(self) -> Dict[str, Any]:
+        """Retorna o uso atual do orçamento de peso de requisições"""
+        return self.rate_limiter.get_usage()
+
     def get_current_price(self) -> float:
         """Método base para obter preço atual"""
         raise NotImplementedError
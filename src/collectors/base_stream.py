@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Any
+import logging
+import websocket
+from ..utils import json_codec
+
+class BaseWebSocketStream:
+    """
+    Base para consumidores de streams WebSocket da Binance.
+
+    Mantém a conexão em uma thread daemon com reconexão automática; as
+    subclasses definem a URL (_get_url) e tratam cada mensagem já
+    decodificada em _handle_message.
+    """
+    reconnect_delay = 5
+
+    def __init__(self, name: str):
+        self.name = name
+        self.logger = logging.getLogger(f"{self.__class__.__name__}[{name}]")
+
+        # WebSocket
+        self.ws = None
+        self.is_running = False
+        self.thread = None
+
+        # Lock para thread safety
+        self.lock = threading.Lock()
+
+    def _get_url(self) -> str:
+        """URL do stream"""
+        raise NotImplementedError
+
+    def _handle_message(self, data: Any):
+        """Processa uma mensagem decodificada"""
+        raise NotImplementedError
+
+    def start_stream(self):
+        """Inicia o stream"""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run_websocket, daemon=True, name=f"ws-{self.name}")
+        self.thread.start()
+        self.logger.info("Stream iniciado")
+
+    def stop_stream(self):
+        """Para o stream"""
+        self.is_running = False
+        if self.ws:
+            self.ws.close()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.logger.info("Stream parado")
+
+    def _run_websocket(self):
+        """Executa o WebSocket em thread separada"""
+        websocket.enableTrace(False)
+
+        # Reconecta automaticamente se desconectar
+        while self.is_running:
+            try:
+                self.ws = websocket.WebSocketApp(
+                    self._get_url(),
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close,
+                    on_open=self._on_open
+                )
+                self.ws.run_forever()
+            except Exception as e:
+                self.logger.error(f"Erro no WebSocket: {e}")
+            if self.is_running:
+                self.logger.warning(f"WebSocket desconectado, reconectando em {self.reconnect_delay}s...")
+                time.sleep(self.reconnect_delay)
+
+    def _on_open(self, ws):
+        """Callback quando WebSocket conecta"""
+        self.logger.info("WebSocket conectado")
+
+    def _on_close(self, ws, close_status_code=None, close_msg=None):
+        """Callback quando WebSocket é fechado"""
+        self.logger.info(f"WebSocket fechado ({close_status_code})")
+
+    def _on_error(self, ws, error):
+        """Callback para erros do WebSocket"""
+        self.logger.error(f"Erro no WebSocket: {error}")
+
+    def _on_message(self, ws, message):
+        """Decodifica a mensagem e repassa para a subclasse"""
+        try:
+            self._handle_message(json_codec.loads(message))
+        except Exception as e:
+            self.logger.error(f"Erro ao processar mensagem: {e}")
+
+    def is_connected(self) -> bool:
+        """Verifica se o WebSocket está conectado"""
+        try:
+            return bool(self.is_running and
+                        self.ws and
+                        self.ws.sock and
+                        self.ws.sock.connected)
+        except Exception:
+            return False
+
+    def wait_for_connection(self, timeout: float = 10) -> bool:
+        """Aguarda conexão por até timeout segundos"""
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            if self.is_connected():
+                return True
+            time.sleep(0.1)
+        return False
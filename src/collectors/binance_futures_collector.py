@@ -1,63 +1,172 @@
-from typing import Dict, List, Any, Optional
-import pandas as pd
-from datetime import datetime, timezone, timedelta
+import time
+from typing import Dict, List, Optional
+import requests
+from datetime import datetime, timezone
 from .base_collector import BaseCollector
+from .base_stream import BaseWebSocketStream
+from .response_cache import ResponseCache
+from .binance_spot_collector import BinanceSpotCollector
 from .websocket_liquidations import WebSocketLiquidationsCollector
-from ..config import SYMBOL, ORDER_BOOK_LIMIT, DEPTH_LEVELS
+from .websocket_order_book import WebSocketOrderBook
+from .kline_cache import KlineCache
+from .depth_curve import DepthCurve
+from .websocket_klines import WebSocketKlinesCollector
+from .websocket_trades import WebSocketTradesCollector
+from ..utils.candle_array import CandleArray
+from ..utils.order_book_recorder import OrderBookRecorder
+from ..config import (SYMBOL, ORDER_BOOK_LIMIT, DEPTH_LEVELS, DEPTH_LADDER_BPS, BINANCE_FUTURES_URL,
+                      HTTP_WARMUP_CONNECTIONS, ORDER_BOOK_STREAM_ENABLED, ORDER_BOOK_SNAPSHOT_LIMIT, ORDER_BOOK_REST_LIMIT,
+                      KLINE_CACHE_ENABLED, KLINE_INCREMENTAL_LIMIT, KLINE_STREAM_ENABLED, TIMEFRAMES,
+                      TRADE_STREAM_ENABLED, CVD_WINDOWS, CVD_PRIMARY_WINDOW, ORDER_BOOK_RECORDER_ENABLED,
+                      ORDER_BOOK_RECORDER_DIR, ORDER_BOOK_KEYFRAME_SECONDS, ORDER_BOOK_SEGMENT_MINUTES,
+                      ORDER_BOOK_RETENTION_HOURS)
 
 class BinanceFuturesCollector(BaseCollector):
-    def __init__(self):
-        super().__init__('https://fapi.binance.com')
-        self.symbol = SYMBOL
+    ping_endpoint = '/fapi/v1/ping'
+
+    def __init__(self, symbol: str = SYMBOL, session: Optional[requests.Session] = None,
+                 spot_session: Optional[requests.Session] = None, cache: Optional[ResponseCache] = None,
+                 ws_liquidations: Optional[WebSocketLiquidationsCollector] = None,
+                 ws_perp_trades: Optional[WebSocketTradesCollector] = None,
+                 ws_spot_trades: Optional[WebSocketTradesCollector] = None,
+                 warm_up_connections: int = HTTP_WARMUP_CONNECTIONS):
+        """
+        Sessões, cache e streams podem ser injetados para que vários símbolos
+        compartilhem conexões (ver MultiSymbolCollector). Streams injetados
+        pertencem a quem os criou e não são iniciados nem parados aqui.
+        """
+        super().__init__(BINANCE_FUTURES_URL, cache=cache, session=session)
+        self.symbol = symbol.upper()
+        # Streams criados (e parados) por esta instância
+        self._owned_streams = []
+
+        # Coletor spot (CVD spot); pool próprio se nenhuma sessão for informada
+        self.spot_collector = BinanceSpotCollector(self.symbol, cache=cache, session=spot_session)
         
         # Inicializa WebSocket de liquidações
-        self.ws_liquidations = WebSocketLiquidationsCollector(self.symbol)
-        self.ws_liquidations.start_stream()
+        if ws_liquidations is None:
+            ws_liquidations = self._start_owned(WebSocketLiquidationsCollector(self.symbol))
+        self.ws_liquidations = ws_liquidations
+
+        # Cache incremental de candles por intervalo (também usado pelos streams de kline)
+        self.kline_cache = KlineCache() if KLINE_CACHE_ENABLED or KLINE_STREAM_ENABLED else None
+
+        # Streams de candles mantêm as janelas do cache atualizadas
+        self.ws_klines = None
+        if KLINE_STREAM_ENABLED:
+            self.ws_klines = self._start_owned(
+                WebSocketKlinesCollector(self.symbol, TIMEFRAMES.values(), self.kline_cache))
+
+        # Livro de ordens local mantido pelo stream de diffs
+        self.ws_order_book = None
+        if ORDER_BOOK_STREAM_ENABLED:
+            self.ws_order_book = self._start_owned(
+                WebSocketOrderBook(self.symbol, self._get_order_book_snapshot))
+
+        # Histórico do livro (keyframes + deltas) para pesquisa e replay
+        self.order_book_recorder = None
+        if ORDER_BOOK_RECORDER_ENABLED:
+            self.order_book_recorder = OrderBookRecorder(
+                ORDER_BOOK_RECORDER_DIR.format(symbol=self.symbol.lower()),
+                keyframe_seconds=ORDER_BOOK_KEYFRAME_SECONDS,
+                segment_seconds=ORDER_BOOK_SEGMENT_MINUTES * 60,
+                retention_seconds=ORDER_BOOK_RETENTION_HOURS * 3600
+            )
+
+        # Streams de trades agregados para CVD contínuo (perp e spot)
+        self.ws_perp_trades = ws_perp_trades
+        self.ws_spot_trades = ws_spot_trades
+        if TRADE_STREAM_ENABLED:
+            if self.ws_perp_trades is None:
+                self.ws_perp_trades = self._start_owned(WebSocketTradesCollector(self.symbol, 'futures'))
+            if self.ws_spot_trades is None:
+                self.ws_spot_trades = self._start_owned(WebSocketTradesCollector(self.symbol, 'spot'))
+
+        # Abre as conexões antes da primeira coleta
+        if warm_up_connections > 0:
+            self.warm_up(warm_up_connections)
+            self.spot_collector.warm_up()
+
+    def _start_owned(self, stream: BaseWebSocketStream) -> BaseWebSocketStream:
+        """Inicia um stream próprio desta instância"""
+        stream.start_stream()
+        self._owned_streams.append(stream)
+        return stream
 
     def get_current_price(self) -> float:
         """Obtém o preço atual (mark price)"""
         data = self._make_request('/fapi/v1/premiumIndex', {'symbol': self.symbol})
         return float(data['markPrice'])
 
+    def _get_order_book_snapshot(self) -> Dict:
+        """Snapshot REST usado para sincronizar o livro local"""
+        return self._make_request('/fapi/v1/depth', {
+            'symbol': self.symbol,
+            'limit': ORDER_BOOK_SNAPSHOT_LIMIT
+        }, use_cache=False)
+
     def get_order_book(self) -> Dict:
         """Obtém o livro de ordens e calcula profundidade"""
-        # Obtém mais níveis para calcular depth até ±2%
-        data = self._make_request('/fapi/v1/depth', {
-            'symbol': self.symbol,
-            'limit': 500  # Aumentar para 500 níveis
-        })
+        curve = None
+        # Livro local (stream de diffs) quando sincronizado: leitura em memória
+        if self.ws_order_book is not None and self.ws_order_book.is_synced():
+            curve = self.ws_order_book.get_depth_curve(self._max_depth_pct(), ORDER_BOOK_LIMIT)
+
+        if curve is None:
+            # Fallback: snapshot REST com níveis suficientes para calcular depth até ±2%
+            data = self._make_request('/fapi/v1/depth', {
+                'symbol': self.symbol,
+                'limit': ORDER_BOOK_REST_LIMIT
+            })
+            # Strings da API convertidas uma única vez para arrays
+            curve = DepthCurve(data['bids'], data['asks'])
 
+        self._record_order_book(curve)
+        return self._build_order_book(curve)
+
+    def _record_order_book(self, curve: DepthCurve):
+        """Grava o livro no histórico (falhas de gravação não interrompem a coleta)"""
+        if self.order_book_recorder is None:
+            return
+        try:
+            self.order_book_recorder.record(time.time(), curve.bid_prices, curve.bid_qtys,
+                                            curve.ask_prices, curve.ask_qtys)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar histórico do livro: {e}")
+
+    @staticmethod
+    def _max_depth_pct() -> float:
+        """Maior distância do preço (%) usada em depth_pct e na escada de profundidade"""
+        return max(max(DEPTH_LEVELS), max(DEPTH_LADDER_BPS) / 100)
+
+    def _build_order_book(self, curve: DepthCurve) -> Dict:
+        """Monta top do book, profundidade percentual, escada de profundidade e imbalance"""
         # Processa o top do book (mantém apenas 20 para exibição)
+        top_bids, top_asks = curve.top(ORDER_BOOK_LIMIT)
         order_book = {
             'top': {
-                'bids': [[float(price), float(qty)] for price, qty in data['bids'][:ORDER_BOOK_LIMIT]],
-                'asks': [[float(price), float(qty)] for price, qty in data['asks'][:ORDER_BOOK_LIMIT]]
+                'bids': top_bids,
+                'asks': top_asks
             }
         }
 
-        # Calcula profundidade percentual usando todos os níveis disponíveis
-        current_price = float(data['bids'][0][0])  # Preço do melhor bid
-        depth_pct = {'bids': {}, 'asks': {}}
+        # Profundidade percentual (quantidade em base) com o melhor bid como referência
+        depth = curve.depth(DEPTH_LEVELS)
+        depth_pct = {
+            side: dict(zip(map(str, DEPTH_LEVELS), depth[side]['base'].tolist()))
+            for side in ('bids', 'asks')
+        }
 
-        for pct in DEPTH_LEVELS:
-            # Calcula limites de preço para este percentual específico
-            bid_limit = current_price * (1 - pct / 100)  # Limite inferior para bids
-            ask_limit = current_price * (1 + pct / 100)  # Limite superior para asks
-            
-            # Calcula volume acumulado para bids (preços >= bid_limit)
-            bid_volume = sum(
-                float(qty) for price, qty in data['bids']
-                if float(price) >= bid_limit
-            )
-            
-            # Calcula volume acumulado para asks (preços <= ask_limit)
-            ask_volume = sum(
-                float(qty) for price, qty in data['asks']
-                if float(price) <= ask_limit
-            )
-            
-            depth_pct['bids'][str(pct)] = bid_volume
-            depth_pct['asks'][str(pct)] = ask_volume
+        # Escada de profundidade em bps, em base e em USD
+        ladder = curve.depth_bps(DEPTH_LADDER_BPS)
+        depth_ladder = {
+            side: {
+                str(bps): {'base': base, 'usd': usd}
+                for bps, base, usd in zip(DEPTH_LADDER_BPS, ladder[side]['base'].tolist(),
+                                          ladder[side]['usd'].tolist())
+            }
+            for side in ('bids', 'asks')
+        }
 
         # Calcula imbalance do order book (usando 1% de profundidade)
         total_bids_1pct = depth_pct['bids']['1.0']
@@ -70,28 +179,51 @@ class BinanceFuturesCollector(BaseCollector):
             imbalance_pct = 0
 
         order_book['depth_pct'] = depth_pct
+        order_book['depth_ladder'] = depth_ladder
         order_book['imbalance_pct'] = imbalance_pct
         return order_book
 
-    def get_klines(self, interval: str, limit: int = 50) -> List[List]:
-        """Obtém candles OHLCV"""
-        data = self._make_request('/fapi/v1/klines', {
+    def get_klines(self, interval: str, limit: int = 50) -> CandleArray:
+        """Obtém candles OHLCV (colunas NumPy; candles[i] = [open, high, low, close, volume, timestamp])"""
+        if self.kline_cache is None:
+            return self._fetch_klines(interval, limit)
+
+        cached_size = self.kline_cache.size(self.symbol, interval)
+
+        # Janela mantida pelo stream: leitura direta da memória
+        if self.ws_klines is not None and self.ws_klines.is_live(interval) and cached_size >= limit:
+            return self.kline_cache.get(self.symbol, interval, limit)
+
+        candles = None
+        # Com cache cheio, busca só os candles a partir do último (inclusive o em formação)
+        last_open_time = self.kline_cache.last_open_time(self.symbol, interval)
+        if last_open_time is not None and cached_size >= limit:
+            new_candles = self._fetch_klines(interval, KLINE_INCREMENTAL_LIMIT, start_time=last_open_time)
+            # Resposta cheia: pode haver lacuna maior que o incremento, recarrega tudo
+            if len(new_candles) < KLINE_INCREMENTAL_LIMIT:
+                self.kline_cache.merge(self.symbol, interval, new_candles, max_size=max(limit, cached_size))
+                candles = self.kline_cache.get(self.symbol, interval, limit)
+
+        if candles is None:
+            candles = self._fetch_klines(interval, limit)
+            self.kline_cache.replace(self.symbol, interval, candles)
+
+        if self.ws_klines is not None:
+            self.ws_klines.mark_synced(interval)
+        return candles
+
+    def _fetch_klines(self, interval: str, limit: int, start_time: Optional[int] = None) -> CandleArray:
+        """Busca candles OHLCV via REST"""
+        params = {
             'symbol': self.symbol,
             'interval': interval,
             'limit': limit
-        })
+        }
+        if start_time is not None:
+            params['startTime'] = start_time
+        data = self._make_request('/fapi/v1/klines', params)
         
-        return [
-            [
-                float(candle[1]),  # open
-                float(candle[2]),  # high
-                float(candle[3]),  # low
-                float(candle[4]),  # close
-                float(candle[5]),  # volume
-                int(candle[0])     # timestamp
-            ]
-            for candle in data
-        ]
+        return CandleArray.from_binance(data)
 
     def get_funding_rate(self) -> Dict:
         """Obtém taxa de funding atual e próxima"""
@@ -208,7 +340,7 @@ class BinanceFuturesCollector(BaseCollector):
         
         if self.ws_liquidations.is_connected():
             try:
-                ws_data = self.ws_liquidations.get_liquidations_24h()
+                ws_data = self.ws_liquidations.get_liquidations_24h(self.symbol)
                 
                 # Se WebSocket tem dados, usa eles
                 if ws_data['total_liqs_24h'] > 0:
@@ -232,53 +364,56 @@ class BinanceFuturesCollector(BaseCollector):
         self.logger.info("Liquidações indisponíveis (WebSocket desconectado)")
         return None
 
+    @staticmethod
+    def _summarize_trades(trades: List[Dict]) -> tuple:
+        """Calcula (cvd, volume de compra, volume de venda) de uma lista de aggTrades"""
+        cvd = 0
+        buy_volume = 0
+        sell_volume = 0
+        
+        for trade in trades:
+            price = float(trade['p'])
+            qty = float(trade['q'])
+            volume = price * qty
+            
+            if trade['m']:  # market maker = venda
+                sell_volume += volume
+                cvd -= volume
+            else:  # compra
+                buy_volume += volume
+                cvd += volume
+        
+        return cvd, buy_volume, sell_volume
+
+    def _stream_flow(self, stream: Optional[WebSocketTradesCollector]) -> Optional[tuple]:
+        """(cvd, compra, venda) da janela principal do stream, se conectado e com a janela completa"""
+        if stream is None or not stream.is_connected():
+            return None
+        # Logo após iniciar ou reconectar o stream cobre só alguns segundos: usa REST
+        if stream.coverage_seconds(symbol=self.symbol) < CVD_WINDOWS[CVD_PRIMARY_WINDOW]:
+            return None
+        window = stream.get_cvd(CVD_PRIMARY_WINDOW, symbol=self.symbol)
+        return window['cvd'], window['buy_volume'], window['sell_volume']
+
     def get_cvd_data(self) -> Dict:
-        """Calcula CVD (Cumulative Volume Delta) baseado nos trades"""
+        """Calcula CVD (Cumulative Volume Delta) via streams de trades ou últimos trades REST"""
         try:
-            # CVD Perpetual
-            perp_trades = self._make_request('/fapi/v1/aggTrades', {
-                'symbol': self.symbol,
-                'limit': 1000
-            })
-            
-            cvd_perp = 0
-            perp_buy_volume = 0
-            perp_sell_volume = 0
-            
-            for trade in perp_trades:
-                price = float(trade['p'])
-                qty = float(trade['q'])
-                volume = price * qty
-                
-                if trade['m']:  # market maker = venda
-                    perp_sell_volume += volume
-                    cvd_perp -= volume
-                else:  # compra
-                    perp_buy_volume += volume
-                    cvd_perp += volume
-            
-            # CVD Spot - usando API spot da Binance
-            try:
-                spot_trades = self._make_request_spot('/api/v3/aggTrades', {
+            # CVD Perpetual (stream contínuo; fallback: últimos 1000 trades)
+            perp_flow = self._stream_flow(self.ws_perp_trades)
+            if perp_flow is None:
+                perp_trades = self._make_request('/fapi/v1/aggTrades', {
                     'symbol': self.symbol,
                     'limit': 1000
                 })
-                
-                cvd_spot = 0
-                spot_buy_volume = 0
-                spot_sell_volume = 0
-                
-                for trade in spot_trades:
-                    price = float(trade['p'])
-                    qty = float(trade['q'])
-                    volume = price * qty
-                    
-                    if trade['m']:  # market maker = venda
-                        spot_sell_volume += volume
-                        cvd_spot -= volume
-                    else:  # compra
-                        spot_buy_volume += volume
-                        cvd_spot += volume
+                perp_flow = self._summarize_trades(perp_trades)
+            cvd_perp, perp_buy_volume, perp_sell_volume = perp_flow
+            
+            # CVD Spot - stream ou API spot da Binance
+            try:
+                spot_flow = self._stream_flow(self.ws_spot_trades)
+                if spot_flow is None:
+                    spot_flow = self._summarize_trades(self.spot_collector.get_agg_trades(limit=1000))
+                cvd_spot, spot_buy_volume, spot_sell_volume = spot_flow
                         
             except Exception:
                 # Se não conseguir dados spot, define como null
@@ -286,7 +421,7 @@ class BinanceFuturesCollector(BaseCollector):
                 spot_buy_volume = None
                 spot_sell_volume = None
             
-            return {
+            cvd_data = {
                 'perp_cvd': cvd_perp,
                 'spot_cvd': cvd_spot,
                 'perp_buy_volume_sample': perp_buy_volume,
@@ -294,6 +429,17 @@ class BinanceFuturesCollector(BaseCollector):
                 'spot_buy_volume_sample': spot_buy_volume,
                 'spot_sell_volume_sample': spot_sell_volume
             }
+
+            # CVD por janela (5m/1h/4h/24h) quando os streams estão ativos
+            cvd_windows = {
+                market: stream.get_all_windows(symbol=self.symbol)
+                for market, stream in (('perp', self.ws_perp_trades), ('spot', self.ws_spot_trades))
+                if stream is not None and stream.is_connected()
+            }
+            if cvd_windows:
+                cvd_data['cvd_windows'] = cvd_windows
+
+            return cvd_data
             
         except Exception as e:
             self.logger.warning(f"Não foi possível calcular CVD: {str(e)}")
@@ -306,18 +452,9 @@ class BinanceFuturesCollector(BaseCollector):
                 'spot_sell_volume_sample': None
             }
 
-    def _make_request_spot(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict:
-        """Faz requisição para API spot da Binance"""
-        import requests
-        response = requests.get(
-            f"https://api.binance.com{endpoint}",
-            params=params,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-
     def __del__(self):
         """Cleanup ao destruir o objeto"""
-        if hasattr(self, 'ws_liquidations'):
-            self.ws_liquidations.stop_stream() 
\ No newline at end of file
+        for stream in getattr(self, '_owned_streams', []):
+            stream.stop_stream()
+        if getattr(self, 'order_book_recorder', None) is not None:
+            self.order_book_recorder.close()
@@ -0,0 +1,28 @@
+from typing import Dict, List, Optional
+import requests
+from .base_collector import BaseCollector
+from .response_cache import ResponseCache
+from .rate_limiter import WeightRateLimiter
+from ..config import SYMBOL, BINANCE_SPOT_URL, SPOT_WEIGHT_LIMIT
+
+class BinanceSpotCollector(BaseCollector):
+    """Coletor do mercado spot da Binance (usado no CVD spot)"""
+    ping_endpoint = '/api/v3/ping'
+
+    def __init__(self, symbol: str = SYMBOL, cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[WeightRateLimiter] = None, session: Optional[requests.Session] = None):
+        super().__init__(BINANCE_SPOT_URL, cache=cache, rate_limiter=rate_limiter,
+                         weight_limit=SPOT_WEIGHT_LIMIT, session=session)
+        self.symbol = symbol
+
+    def get_current_price(self) -> float:
+        """Obtém o último preço negociado no spot"""
+        data = self._make_request('/api/v3/ticker/price', {'symbol': self.symbol})
+        return float(data['price'])
+
+    def get_agg_trades(self, limit: int = 1000) -> List[Dict]:
+        """Obtém os últimos trades agregados do spot"""
+        return self._make_request('/api/v3/aggTrades', {
+            'symbol': self.symbol,
+            'limit': limit
+        })
@@ -0,0 +1,86 @@
+from itertools import chain
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+class DepthCurve:
+    """
+    Curva de liquidez acumulada de um livro de ordens.
+
+    Os níveis são convertidos uma única vez para arrays NumPy (strings da API
+    ou floats do livro local) e as quantidades acumuladas (base e USD) ficam
+    em somas prefixadas. A profundidade até qualquer distância do preço de
+    referência é então uma busca binária (searchsorted), O(log n) por nível
+    consultado, o que permite escadas de profundidade arbitrárias.
+    """
+
+    def __init__(self, bids: Sequence, asks: Sequence):
+        # Bids do maior para o menor preço, asks do menor para o maior
+        self._set_levels(*self._parse(bids), *self._parse(asks))
+
+    @classmethod
+    def from_arrays(cls, bid_prices: np.ndarray, bid_qtys: np.ndarray,
+                    ask_prices: np.ndarray, ask_qtys: np.ndarray) -> 'DepthCurve':
+        """Curva a partir de arrays já ordenados (bids do maior para o menor preço), sem conversão"""
+        curve = cls.__new__(cls)
+        curve._set_levels(bid_prices, bid_qtys, ask_prices, ask_qtys)
+        return curve
+
+    def _set_levels(self, bid_prices: np.ndarray, bid_qtys: np.ndarray,
+                    ask_prices: np.ndarray, ask_qtys: np.ndarray):
+        self.bid_prices, self.bid_qtys = bid_prices, bid_qtys
+        self.ask_prices, self.ask_qtys = ask_prices, ask_qtys
+
+        # Somas prefixadas com zero inicial: cum[k] = soma dos k melhores níveis
+        self._bid_cum_qty = self._prefix_sum(self.bid_qtys)
+        self._bid_cum_usd = self._prefix_sum(self.bid_prices * self.bid_qtys)
+        self._ask_cum_qty = self._prefix_sum(self.ask_qtys)
+        self._ask_cum_usd = self._prefix_sum(self.ask_prices * self.ask_qtys)
+
+        # searchsorted exige ordem crescente: bids negados
+        self._bid_keys = -self.bid_prices
+
+    @staticmethod
+    def _parse(levels: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """Converte níveis [preço, quantidade] em dois arrays float64"""
+        # fromiter sobre a sequência achatada: uma conversão por valor, sem listas intermediárias
+        array = np.fromiter(chain.from_iterable(levels), dtype=float, count=2 * len(levels)).reshape(-1, 2)
+        return array[:, 0], array[:, 1]
+
+    @staticmethod
+    def _prefix_sum(values: np.ndarray) -> np.ndarray:
+        cumulative = np.empty(len(values) + 1)
+        cumulative[0] = 0.0
+        np.cumsum(values, out=cumulative[1:])
+        return cumulative
+
+    @property
+    def reference_price(self) -> float:
+        """Preço de referência da profundidade (melhor bid)"""
+        return float(self.bid_prices[0])
+
+    def top(self, limit: int) -> Tuple[List[List[float]], List[List[float]]]:
+        """Níveis [preço, quantidade] do topo do livro"""
+        bids = np.column_stack((self.bid_prices[:limit], self.bid_qtys[:limit])).tolist()
+        asks = np.column_stack((self.ask_prices[:limit], self.ask_qtys[:limit])).tolist()
+        return bids, asks
+
+    def depth(self, pcts: Sequence[float]) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Quantidade acumulada (base e USD) de cada lado até pct% do preço de
+        referência (bids com preço >= limite inferior, asks com preço <= limite superior)
+        """
+        pcts = np.asarray(pcts, dtype=float)
+        reference = self.reference_price
+        bid_limits = reference * (1 - pcts / 100)
+        ask_limits = reference * (1 + pcts / 100)
+
+        bid_counts = np.searchsorted(self._bid_keys, -bid_limits, side='right')
+        ask_counts = np.searchsorted(self.ask_prices, ask_limits, side='right')
+        return {
+            'bids': {'base': self._bid_cum_qty[bid_counts], 'usd': self._bid_cum_usd[bid_counts]},
+            'asks': {'base': self._ask_cum_qty[ask_counts], 'usd': self._ask_cum_usd[ask_counts]}
+        }
+
+    def depth_bps(self, bps: Sequence[float]) -> Dict[str, Dict[str, np.ndarray]]:
+        """Profundidade em pontos-base (100 bps = 1%)"""
+        return self.depth(np.asarray(bps, dtype=float) / 100)
@@ -0,0 +1,54 @@
+import threading
+from typing import Dict, Optional, Tuple
+from ..utils.candle_array import CandleArray
+
+class KlineCache:
+    """
+    Cache de candles por (símbolo, intervalo).
+
+    Os candles são guardados como CandleArray (colunas NumPy somente leitura)
+    em ordem de abertura. Novos candles substituem os já guardados a partir do
+    seu timestamp, o que atualiza o candle ainda em formação. Cada atualização
+    cria um novo bloco, então as séries já devolvidas por get (views) não mudam.
+    """
+
+    def __init__(self):
+        self._candles: Dict[Tuple[str, str], CandleArray] = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, interval: str, limit: Optional[int] = None) -> CandleArray:
+        """Retorna os últimos limit candles em cache (série vazia se não houver)"""
+        with self._lock:
+            candles = self._candles.get((symbol, interval))
+        if candles is None:
+            return CandleArray.empty()
+        return candles.tail(limit) if limit else candles
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        """Timestamp de abertura do último candle em cache"""
+        with self._lock:
+            candles = self._candles.get((symbol, interval))
+            return candles.last_timestamp() if candles else None
+
+    def size(self, symbol: str, interval: str) -> int:
+        with self._lock:
+            candles = self._candles.get((symbol, interval))
+            return len(candles) if candles is not None else 0
+
+    def replace(self, symbol: str, interval: str, candles: CandleArray):
+        """Substitui todo o histórico em cache"""
+        with self._lock:
+            self._candles[(symbol, interval)] = candles
+
+    def merge(self, symbol: str, interval: str, candles: CandleArray, max_size: int):
+        """Incorpora candles novos, substituindo os de mesmo timestamp ou posteriores"""
+        if not candles:
+            return
+        with self._lock:
+            stored = self._candles.get((symbol, interval))
+            if stored is None:
+                merged = candles
+            else:
+                cut = stored.searchsorted(candles.timestamp[0])
+                merged = CandleArray.concat([stored[:cut], candles])
+            self._candles[(symbol, interval)] = merged.tail(max_size)
@@ -0,0 +1,84 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Iterable, Optional, Tuple
+
+class OrderBookSide:
+    """Um lado do livro: níveis preço -> quantidade com preços mantidos ordenados"""
+
+    def __init__(self, descending: bool):
+        self.descending = descending  # True para bids (melhor preço = maior)
+        self.prices: List[float] = []  # Sempre em ordem crescente
+        self.levels: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def clear(self):
+        self.prices = []
+        self.levels = {}
+
+    def update(self, price: float, qty: float):
+        """Atualiza um nível; quantidade zero remove o nível"""
+        if qty == 0:
+            if price in self.levels:
+                del self.levels[price]
+                del self.prices[bisect_left(self.prices, price)]
+            return
+        if price not in self.levels:
+            insort(self.prices, price)
+        self.levels[price] = qty
+
+    def best(self) -> Optional[float]:
+        """Melhor preço do lado"""
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.descending else self.prices[0]
+
+    def snapshot_within(self, bound: float, min_levels: int = 0) -> Tuple[List[float], List[float]]:
+        """
+        Preços (ordem crescente) e quantidades do melhor preço até o limite, com
+        no mínimo min_levels níveis. Só fatias e lookups em C, sem um [preço,
+        quantidade] por nível: cópia rápida para processar fora do lock.
+        """
+        if self.descending:
+            start = min(bisect_left(self.prices, bound), max(len(self.prices) - min_levels, 0))
+            prices = self.prices[start:]
+        else:
+            prices = self.prices[:max(bisect_right(self.prices, bound), min_levels)]
+        return prices, list(map(self.levels.__getitem__, prices))
+
+class LocalOrderBook:
+    """Livro de ordens mantido em memória a partir de snapshot REST + diffs"""
+
+    def __init__(self):
+        self.bids = OrderBookSide(descending=True)
+        self.asks = OrderBookSide(descending=False)
+        self.last_update_id: Optional[int] = None
+
+    @staticmethod
+    def _apply(side: OrderBookSide, levels: Iterable):
+        for price, qty in levels:
+            side.update(float(price), float(qty))
+
+    def load_snapshot(self, snapshot: Dict):
+        """Substitui o livro pelo snapshot REST (/depth)"""
+        self.bids.clear()
+        self.asks.clear()
+        self._apply(self.bids, snapshot['bids'])
+        self._apply(self.asks, snapshot['asks'])
+        self.last_update_id = snapshot['lastUpdateId']
+
+    def apply_diff(self, bids: Iterable, asks: Iterable, last_update_id: int):
+        """Aplica um evento de diff (níveis absolutos; quantidade 0 remove)"""
+        self._apply(self.bids, bids)
+        self._apply(self.asks, asks)
+        self.last_update_id = last_update_id
+
+    def snapshot_within(self, pct: float, min_levels: int = 0) -> Tuple[List[float], List[float], List[float], List[float]]:
+        """(preços e quantidades de bids, preços e quantidades de asks) até pct% do melhor bid, em ordem crescente"""
+        reference = self.bids.best()
+        if reference is None:
+            return ([], [], *self.asks.snapshot_within(float('-inf'), min_levels))
+        return (
+            *self.bids.snapshot_within(reference * (1 - pct / 100), min_levels),
+            *self.asks.snapshot_within(reference * (1 + pct / 100), min_levels)
+        )
@@ -0,0 +1,129 @@
+import time
+import threading
+import logging
+from typing import Dict, Any, Optional, Mapping
+from ..config import ENDPOINT_WEIGHTS, LIMIT_WEIGHT_TIERS, RATE_LIMIT_SAFETY_MARGIN
+
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+def endpoint_weight(endpoint: str, params: Optional[Dict[str, Any]] = None) -> int:
+    """Retorna o peso de uma requisição conforme o endpoint e o parâmetro limit"""
+    tiers = LIMIT_WEIGHT_TIERS.get(endpoint)
+    if tiers and params and 'limit' in params:
+        limit = int(params['limit'])
+        for max_limit, weight in tiers:
+            if limit <= max_limit:
+                return weight
+        return tiers[-1][1]
+    if tiers:
+        # Sem limit explícito assume a faixa mais pesada (estimativa conservadora)
+        return tiers[-1][1]
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+class WeightRateLimiter:
+    """
+    Token bucket de peso de requisições, compartilhado entre coletores do mesmo host.
+
+    O bucket reabastece continuamente até a capacidade (limite por minuto vezes a
+    margem de segurança) e é corrigido pelo peso usado informado pela Binance em
+    cada resposta, que também conta requisições de outros processos no mesmo IP.
+    """
+
+    def __init__(self, weight_limit: int, interval: float = 60, safety_margin: float = RATE_LIMIT_SAFETY_MARGIN,
+                 name: str = 'binance'):
+        self.weight_limit = weight_limit
+        self.capacity = weight_limit * safety_margin
+        self.refill_rate = self.capacity / interval
+        self.logger = logging.getLogger(f"{self.__class__.__name__}[{name}]")
+
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.server_used_weight: Optional[int] = None
+
+        # Métricas
+        self.throttled_requests = 0
+        self.total_wait = 0.0
+
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Reabastece tokens proporcionalmente ao tempo decorrido (com lock)"""
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.last_refill = now
+
+    def acquire(self, weight: int = 1) -> float:
+        """Bloqueia até haver orçamento para o peso pedido; retorna o tempo esperado"""
+        weight = min(weight, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= weight:
+                    self.tokens -= weight
+                    if waited > 0:
+                        self.throttled_requests += 1
+                        self.total_wait += waited
+                    return waited
+                else:
+                    wait = (weight - self.tokens) / self.refill_rate
+
+            if waited == 0:
+                self.logger.info(f"Orçamento de peso esgotado, aguardando {wait:.2f}s")
+            time.sleep(wait)
+            waited += wait
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Sincroniza o bucket com o peso usado informado pela Binance"""
+        used = headers.get(USED_WEIGHT_HEADER)
+        if used is None:
+            return
+        try:
+            used = int(used)
+        except ValueError:
+            return
+
+        with self.lock:
+            self.server_used_weight = used
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, self.capacity - used)
+
+    def block(self, seconds: float):
+        """Suspende todas as requisições (Retry-After de um 429/418)"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+        self.logger.warning(f"Requisições suspensas por {seconds:.1f}s (Retry-After)")
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Retorna o uso atual do orçamento de peso"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'weight_limit': self.weight_limit,
+                'server_used_weight': self.server_used_weight,
+                'server_used_pct': (self.server_used_weight / self.weight_limit * 100
+                                    if self.server_used_weight is not None else None),
+                'local_available_weight': round(self.tokens, 2),
+                'blocked_for_s': round(max(0.0, self.blocked_until - now), 2),
+                'throttled_requests': self.throttled_requests,
+                'total_wait_s': round(self.total_wait, 3)
+            }
+
+_shared_limiters: Dict[str, WeightRateLimiter] = {}
+_shared_lock = threading.Lock()
+
+def get_shared_limiter(key: str, weight_limit: int) -> WeightRateLimiter:
+    """Retorna o limitador compartilhado para um host (criado na primeira chamada)"""
+    with _shared_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = WeightRateLimiter(weight_limit, name=key)
+            _shared_limiters[key] = limiter
+        return limiter
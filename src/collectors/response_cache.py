@@ -0,0 +1,95 @@
+import time
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Callable, Tuple
+
+class ResponseCache:
+    """
+    Cache de respostas HTTP com TTL por endpoint e coalescência de requisições.
+
+    Requisições idênticas (mesmo endpoint e parâmetros) feitas ao mesmo tempo
+    compartilham um único fetch; a resposta fica válida pelo TTL do endpoint.
+    Os valores retornados são compartilhados entre chamadores e não devem
+    ser modificados.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0, max_entries: int = 256):
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}  # chave -> (expira_em, valor)
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+        """Gera chave do cache a partir do endpoint e parâmetros"""
+        return (endpoint, tuple(sorted((params or {}).items())))
+
+    def get_or_fetch(self, endpoint: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+        """Retorna a resposta em cache ou executa fetch (uma única vez por chave)"""
+        key = self.make_key(endpoint, params)
+        ttl = self.ttls.get(endpoint, self.default_ttl)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        # Outra thread já está buscando esta chave: aguarda o mesmo resultado
+        if not is_owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if ttl > 0:
+                self._entries[key] = (time.monotonic() + ttl, value)
+                if len(self._entries) > self.max_entries:
+                    self._prune()
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def _prune(self):
+        """Remove entradas expiradas (chamado com o lock adquirido)"""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+    def clear(self):
+        """Descarta todas as respostas em cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna métricas de uso do cache"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'entries': len(self._entries)
+            }
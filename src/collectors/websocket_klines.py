@@ -0,0 +1,90 @@
+from typing import Dict, Iterable
+from .base_stream import BaseWebSocketStream
+from .kline_cache import KlineCache
+from ..utils.candle_array import CandleArray
+from ..config import BINANCE_FUTURES_WS_URL
+
+# Duração de cada intervalo em ms (detecção de lacunas no stream)
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 180_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '2h': 7_200_000,
+    '4h': 14_400_000,
+    '6h': 21_600_000,
+    '8h': 28_800_000,
+    '12h': 43_200_000,
+    '1d': 86_400_000,
+    '3d': 259_200_000,
+    '1w': 604_800_000,
+}
+
+class WebSocketKlinesCollector(BaseWebSocketStream):
+    """
+    Mantém as janelas de candles do KlineCache atualizadas pelos streams
+    <symbol>@kline_<interval> (inclusive o candle em formação).
+
+    Um intervalo fica "ao vivo" depois que o coletor REST sincroniza sua janela
+    (mark_synced) e deixa de estar em caso de reconexão ou lacuna entre candles;
+    enquanto não estiver ao vivo, get_klines volta a usar REST.
+    """
+
+    def __init__(self, symbol: str, intervals: Iterable[str], kline_cache: KlineCache):
+        super().__init__(f"{symbol.lower()}@kline")
+        self.symbol = symbol
+        self.intervals = list(intervals)
+        self.kline_cache = kline_cache
+        self.live: Dict[str, bool] = {interval: False for interval in self.intervals}
+
+    def _get_url(self) -> str:
+        streams = '/'.join(f"{self.symbol.lower()}@kline_{interval}" for interval in self.intervals)
+        return f"{BINANCE_FUTURES_WS_URL}/stream?streams={streams}"
+
+    def _on_open(self, ws):
+        super()._on_open(ws)
+        # Atualizações perdidas durante a desconexão exigem nova sincronização REST
+        with self.lock:
+            for interval in self.live:
+                self.live[interval] = False
+
+    def _handle_message(self, data: Dict):
+        """Processa um evento de kline (stream combinado)"""
+        kline = data.get('data', data).get('k')
+        if not kline:
+            return
+
+        interval = kline['i']
+        open_time = int(kline['t'])
+        candle = CandleArray.from_rows([[
+            float(kline['o']),  # open
+            float(kline['h']),  # high
+            float(kline['l']),  # low
+            float(kline['c']),  # close
+            float(kline['v']),  # volume
+            open_time           # timestamp
+        ]])
+
+        with self.lock:
+            last_open_time = self.kline_cache.last_open_time(self.symbol, interval)
+            if last_open_time is None or open_time < last_open_time:
+                return
+            if open_time > last_open_time + INTERVAL_MS.get(interval, 0):
+                if self.live.get(interval):
+                    self.logger.warning(f"Lacuna no stream de {interval}, aguardando nova sincronização REST")
+                self.live[interval] = False
+                return
+            self.kline_cache.merge(self.symbol, interval, candle,
+                                   max_size=self.kline_cache.size(self.symbol, interval))
+
+    def mark_synced(self, interval: str):
+        """Marca a janela do intervalo como sincronizada via REST"""
+        with self.lock:
+            if interval in self.live and self.is_connected():
+                self.live[interval] = True
+
+    def is_live(self, interval: str) -> bool:
+        """A janela do intervalo está sendo mantida pelo stream"""
+        return self.is_connected() and self.live.get(interval, False)
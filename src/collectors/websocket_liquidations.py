@@ -1,192 +1,162 @@
-import json
-import threading
+import re
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Optional
-import logging
-import websocket
-
-class WebSocketLiquidationsCollector:
-    def __init__(self, symbol: str = "BTCUSDT"):
-        self.symbol = symbol.lower()
-        self.logger = logging.getLogger(__name__)
-        
-        # Armazenamento das liquidações
-        self.liquidations_24h = {
-            'long_liqs': 0,
-            'short_liqs': 0,
-            'total_liqs': 0,
-            'last_reset': datetime.now()
+from typing import Dict, Iterable, Optional, Union
+from .base_stream import BaseWebSocketStream
+from ..utils.rolling_window import RollingWindowAggregator
+from ..utils.event_journal import EventJournal
+from ..config import (BINANCE_FUTURES_WS_URL, LIQUIDATION_BUCKET_SECONDS, LIQUIDATION_JOURNAL_ENABLED,
+                      LIQUIDATION_JOURNAL_PATH, LIQUIDATION_MAX_SYMBOL_STREAMS)
+
+WINDOW_SECONDS = 24 * 60 * 60
+ALL_SYMBOLS = 'ALL'
+# Campo "s" (símbolo) na mensagem bruta, com qualquer espaçamento em torno do ":"
+SYMBOL_FIELD = re.compile(r'"s"\s*:\s*"([^"]*)"')
+
+class WebSocketLiquidationsCollector(BaseWebSocketStream):
+    """
+    Liquidações em janela deslizante de 24h para um conjunto de símbolos.
+
+    Com poucos símbolos assina <symbol>@forceOrder de cada um em uma única
+    conexão (stream combinado). Com muitos símbolos, ou com 'ALL', usa o stream
+    de todo o mercado (!forceOrder@arr) e despacha cada evento para o agregador
+    do seu símbolo por lookup em dicionário; eventos de símbolos não
+    acompanhados são descartados antes mesmo do parse do JSON.
+    """
+
+    def __init__(self, symbols: Union[str, Iterable[str]] = "BTCUSDT", use_all_market_stream: Optional[bool] = None):
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        self.symbols = [symbol.upper() for symbol in symbols]
+        super().__init__(f"forceOrder[{','.join(self.symbols)}]")
+
+        if use_all_market_stream is None:
+            use_all_market_stream = (ALL_SYMBOLS in self.symbols or
+                                     len(self.symbols) > LIQUIDATION_MAX_SYMBOL_STREAMS)
+        self.use_all_market_stream = use_all_market_stream
+
+        # Janela deslizante de 24h por símbolo: anel de buckets long/short que expiram com o tempo
+        self.aggregators: Dict[str, RollingWindowAggregator] = {
+            symbol: RollingWindowAggregator(
+                ('long_liqs', 'short_liqs'),
+                {'24h': WINDOW_SECONDS},
+                LIQUIDATION_BUCKET_SECONDS
+            )
+            for symbol in self.symbols
         }
-        
-        # WebSocket
-        self.ws = None
-        self.is_running = False
-        self.thread = None
-        
-        # Lock para thread safety
-        self.lock = threading.Lock()
+
+        # Journal em disco por símbolo: reconstrói a janela ao reiniciar
+        self.journals: Dict[str, EventJournal] = {}
+        if LIQUIDATION_JOURNAL_ENABLED:
+            for symbol in self.symbols:
+                self.journals[symbol] = EventJournal(
+                    LIQUIDATION_JOURNAL_PATH.format(symbol=symbol.lower()),
+                    num_values=2,
+                    retention_seconds=WINDOW_SECONDS
+                )
+                self._restore_from_journal(symbol)
+
+    def _get_url(self) -> str:
+        if self.use_all_market_stream:
+            return f"{BINANCE_FUTURES_WS_URL}/ws/!forceOrder@arr"
+        streams = '/'.join(f"{symbol.lower()}@forceOrder" for symbol in self.symbols)
+        return f"{BINANCE_FUTURES_WS_URL}/stream?streams={streams}"
+
+    def _restore_from_journal(self, symbol: str):
+        """
+        Reaplica na janela do símbolo as liquidações gravadas nas últimas 24h.
+        Só lê o arquivo: a compactação fica com a thread do journal, iniciada
+        em start_stream() junto com o lock de escrita.
+        """
+        start = time.perf_counter()
+        journal = self.journals[symbol]
+        try:
+            events = list(journal.load(since=time.time() - WINDOW_SECONDS))
+            for ts, long_liq, short_liq in events:
+                self.aggregators[symbol].add(ts, (long_liq, short_liq))
+        except Exception as e:
+            self.logger.error(f"Erro ao restaurar liquidações de {symbol} do journal: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.logger.info(f"{len(events)} liquidação(ões) de {symbol} restaurada(s) do journal em {elapsed_ms:.1f}ms")
 
     def start_stream(self):
         """Inicia o stream de liquidações"""
         if self.is_running:
             return
-            
-        self.is_running = True
-        self.thread = threading.Thread(target=self._run_websocket, daemon=True)
-        self.thread.start()
-        self.logger.info("Stream de liquidações iniciado")
+        for journal in self.journals.values():
+            journal.start()
+        super().start_stream()
 
     def stop_stream(self):
         """Para o stream de liquidações"""
-        self.is_running = False
-        if self.ws:
-            self.ws.close()
-        if self.thread:
-            self.thread.join(timeout=5)
-        self.logger.info("Stream de liquidações parado")
-
-    def _run_websocket(self):
-        """Executa o WebSocket em thread separada"""
-        websocket.enableTrace(False)
-        
-        # URL do WebSocket público da Binance para liquidações
-        ws_url = "wss://fstream.binance.com/ws/!forceOrder@arr"
-        
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_message=self._on_message,
-            on_error=self._on_error,
-            on_close=self._on_close,
-            on_open=self._on_open
-        )
-        
-        # Reconecta automaticamente se desconectar
-        while self.is_running:
-            try:
-                self.ws.run_forever()
-                if self.is_running:
-                    self.logger.warning("WebSocket desconectado, reconectando em 5s...")
-                    time.sleep(5)
-            except Exception as e:
-                self.logger.error(f"Erro no WebSocket: {e}")
-                if self.is_running:
-                    time.sleep(5)
-
-    def _on_open(self, ws):
-        """Callback quando WebSocket conecta"""
-        self.logger.info("WebSocket de liquidações conectado")
-
-    def _on_close(self, ws, close_status_code=None, close_msg=None):
-        """Callback quando WebSocket é fechado"""
-        self.logger.info("Stream de liquidações parado")
-        self.is_running = False
-
-    def _on_error(self, ws, error):
-        """Callback para erros do WebSocket"""
-        self.logger.error(f"Erro no WebSocket: {error}")
+        super().stop_stream()
+        for journal in self.journals.values():
+            journal.stop()
+
+    @staticmethod
+    def _peek_symbol(message: str) -> Optional[str]:
+        """Extrai o símbolo ("s") da mensagem bruta sem decodificar o JSON"""
+        match = SYMBOL_FIELD.search(message)
+        return match.group(1) if match else None
 
     def _on_message(self, ws, message):
-        """Processa mensagens de liquidação"""
-        try:
-            data = json.loads(message)
-            
-            # Log para debug
-            self.logger.debug(f"Mensagem recebida: {data}")
-            
-            # Extrai dados da liquidação
-            order_data = data.get('o', {})
-            symbol = order_data.get('s', '')
-            
-            # Verifica se é uma liquidação do nosso símbolo OU se queremos todas
-            if symbol == self.symbol.upper() or self.symbol.upper() == 'ALL':
-                self.logger.info(f"Liquidação detectada para {symbol}: {order_data}")
-                self._process_liquidation(order_data, symbol)
-            else:
-                # Log de símbolos diferentes para debug
-                if symbol:
-                    self.logger.debug(f"Liquidação de outro símbolo ignorada: {symbol}")
-                
-        except Exception as e:
-            self.logger.error(f"Erro ao processar liquidação: {e}")
+        """Filtra pelo símbolo antes do parse e repassa as liquidações acompanhadas"""
+        if self.use_all_market_stream and ALL_SYMBOLS not in self.aggregators:
+            symbol = self._peek_symbol(message)
+            # Sem "s" reconhecível a mensagem segue para o parse completo
+            if symbol is not None and symbol not in self.aggregators:
+                return
+        super()._on_message(ws, message)
 
-    def _process_liquidation(self, liquidation_data, symbol=None):
+    def _handle_message(self, data: Dict):
+        """Despacha a liquidação para o agregador do seu símbolo"""
+        # Stream combinado encapsula o evento em {"stream": ..., "data": ...}
+        order_data = data.get('data', data).get('o')
+        if not order_data:
+            return
+        symbol = order_data.get('s', '')
+        aggregator = self.aggregators.get(symbol) or self.aggregators.get(ALL_SYMBOLS)
+        if aggregator is None:
+            return
+        self._process_liquidation(order_data, symbol if symbol in self.aggregators else ALL_SYMBOLS)
+
+    def _process_liquidation(self, liquidation_data: Dict, symbol: str):
         """Processa uma liquidação individual"""
-        try:
-            side = liquidation_data.get('S')  # BUY ou SELL
-            price = float(liquidation_data.get('ap', 0))  # Average price
-            qty = float(liquidation_data.get('q', 0))
-            
-            # Calcula valor em USDT
-            value_usd = price * qty
-            
-            self.logger.info(f"Processando liquidação {symbol or self.symbol}: {side} {qty:.4f} @ {price:.2f} = ${value_usd:.2f}")
-            
-            with self.lock:
-                # Reseta contadores se passou 24h
-                self._reset_if_needed()
-                
-                # Adiciona à contagem
-                if side == 'SELL':  # Liquidação de posição long
-                    self.liquidations_24h['long_liqs'] += value_usd
-                    self.logger.info(f"Liquidação LONG adicionada: +${value_usd:.2f} (Total: ${self.liquidations_24h['long_liqs']:.2f})")
-                elif side == 'BUY':  # Liquidação de posição short
-                    self.liquidations_24h['short_liqs'] += value_usd
-                    self.logger.info(f"Liquidação SHORT adicionada: +${value_usd:.2f} (Total: ${self.liquidations_24h['short_liqs']:.2f})")
-                
-                self.liquidations_24h['total_liqs'] = (
-                    self.liquidations_24h['long_liqs'] + 
-                    self.liquidations_24h['short_liqs']
-                )
-                
-        except Exception as e:
-            self.logger.error(f"Erro ao processar liquidação: {e}")
-
-    def _reset_if_needed(self):
-        """Reseta contadores se passou 24h"""
-        now = datetime.now()
-        if now - self.liquidations_24h['last_reset'] > timedelta(hours=24):
-            self.liquidations_24h = {
-                'long_liqs': 0,
-                'short_liqs': 0,
-                'total_liqs': 0,
-                'last_reset': now
-            }
-            self.logger.info("Contadores de liquidação resetados (24h)")
-
-    def get_liquidations_24h(self) -> Dict:
-        """Retorna liquidações acumuladas das últimas 24h"""
-        with self.lock:
-            self._reset_if_needed()
-            
-            # Log do estado atual
-            self.logger.debug(f"Estado atual das liquidações: Long=${self.liquidations_24h['long_liqs']:.2f}, "
-                            f"Short=${self.liquidations_24h['short_liqs']:.2f}, "
-                            f"Total=${self.liquidations_24h['total_liqs']:.2f}")
-            
-            return {
-                'long_liqs_24h': self.liquidations_24h['long_liqs'],
-                'short_liqs_24h': self.liquidations_24h['short_liqs'],
-                'total_liqs_24h': self.liquidations_24h['total_liqs']
-            }
-
-    def is_connected(self) -> bool:
-        """Verifica se o WebSocket está conectado"""
-        try:
-            return (self.is_running and 
-                   self.ws and 
-                   hasattr(self.ws, 'sock') and 
-                   self.ws.sock and 
-                   self.ws.sock.connected)
-        except:
-            return False
-
-    def wait_for_connection(self, timeout: int = 10) -> bool:
-        """Aguarda conexão por até timeout segundos"""
-        import time
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if self.is_connected():
-                return True
-            time.sleep(0.1)
-        return False 
\ No newline at end of file
+        side = liquidation_data.get('S')  # BUY ou SELL
+        price = float(liquidation_data.get('ap', 0))  # Average price
+        qty = float(liquidation_data.get('q', 0))
+
+        # Calcula valor em USDT
+        value_usd = price * qty
+
+        if side == 'SELL':  # Liquidação de posição long
+            values = (value_usd, 0.0)
+        elif side == 'BUY':  # Liquidação de posição short
+            values = (0.0, value_usd)
+        else:
+            return
+
+        # Horário do evento (T) define o bucket; sem ele usa o horário local
+        ts = liquidation_data.get('T', time.time() * 1000) / 1000
+        self.aggregators[symbol].add(ts, values)
+
+        # Gravação em lote pela thread do journal (não bloqueia o callback)
+        journal = self.journals.get(symbol)
+        if journal:
+            journal.append(ts, values)
+
+        self.logger.debug("Liquidação %s: %s %.4f @ %.2f = $%.2f", symbol, side, qty, price, value_usd)
+
+    def get_liquidations_24h(self, symbol: Optional[str] = None) -> Dict:
+        """Retorna liquidações das últimas 24h (janela deslizante) de um símbolo"""
+        symbol = (symbol or self.symbols[0]).upper()
+        totals = self.aggregators[symbol].totals('24h')
+
+        # Log do estado atual
+        self.logger.debug(f"Estado atual das liquidações {symbol}: Long=${totals['long_liqs']:.2f}, "
+                          f"Short=${totals['short_liqs']:.2f}")
+
+        return {
+            'long_liqs_24h': totals['long_liqs'],
+            'short_liqs_24h': totals['short_liqs'],
+            'total_liqs_24h': totals['long_liqs'] + totals['short_liqs']
+        }
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Dict, Optional
+import numpy as np
+from .base_stream import BaseWebSocketStream
+from .depth_curve import DepthCurve
+from .local_order_book import LocalOrderBook
+from ..config import (BINANCE_FUTURES_WS_URL, ORDER_BOOK_STREAM_SPEED, ORDER_BOOK_MAX_STALENESS)
+
+class WebSocketOrderBook(BaseWebSocketStream):
+    """
+    Livro de ordens local mantido pelo stream <symbol>@depth@100ms.
+
+    Sincronização (futuros): os eventos são bufferizados enquanto o snapshot
+    REST é obtido; descarta eventos com u < lastUpdateId, o primeiro evento
+    aplicado deve ter U <= lastUpdateId <= u e cada evento seguinte deve ter
+    pu igual ao u do anterior. Qualquer lacuna dispara nova sincronização.
+    """
+    max_buffer = 10000
+    resync_interval = 1.0
+
+    def __init__(self, symbol: str, snapshot_fetcher: Callable[[], Dict]):
+        super().__init__(f"{symbol.lower()}@depth")
+        self.symbol = symbol.lower()
+        self.snapshot_fetcher = snapshot_fetcher
+        self.book = LocalOrderBook()
+
+        self.state = 'unsynced'  # unsynced -> awaiting_first -> synced
+        # Eventos recebidos enquanto não sincronizado (os mais antigos saem ao encher)
+        self.buffer: Deque[Dict] = deque(maxlen=self.max_buffer)
+        self.sync_thread: Optional[threading.Thread] = None
+        self.last_sync_attempt = 0.0
+        self.last_event_time = 0.0
+        self.resync_count = 0
+
+    def _get_url(self) -> str:
+        return f"{BINANCE_FUTURES_WS_URL}/ws/{self.symbol}@depth@{ORDER_BOOK_STREAM_SPEED}"
+
+    def _on_open(self, ws):
+        super()._on_open(ws)
+        # Nova conexão: o livro anterior não tem continuidade garantida
+        with self.lock:
+            self._reset('nova conexão')
+
+    def _handle_message(self, data: Dict):
+        """Processa um evento depthUpdate"""
+        if data.get('e') != 'depthUpdate':
+            return
+        with self.lock:
+            self.last_event_time = time.time()
+            self._process_event(data)
+            start_sync = self._should_start_sync()
+        if start_sync:
+            self._start_sync()
+
+    def _process_event(self, event: Dict):
+        """Aplica um evento conforme o estado de sincronização (com lock)"""
+        if self.state == 'unsynced':
+            self.buffer.append(event)
+            return
+
+        if self.state == 'awaiting_first':
+            snapshot_id = self.book.last_update_id
+            if event['u'] < snapshot_id:
+                return
+            if event['U'] > snapshot_id:
+                self._reset(f"primeiro evento U={event['U']} após snapshot {snapshot_id}", event)
+                return
+            self.book.apply_diff(event['b'], event['a'], event['u'])
+            self.state = 'synced'
+            self.logger.info(f"Livro local sincronizado (lastUpdateId={snapshot_id})")
+            return
+
+        if event['pu'] != self.book.last_update_id:
+            self._reset(f"lacuna pu={event['pu']} esperado={self.book.last_update_id}", event)
+            return
+        self.book.apply_diff(event['b'], event['a'], event['u'])
+
+    def _reset(self, reason: str, event: Optional[Dict] = None):
+        """Invalida o livro e volta a bufferizar (com lock)"""
+        if self.state != 'unsynced':
+            self.resync_count += 1
+            self.logger.warning(f"Ressincronizando livro local: {reason}")
+        self.state = 'unsynced'
+        self.buffer.clear()
+        if event is not None:
+            self.buffer.append(event)
+
+    def _should_start_sync(self) -> bool:
+        """Decide se deve disparar a busca do snapshot (com lock)"""
+        if self.state != 'unsynced' or (self.sync_thread and self.sync_thread.is_alive()):
+            return False
+        return time.time() - self.last_sync_attempt >= self.resync_interval
+
+    def _start_sync(self):
+        self.last_sync_attempt = time.time()
+        self.sync_thread = threading.Thread(target=self._sync, daemon=True, name=f"sync-{self.name}")
+        self.sync_thread.start()
+
+    def _sync(self):
+        """Busca o snapshot REST e reaplica os eventos bufferizados"""
+        try:
+            snapshot = self.snapshot_fetcher()
+        except Exception as e:
+            self.logger.warning(f"Erro ao obter snapshot do livro: {e}")
+            return
+
+        with self.lock:
+            if self.state != 'unsynced':
+                return
+            self.book.load_snapshot(snapshot)
+            self.state = 'awaiting_first'
+            buffered, self.buffer = self.buffer, deque(maxlen=self.max_buffer)
+            for i, event in enumerate(buffered):
+                self._process_event(event)
+                if self.state == 'unsynced':
+                    # Snapshot mais antigo que o buffer: os eventos restantes
+                    # seguem bufferizados para a próxima tentativa
+                    self.buffer.extend(islice(buffered, i + 1, None))
+                    break
+
+    def is_synced(self) -> bool:
+        """Livro sincronizado e atualizado recentemente"""
+        return (self.state == 'synced' and
+                time.time() - self.last_event_time <= ORDER_BOOK_MAX_STALENESS)
+
+    def get_depth_curve(self, pct: float, min_levels: int = 0) -> Optional[DepthCurve]:
+        """
+        Curva de profundidade do livro local até pct% do melhor bid (None se um
+        lado estiver vazio). Com o lock só copia as listas de preços e
+        quantidades; arrays e somas prefixadas são montados depois de liberá-lo.
+        """
+        with self.lock:
+            bid_prices, bid_qtys, ask_prices, ask_qtys = self.book.snapshot_within(pct, min_levels)
+        if not bid_prices or not ask_prices:
+            return None
+        # Bids guardados em ordem crescente: a curva os quer do melhor (maior) para o pior
+        return DepthCurve.from_arrays(np.array(bid_prices)[::-1], np.array(bid_qtys)[::-1],
+                                      np.array(ask_prices), np.array(ask_qtys))
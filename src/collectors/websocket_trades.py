@@ -0,0 +1,88 @@
+from typing import Dict, Iterable, Optional, Union
+from .base_stream import BaseWebSocketStream
+from ..utils.rolling_window import RollingWindowAggregator
+from ..config import BINANCE_FUTURES_WS_URL, BINANCE_SPOT_WS_URL, CVD_WINDOWS, CVD_BUCKET_SECONDS
+
+class WebSocketTradesCollector(BaseWebSocketStream):
+    """
+    CVD contínuo a partir do stream <symbol>@aggTrade (futuros ou spot).
+
+    Volumes de compra/venda (em USDT) são acumulados em buckets de tempo para as
+    janelas de CVD_WINDOWS; a leitura não faz nenhuma requisição REST. Vários
+    símbolos compartilham uma única conexão (stream combinado), com um agregador
+    por símbolo. Trades perdidos durante uma desconexão não têm como ser
+    recuperados: a cada conexão os agregadores são zerados e a cobertura
+    (coverage_seconds) recomeça.
+    """
+    fields = ('buy_volume', 'sell_volume')
+
+    def __init__(self, symbols: Union[str, Iterable[str]], market: str = 'futures'):
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        self.symbols = [symbol.lower() for symbol in symbols]
+        super().__init__(f"{market}:{','.join(self.symbols)}@aggTrade")
+        self.symbol = self.symbols[0]
+        self.market = market
+        # Agregadores indexados pelo símbolo como vem no evento ("s", maiúsculo)
+        self.aggregators: Dict[str, RollingWindowAggregator] = {
+            symbol.upper(): RollingWindowAggregator(self.fields, CVD_WINDOWS, CVD_BUCKET_SECONDS)
+            for symbol in self.symbols
+        }
+
+    def _get_url(self) -> str:
+        base_url = BINANCE_FUTURES_WS_URL if self.market == 'futures' else BINANCE_SPOT_WS_URL
+        if len(self.symbols) == 1:
+            return f"{base_url}/ws/{self.symbol}@aggTrade"
+        streams = '/'.join(f"{symbol}@aggTrade" for symbol in self.symbols)
+        return f"{base_url}/stream?streams={streams}"
+
+    def _on_open(self, ws):
+        super()._on_open(ws)
+        # Janelas com lacuna subestimariam o CVD: recomeçam do zero
+        for aggregator in self.aggregators.values():
+            aggregator.reset()
+
+    def _handle_message(self, data: Dict):
+        """Processa um trade agregado"""
+        # Stream combinado encapsula o evento em {"stream": ..., "data": ...}
+        data = data.get('data', data)
+        if data.get('e') != 'aggTrade':
+            return
+        aggregator = self.aggregators.get(data['s'])
+        if aggregator is None:
+            return
+        volume = float(data['p']) * float(data['q'])
+        ts = data['T'] / 1000
+        if data['m']:  # m = true: comprador é o market maker (venda agressora)
+            aggregator.add(ts, (0.0, volume))
+        else:
+            aggregator.add(ts, (volume, 0.0))
+
+    def _aggregator(self, symbol: Optional[str]) -> RollingWindowAggregator:
+        return self.aggregators[(symbol or self.symbol).upper()]
+
+    def get_cvd(self, window: str, now: Optional[float] = None, symbol: Optional[str] = None) -> Dict[str, float]:
+        """CVD e volumes de compra/venda da janela"""
+        totals = self._aggregator(symbol).totals(window, now)
+        return {
+            'cvd': totals['buy_volume'] - totals['sell_volume'],
+            'buy_volume': totals['buy_volume'],
+            'sell_volume': totals['sell_volume']
+        }
+
+    def coverage_seconds(self, now: Optional[float] = None, symbol: Optional[str] = None) -> float:
+        """Tempo contínuo (s) coberto pelo stream desde a última conexão"""
+        return self._aggregator(symbol).coverage_seconds(now)
+
+    def get_all_windows(self, now: Optional[float] = None, symbol: Optional[str] = None) -> Dict:
+        """CVD de todas as janelas configuradas e o tempo coberto pelos dados"""
+        aggregator = self._aggregator(symbol)
+        windows = {
+            name: {
+                'cvd': totals['buy_volume'] - totals['sell_volume'],
+                'buy_volume': totals['buy_volume'],
+                'sell_volume': totals['sell_volume']
+            }
+            for name, totals in aggregator.all_totals(now).items()
+        }
+        windows['coverage_seconds'] = aggregator.coverage_seconds(now)
+        return windows
@@ -11,11 +11,16 @@ BINANCE_SECRET = os.getenv('BINANCE_SECRET')
 
 # URLs da API
 BINANCE_FUTURES_URL = 'https://fapi.binance.com'
+BINANCE_SPOT_URL = 'https://api.binance.com'
+BINANCE_FUTURES_WS_URL = 'wss://fstream.binance.com'
+BINANCE_SPOT_WS_URL = 'wss://stream.binance.com:9443'
 BINANCE_US_URL = 'https://api.binance.us'
 COINGLASS_URL = 'https://open-api.coinglass.com'
 
 # Configurações do coletor
 SYMBOL = 'BTCUSDT'
+# Símbolos da coleta multi-símbolo (separados por vírgula)
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', SYMBOL).split(',') if s.strip()]
 TIMEFRAMES = {
     '15m': '15m',
     '1h': '1h',
@@ -28,6 +33,55 @@ MAX_RETRIES = 3
 INITIAL_BACKOFF = 1
 MAX_BACKOFF = 32
 
+# Orçamento de peso de requisições (por minuto, por IP)
+FUTURES_WEIGHT_LIMIT = 2400
+SPOT_WEIGHT_LIMIT = 6000
+RATE_LIMIT_SAFETY_MARGIN = 0.8  # Fração do limite que nos permitimos usar
+
+# Peso fixo por endpoint (padrão 1)
+ENDPOINT_WEIGHTS = {
+    '/fapi/v1/premiumIndex': 1,
+    '/fapi/v1/ticker/24hr': 1,
+    '/fapi/v1/aggTrades': 20,
+    '/futures/data/openInterestHist': 1,
+    '/api/v3/aggTrades': 4,
+}
+
+# Peso por faixa do parâmetro limit: [(limit_máximo, peso), ...]
+LIMIT_WEIGHT_TIERS = {
+    '/fapi/v1/depth': [(50, 2), (100, 5), (500, 10), (1000, 20)],
+    '/fapi/v1/klines': [(99, 1), (499, 2), (1000, 5), (1500, 10)],
+    '/api/v3/depth': [(100, 5), (500, 25), (1000, 50), (5000, 250)],
+}
+
+# Cache de respostas por endpoint (TTL em segundos; 0 = apenas coalescência
+# de requisições simultâneas idênticas)
+RESPONSE_CACHE_TTLS = {
+    '/fapi/v1/premiumIndex': 2,
+    '/fapi/v1/ticker/24hr': 5,
+    '/fapi/v1/aggTrades': 2,
+    '/futures/data/openInterestHist': 30,
+    '/api/v3/aggTrades': 2,
+}
+
+# Pool de conexões HTTP keep-alive (por host) e aquecimento na inicialização
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+HTTP_WARMUP_CONNECTIONS = int(os.getenv('HTTP_WARMUP_CONNECTIONS', '4'))
+
+# Configurações de coleta concorrente
+CONCURRENT_COLLECTION = os.getenv('CONCURRENT_COLLECTION', 'True').lower() == 'true'
+COLLECTOR_MAX_WORKERS = int(os.getenv('COLLECTOR_MAX_WORKERS', '12'))
+MULTI_SYMBOL_MAX_WORKERS = int(os.getenv('MULTI_SYMBOL_MAX_WORKERS', '24'))  # Pool compartilhado entre símbolos
+
+# Codec JSON: 'auto' usa orjson se instalado; 'json' força a biblioteca padrão
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto').lower()
+# Saída compacta (sem indentação) para consumo por máquinas
+JSON_COMPACT_OUTPUT = os.getenv('JSON_COMPACT_OUTPUT', 'False').lower() == 'true'
+# Compressão em streaming (biblioteca padrão): 'gzip', 'lzma' ou 'none'. Leituras detectam o formato
+SNAPSHOT_COMPRESSION = os.getenv('SNAPSHOT_COMPRESSION', 'none').lower()      # save_to_file e histórico de snapshots
+ATTACHMENT_COMPRESSION = os.getenv('ATTACHMENT_COMPRESSION', 'none').lower()  # JSON consolidado e anexos do email
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))  # gzip 1-9, lzma 0-9
+
 # Configurações de indicadores
 INDICATOR_PARAMS = {
     'SMA': [20, 50, 200],
@@ -38,6 +92,66 @@ INDICATOR_PARAMS = {
     'ATR': {'window': 14}
 }
 
+# Indicadores incrementais: estado mantido entre ciclos, O(1) por vela (EMAs/RSI/ATR
+# consideram todo o histórico desde o início do processo, não só a janela de candles)
+STREAMING_INDICATORS_ENABLED = os.getenv('STREAMING_INDICATORS_ENABLED', 'False').lower() == 'true'
+
+# Indicadores de todos os timeframes calculados em lote (NumPy), em vez de um ta por timeframe
+BATCH_INDICATORS_ENABLED = os.getenv('BATCH_INDICATORS_ENABLED', 'True').lower() == 'true'
+
 # Configurações de depth
 DEPTH_LEVELS = [0.5, 1.0, 2.0]  # Percentuais para cálculo de profundidade
-ORDER_BOOK_LIMIT = 20  # Número de níveis no top do book 
\ No newline at end of file
+ORDER_BOOK_LIMIT = 20  # Número de níveis no top do book 
+DEPTH_LADDER_BPS = [10, 25, 50, 100, 200, 300, 500]  # Escada de profundidade (base e USD) em pontos-base
+
+# Livro de ordens local via stream de diffs (<symbol>@depth@100ms)
+ORDER_BOOK_STREAM_ENABLED = os.getenv('ORDER_BOOK_STREAM_ENABLED', 'True').lower() == 'true'
+ORDER_BOOK_STREAM_SPEED = '100ms'
+ORDER_BOOK_SNAPSHOT_LIMIT = 1000  # Níveis do snapshot REST usado na sincronização
+ORDER_BOOK_REST_LIMIT = 500       # Níveis do snapshot REST no fallback
+ORDER_BOOK_MAX_STALENESS = 5      # Segundos sem eventos até considerar o livro desatualizado
+
+# Cache incremental de candles: após a carga inicial busca apenas candles a
+# partir do último timestamp (limit < 100 = peso 1)
+KLINE_CACHE_ENABLED = os.getenv('KLINE_CACHE_ENABLED', 'True').lower() == 'true'
+KLINE_INCREMENTAL_LIMIT = 99
+
+# Streams de candles (<symbol>@kline_<interval>) para todos os TIMEFRAMES:
+# com o stream ativo as janelas são lidas da memória, sem REST
+KLINE_STREAM_ENABLED = os.getenv('KLINE_STREAM_ENABLED', 'False').lower() == 'true'
+
+# CVD contínuo via streams <symbol>@aggTrade (perp e spot)
+TRADE_STREAM_ENABLED = os.getenv('TRADE_STREAM_ENABLED', 'True').lower() == 'true'
+CVD_WINDOWS = {'5m': 300, '1h': 3600, '4h': 14400, '24h': 86400}  # Segundos
+CVD_BUCKET_SECONDS = 10
+CVD_PRIMARY_WINDOW = '5m'  # Janela usada em perp_cvd/spot_cvd
+
+# Liquidações: janela deslizante de 24h em buckets de tempo
+LIQUIDATION_BUCKET_SECONDS = 60
+
+# Acima deste número de símbolos usa o stream de todo o mercado (!forceOrder@arr)
+# em vez de um <symbol>@forceOrder por símbolo
+LIQUIDATION_MAX_SYMBOL_STREAMS = 200
+
+# Journal em disco das liquidações (reinício sem perder a janela de 24h)
+LIQUIDATION_JOURNAL_ENABLED = os.getenv('LIQUIDATION_JOURNAL_ENABLED', 'True').lower() == 'true'
+LIQUIDATION_JOURNAL_PATH = os.getenv('LIQUIDATION_JOURNAL_PATH', 'data/liquidations_{symbol}.journal')
+
+# Histórico local de snapshots (segmentos append-only com índice)
+SNAPSHOT_STORE_DIR = os.getenv('SNAPSHOT_STORE_DIR', 'market_data_files/snapshots')
+SNAPSHOT_RETENTION_HOURS = float(os.getenv('SNAPSHOT_RETENTION_HOURS', '24'))  # 0 = sem limite de idade
+SNAPSHOT_RETENTION_COUNT = int(os.getenv('SNAPSHOT_RETENTION_COUNT', '0'))  # 0 = sem limite de quantidade
+SNAPSHOT_SEGMENT_MINUTES = int(os.getenv('SNAPSHOT_SEGMENT_MINUTES', '60'))
+# Snapshots mais recentes incluídos no JSON consolidado para IA
+CONSOLIDATED_SNAPSHOTS = int(os.getenv('CONSOLIDATED_SNAPSHOTS', '15'))
+# Inclui o snapshot original completo (raw_data_reference.full_data) no consolidado; dobra o tamanho
+CONSOLIDATED_INCLUDE_RAW = os.getenv('CONSOLIDATED_INCLUDE_RAW', 'False').lower() == 'true'
+# Candles fechados gravados uma vez em tabelas por intervalo; snapshots guardam só referências
+SNAPSHOT_NORMALIZE_CANDLES = os.getenv('SNAPSHOT_NORMALIZE_CANDLES', 'True').lower() == 'true'
+
+# Histórico do livro de ordens: keyframe completo periódico + deltas binários (só níveis alterados)
+ORDER_BOOK_RECORDER_ENABLED = os.getenv('ORDER_BOOK_RECORDER_ENABLED', 'False').lower() == 'true'
+ORDER_BOOK_RECORDER_DIR = os.getenv('ORDER_BOOK_RECORDER_DIR', 'data/order_book_{symbol}')
+ORDER_BOOK_KEYFRAME_SECONDS = float(os.getenv('ORDER_BOOK_KEYFRAME_SECONDS', '300'))
+ORDER_BOOK_SEGMENT_MINUTES = int(os.getenv('ORDER_BOOK_SEGMENT_MINUTES', '60'))
+ORDER_BOOK_RETENTION_HOURS = float(os.getenv('ORDER_BOOK_RETENTION_HOURS', '168'))  # 0 = sem limite
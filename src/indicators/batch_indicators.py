@@ -0,0 +1,146 @@
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Sequence, Union
+import numpy as np
+from .technical_indicators import TechnicalIndicators
+from ..utils.candle_array import CandleArray
+from ..config import INDICATOR_PARAMS
+
+# Indicadores de várias séries (timeframes e/ou símbolos) de uma vez.
+#
+# Séries de mesmo tamanho são empilhadas em matrizes (séries x candles) e cada
+# indicador é calculado para todas as linhas em uma única operação NumPy. Como
+# só o valor mais recente é usado, as recursões (EMA, suavização de Wilder) são
+# escritas na forma fechada: o último valor é um produto da série com um vetor
+# de pesos (ou, para a série inteira, com uma matriz triangular), com os mesmos
+# resultados do `ta` a menos de erro de ponto flutuante.
+
+@lru_cache(maxsize=64)
+def _ema_weights(alpha: float, length: int) -> np.ndarray:
+    """Pesos do último valor da EMA recursiva (adjust=False) semeada com o primeiro valor"""
+    decay = (1 - alpha) ** np.arange(length - 1, -1, -1)
+    weights = alpha * decay
+    weights[0] = decay[0]
+    weights.setflags(write=False)  # Compartilhado pelo cache
+    return weights
+
+@lru_cache(maxsize=16)
+def _ema_matrix(alpha: float, length: int) -> np.ndarray:
+    """Matriz (candles x candles) cuja linha t contém os pesos da EMA no candle t"""
+    index = np.arange(length)
+    lag = index[:, None] - index[None, :]
+    matrix = np.where(lag >= 0, alpha * (1 - alpha) ** np.maximum(lag, 0), 0.0)
+    matrix[:, 0] = (1 - alpha) ** index
+    matrix.setflags(write=False)  # Compartilhado pelo cache
+    return matrix
+
+def _ema_last(values: np.ndarray, span: int) -> Optional[np.ndarray]:
+    """Último valor da EMA de cada linha (None com menos de span candles)"""
+    if values.shape[1] < span:
+        return None
+    return values @ _ema_weights(2 / (span + 1), values.shape[1])
+
+def _ema_series(values: np.ndarray, span: int) -> np.ndarray:
+    """EMA completa de cada linha (sem aplicar o mínimo de períodos)"""
+    return values @ _ema_matrix(2 / (span + 1), values.shape[1]).T
+
+def _sma_last(values: np.ndarray, window: int) -> Optional[np.ndarray]:
+    if values.shape[1] < window:
+        return None
+    return values[:, -window:].mean(axis=1)
+
+def _rsi_last(close: np.ndarray, window: int) -> Optional[np.ndarray]:
+    if close.shape[1] < window:
+        return None
+    # Primeira variação conta como zero, como no ta
+    diff = np.diff(close, axis=1, prepend=close[:, :1])
+    weights = _ema_weights(1 / window, close.shape[1])
+    ema_up = np.where(diff > 0, diff, 0.0) @ weights
+    ema_down = np.where(diff < 0, -diff, 0.0) @ weights
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+
+def _atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int) -> np.ndarray:
+    length = close.shape[1]
+    if length < window:
+        return np.zeros(close.shape[0])
+    prev_close = close[:, :-1]
+    true_range = high - low
+    true_range[:, 1:] = np.maximum.reduce([
+        true_range[:, 1:], np.abs(high[:, 1:] - prev_close), np.abs(low[:, 1:] - prev_close)
+    ])
+    # atr[w-1] = média dos w primeiros TR; depois suavização de Wilder (alpha = 1/w)
+    seed = true_range[:, :window].mean(axis=1)
+    tail = true_range[:, window - 1:]
+    tail[:, 0] = seed
+    return tail @ _ema_weights(1 / window, tail.shape[1])
+
+def _latest_group(close: np.ndarray, high: np.ndarray, low: np.ndarray) -> List[Dict[str, Dict[str, Optional[float]]]]:
+    """Valores mais recentes de todos os indicadores para um grupo de séries de mesmo tamanho"""
+    rows, length = close.shape
+    columns: Dict[str, Dict[str, Optional[np.ndarray]]] = {'sma': {}, 'ema': {}, 'rsi': {}}
+
+    for period in INDICATOR_PARAMS['SMA']:
+        columns['sma'][f'sma_{period}'] = _sma_last(close, period)
+    for period in INDICATOR_PARAMS['EMA']:
+        columns['ema'][f'ema_{period}'] = _ema_last(close, period)
+    for period in INDICATOR_PARAMS['RSI']:
+        columns['rsi'][f'rsi_{period}'] = _rsi_last(close, period)
+
+    # MACD: linha completa a partir das EMAs, sinal = EMA da linha desde o primeiro valor válido
+    macd_params = INDICATOR_PARAMS['MACD']
+    macd = signal = None
+    if length >= macd_params['slow']:
+        line = _ema_series(close, macd_params['fast']) - _ema_series(close, macd_params['slow'])
+        macd = line[:, -1]
+        signal = _ema_last(line[:, macd_params['slow'] - 1:], macd_params['signal'])
+    columns['macd'] = {
+        'macd': macd,
+        'macd_signal': signal,
+        'macd_hist': macd - signal if signal is not None else None
+    }
+
+    bb_params = INDICATOR_PARAMS['BB']
+    if length >= bb_params['window']:
+        window = close[:, -bb_params['window']:]
+        middle = window.mean(axis=1)
+        std = window.std(axis=1)  # ddof=0, como no ta
+        upper = middle + bb_params['std'] * std
+        lower = middle - bb_params['std'] * std
+        columns['bollinger'] = {'bb_upper': upper, 'bb_middle': middle, 'bb_lower': lower,
+                                'bb_width': (upper - lower) / middle}
+    else:
+        columns['bollinger'] = dict.fromkeys(('bb_upper', 'bb_middle', 'bb_lower', 'bb_width'))
+
+    columns['atr'] = {'atr': _atr_last(high, low, close, INDICATOR_PARAMS['ATR']['window'])}
+
+    return [
+        {
+            category: {name: (None if column is None else float(column[row])) for name, column in values.items()}
+            for category, values in columns.items()
+        }
+        for row in range(rows)
+    ]
+
+def batch_latest_values(klines_by_key: Dict[Hashable, Union[CandleArray, Sequence[Sequence[float]]]]) -> Dict[Hashable, Dict]:
+    """
+    Indicadores mais recentes de várias séries de candles (CandleArray ou
+    listas [open, high, low, close, volume, timestamp]), ex.: um timeframe por
+    chave, ou (símbolo, timeframe). Retorna, por chave, o mesmo formato de
+    TechnicalIndicators.get_latest_values.
+    """
+    series = {key: CandleArray.coerce(klines) for key, klines in klines_by_key.items()}
+    groups: Dict[int, List[Hashable]] = {}
+    for key, candles in series.items():
+        if len(candles) == 0:
+            raise ValueError(f"Série sem candles: {key}")
+        groups.setdefault(len(candles), []).append(key)
+
+    latest = {}
+    for length, keys in groups.items():
+        # Matrizes (séries x candles) de um grupo de mesmo tamanho, empilhando as colunas
+        group = _latest_group(np.stack([series[key].close for key in keys]),
+                              np.stack([series[key].high for key in keys]),
+                              np.stack([series[key].low for key in keys]))
+        for key, values in zip(keys, group):
+            latest[key] = TechnicalIndicators.format_latest(values, length)
+    return {key: latest[key] for key in klines_by_key}
@@ -0,0 +1,272 @@
+import math
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..config import INDICATOR_PARAMS
+
+class _RollingWindow:
+    """
+    Média e desvio padrão (ddof=0) de uma janela fixa com somas correntes.
+
+    As somas são deslocadas por um valor de referência (evita cancelamento
+    numérico com preços altos) e recalculadas do zero a cada `window`
+    atualizações, o que mantém o custo O(1) amortizado sem acumular erro.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self._recompute()
+
+    def _recompute(self):
+        self.shift = self.values[0] if self.values else 0.0
+        self.sum = sum(value - self.shift for value in self.values)
+        self.sum_sq = sum((value - self.shift) ** 2 for value in self.values)
+        self.updates = 0
+
+    def update(self, value: float):
+        if len(self.values) == self.window:
+            leaving = self.values[0] - self.shift
+            self.sum -= leaving
+            self.sum_sq -= leaving * leaving
+        self.values.append(value)
+        self.sum += value - self.shift
+        self.sum_sq += (value - self.shift) ** 2
+        self.updates += 1
+        if self.updates >= self.window:
+            self._recompute()
+
+    def peek(self, value: float) -> Optional[Tuple[float, float]]:
+        """(média, desvio) da janela se `value` fosse o próximo valor; None sem dados suficientes"""
+        if len(self.values) + 1 < self.window:
+            return None
+        total = self.sum + (value - self.shift)
+        total_sq = self.sum_sq + (value - self.shift) ** 2
+        if len(self.values) == self.window:
+            leaving = self.values[0] - self.shift
+            total -= leaving
+            total_sq -= leaving * leaving
+        mean = total / self.window
+        variance = max(total_sq / self.window - mean * mean, 0.0)
+        return self.shift + mean, math.sqrt(variance)
+
+class _Ema:
+    """EMA recursiva (pandas ewm adjust=False) semeada com o primeiro valor"""
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value: Optional[float] = None
+        self.count = 0
+
+    def _next(self, value: float) -> float:
+        if self.value is None:
+            return value
+        return (1 - self.alpha) * self.value + self.alpha * value
+
+    def update(self, value: float):
+        self.value = self._next(value)
+        self.count += 1
+
+    def peek(self, value: float) -> Optional[float]:
+        if self.count + 1 < self.min_periods:
+            return None
+        return self._next(value)
+
+    def current(self) -> Optional[float]:
+        return self.value if self.count >= self.min_periods else None
+
+class _Rsi:
+    """RSI com suavização de Wilder (ta.momentum.rsi)"""
+
+    def __init__(self, window: int):
+        self.up = _Ema(1 / window, window)
+        self.down = _Ema(1 / window, window)
+        self.prev_close: Optional[float] = None
+
+    def _moves(self, close: float) -> Tuple[float, float]:
+        # Primeira variação (sem fechamento anterior) conta como zero, como no ta
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        return (diff if diff > 0 else 0.0), (-diff if diff < 0 else 0.0)
+
+    def update(self, close: float):
+        up, down = self._moves(close)
+        self.up.update(up)
+        self.down.update(down)
+        self.prev_close = close
+
+    def peek(self, close: float) -> Optional[float]:
+        up, down = self._moves(close)
+        ema_up, ema_down = self.up.peek(up), self.down.peek(down)
+        if ema_up is None:
+            return None
+        if ema_down == 0:
+            return 100.0
+        return 100 - 100 / (1 + ema_up / ema_down)
+
+class _Atr:
+    """ATR de Wilder (ta.volatility.average_true_range): zero até completar a janela"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.tr_sum = 0.0
+        self.value = 0.0
+        self.prev_close: Optional[float] = None
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def _next(self, true_range: float) -> float:
+        count = self.count + 1
+        if count < self.window:
+            return 0.0
+        if count == self.window:
+            return (self.tr_sum + true_range) / self.window
+        return (self.value * (self.window - 1) + true_range) / self.window
+
+    def update(self, high: float, low: float, close: float):
+        true_range = self._true_range(high, low)
+        self.value = self._next(true_range)
+        if self.count < self.window:
+            self.tr_sum += true_range
+        self.count += 1
+        self.prev_close = close
+
+    def peek(self, high: float, low: float) -> float:
+        return self._next(self._true_range(high, low))
+
+class StreamingIndicators:
+    """
+    Motor incremental dos indicadores de TechnicalIndicators (mesmos parâmetros
+    de INDICATOR_PARAMS e mesmos resultados do `ta`, a menos de erro de ponto
+    flutuante, sobre a série de candles consumida).
+
+    O estado das velas fechadas (somas de janela, EMAs, suavização de Wilder)
+    é atualizado em O(1) por vela; a vela em formação não altera o estado: os
+    valores mais recentes são calculados a partir dele sob demanda, também em
+    O(1), e ela só é incorporada quando a próxima vela abre. O custo não
+    depende do tamanho das janelas.
+    """
+
+    def __init__(self):
+        sma_windows = set(INDICATOR_PARAMS['SMA']) | {INDICATOR_PARAMS['BB']['window']}
+        self.windows = {window: _RollingWindow(window) for window in sma_windows}
+
+        macd = INDICATOR_PARAMS['MACD']
+        ema_spans = set(INDICATOR_PARAMS['EMA']) | {macd['fast'], macd['slow']}
+        self.emas = {span: _Ema(2 / (span + 1), span) for span in ema_spans}
+        self.macd_signal = _Ema(2 / (macd['signal'] + 1), macd['signal'])
+
+        self.rsis = {window: _Rsi(window) for window in INDICATOR_PARAMS['RSI']}
+        self.atr = _Atr(INDICATOR_PARAMS['ATR']['window'])
+
+        self.closed_count = 0
+        self.forming: Optional[List] = None  # [open, high, low, close, volume, timestamp]
+
+    def __len__(self) -> int:
+        """Número de velas consumidas (fechadas + em formação)"""
+        return self.closed_count + (self.forming is not None)
+
+    def _macd_line(self, fast: Optional[float], slow: Optional[float]) -> Optional[float]:
+        if fast is None or slow is None:
+            return None
+        return fast - slow
+
+    def _commit(self, candle: Sequence):
+        """Incorpora uma vela fechada ao estado"""
+        high, low, close = float(candle[1]), float(candle[2]), float(candle[3])
+        for window in self.windows.values():
+            window.update(close)
+        for ema in self.emas.values():
+            ema.update(close)
+        macd = INDICATOR_PARAMS['MACD']
+        line = self._macd_line(self.emas[macd['fast']].current(), self.emas[macd['slow']].current())
+        if line is not None:
+            self.macd_signal.update(line)
+        for rsi in self.rsis.values():
+            rsi.update(close)
+        self.atr.update(high, low, close)
+        self.closed_count += 1
+
+    def update(self, candle: Sequence):
+        """
+        Atualiza com uma vela [open, high, low, close, volume, timestamp]: mesmo
+        timestamp da vela em formação substitui a vela; timestamp maior fecha a
+        vela em formação e abre a nova.
+        """
+        if self.forming is not None and candle[5] < self.forming[5]:
+            raise ValueError("Vela anterior à vela em formação")
+        if self.forming is not None and candle[5] > self.forming[5]:
+            self._commit(self.forming)
+        self.forming = list(candle)
+
+    def reset(self):
+        self.__init__()
+
+    def sync(self, candles: Sequence[Sequence]):
+        """
+        Consome uma janela de candles (a última é a vela em formação), aplicando
+        apenas as velas a partir da vela em formação conhecida. Se a janela não
+        a contém (primeira chamada ou lacuna), recomeça a partir da janela.
+        """
+        if not candles:
+            return
+        start = None
+        if self.forming is not None:
+            forming_ts = self.forming[5]
+            for i in range(len(candles) - 1, -1, -1):
+                if candles[i][5] == forming_ts:
+                    start = i
+                    break
+                if candles[i][5] < forming_ts:
+                    break
+        if start is None:
+            self.reset()
+            start = 0
+        for candle in candles[start:]:
+            self.update(candle)
+
+    def latest(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Valores de todos os indicadores na vela mais recente (None sem dados suficientes)"""
+        if self.forming is None:
+            raise ValueError("Nenhuma vela consumida")
+        high, low, close = float(self.forming[1]), float(self.forming[2]), float(self.forming[3])
+
+        def mean(window: int) -> Optional[float]:
+            stats = self.windows[window].peek(close)
+            return stats[0] if stats else None
+
+        macd_params = INDICATOR_PARAMS['MACD']
+        macd_line = self._macd_line(self.emas[macd_params['fast']].peek(close),
+                                    self.emas[macd_params['slow']].peek(close))
+        macd_signal = self.macd_signal.peek(macd_line) if macd_line is not None else None
+
+        bb_params = INDICATOR_PARAMS['BB']
+        bb_stats = self.windows[bb_params['window']].peek(close)
+        if bb_stats:
+            bb_middle, bb_std = bb_stats
+            bb_upper = bb_middle + bb_params['std'] * bb_std
+            bb_lower = bb_middle - bb_params['std'] * bb_std
+            bollinger = {
+                'bb_upper': bb_upper,
+                'bb_middle': bb_middle,
+                'bb_lower': bb_lower,
+                'bb_width': (bb_upper - bb_lower) / bb_middle
+            }
+        else:
+            bollinger = dict.fromkeys(('bb_upper', 'bb_middle', 'bb_lower', 'bb_width'))
+
+        return {
+            'sma': {f'sma_{period}': mean(period) for period in INDICATOR_PARAMS['SMA']},
+            'ema': {f'ema_{period}': self.emas[period].peek(close) for period in INDICATOR_PARAMS['EMA']},
+            'rsi': {f'rsi_{period}': self.rsis[period].peek(close) for period in INDICATOR_PARAMS['RSI']},
+            'macd': {
+                'macd': macd_line,
+                'macd_signal': macd_signal,
+                'macd_hist': macd_line - macd_signal if macd_signal is not None else None
+            },
+            'bollinger': bollinger,
+            'atr': {'atr': self.atr.peek(high, low)}
+        }
@@ -1,17 +1,95 @@
 import pandas as pd
-import numpy as np
 import ta
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 from ..config import INDICATOR_PARAMS
 
+class IndicatorSpec(NamedTuple):
+    """Nó do registro de indicadores: categoria de saída (None = intermediário), dependências e cálculo"""
+    category: Optional[str]
+    dependencies: Tuple[str, ...]
+    compute: Callable[..., Any]
+
+def _build_registry() -> Dict[str, IndicatorSpec]:
+    """
+    Registro de indicadores a partir de INDICATOR_PARAMS, na ordem de saída.
+    Cada cálculo recebe a instância e os valores das dependências.
+    """
+    registry: Dict[str, IndicatorSpec] = {}
+
+    def register(name: str, category: Optional[str], compute: Callable, *dependencies: str):
+        registry[name] = IndicatorSpec(category, dependencies, compute)
+
+    for period in INDICATOR_PARAMS['SMA']:
+        register(f'sma_{period}', 'sma',
+                 lambda ind, period=period: ta.trend.sma_indicator(ind.close, window=period))
+
+    # EMAs das médias configuradas e das pernas do MACD (intermediárias se não configuradas)
+    macd_params = INDICATOR_PARAMS['MACD']
+    ema_periods = list(INDICATOR_PARAMS['EMA'])
+    ema_periods += [p for p in (macd_params['fast'], macd_params['slow']) if p not in ema_periods]
+    for period in ema_periods:
+        register(f'ema_{period}', 'ema' if period in INDICATOR_PARAMS['EMA'] else None,
+                 lambda ind, period=period: ta.trend.ema_indicator(ind.close, window=period))
+
+    for period in INDICATOR_PARAMS['RSI']:
+        register(f'rsi_{period}', 'rsi',
+                 lambda ind, period=period: ta.momentum.rsi(ind.close, window=period))
+
+    # MACD a partir das EMAs compartilhadas (mesmo cálculo de ta.trend.MACD)
+    register('macd', 'macd', lambda ind, fast, slow: fast - slow,
+             f"ema_{macd_params['fast']}", f"ema_{macd_params['slow']}")
+    register('macd_signal', 'macd',
+             lambda ind, macd: ta.trend.ema_indicator(macd, window=macd_params['signal']), 'macd')
+    register('macd_hist', 'macd', lambda ind, macd, signal: macd - signal, 'macd', 'macd_signal')
+
+    # Bandas calculadas uma única vez e reutilizadas pela largura
+    bb_params = INDICATOR_PARAMS['BB']
+    register('_bollinger', None, lambda ind: ta.volatility.BollingerBands(
+        ind.close, window=bb_params['window'], window_dev=bb_params['std']))
+    register('bb_upper', 'bollinger', lambda ind, bb: bb.bollinger_hband(), '_bollinger')
+    register('bb_middle', 'bollinger', lambda ind, bb: bb.bollinger_mavg(), '_bollinger')
+    register('bb_lower', 'bollinger', lambda ind, bb: bb.bollinger_lband(), '_bollinger')
+    register('bb_width', 'bollinger', lambda ind, upper, lower, middle: (upper - lower) / middle,
+             'bb_upper', 'bb_lower', 'bb_middle')
+
+    register('atr', 'atr', lambda ind: ta.volatility.average_true_range(
+        ind.high, ind.low, ind.close, window=INDICATOR_PARAMS['ATR']['window']))
+    return registry
+
 class TechnicalIndicators:
+    # Indicadores disponíveis e suas dependências; avaliados sob demanda
+    registry: Dict[str, IndicatorSpec] = _build_registry()
+
     def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+        # Sem cópia: os indicadores só leem as colunas
+        self.df = df
         self.close = df['close']
         self.high = df['high']
         self.low = df['low']
         self.volume = df['volume']
         self.open = df['open']
+        # Séries já calculadas (saídas e intermediários)
+        self._computed: Dict[str, pd.Series] = {}
+
+    @classmethod
+    def outputs(cls, category: Optional[str] = None) -> List[str]:
+        """Nomes das saídas registradas (opcionalmente de uma categoria), na ordem de saída"""
+        return [
+            name for name, spec in cls.registry.items()
+            if spec.category is not None and (category is None or spec.category == category)
+        ]
+
+    def _evaluate(self, name: str) -> Any:
+        """Calcula um nó do registro (e suas dependências) uma única vez"""
+        if name not in self._computed:
+            spec = self.registry[name]
+            dependencies = [self._evaluate(dependency) for dependency in spec.dependencies]
+            self._computed[name] = spec.compute(self, *dependencies)
+        return self._computed[name]
+
+    def compute(self, names: Iterable[str]) -> Dict[str, pd.Series]:
+        """Calcula apenas as saídas pedidas e os intermediários de que dependem"""
+        return {name: self._evaluate(name) for name in names}
 
     def calculate_all(self) -> Dict:
         """Calcula todos os indicadores técnicos"""
@@ -26,76 +104,46 @@ class TechnicalIndicators:
 
     def calculate_sma(self) -> Dict[str, pd.Series]:
         """Calcula SMAs para diferentes períodos"""
-        return {
-            f'sma_{period}': ta.trend.sma_indicator(self.close, window=period)
-            for period in INDICATOR_PARAMS['SMA']
-        }
+        return self.compute(self.outputs('sma'))
 
     def calculate_ema(self) -> Dict[str, pd.Series]:
         """Calcula EMAs para diferentes períodos"""
-        return {
-            f'ema_{period}': ta.trend.ema_indicator(self.close, window=period)
-            for period in INDICATOR_PARAMS['EMA']
-        }
+        return self.compute(self.outputs('ema'))
 
     def calculate_rsi(self) -> Dict[str, pd.Series]:
         """Calcula RSI"""
-        return {
-            f'rsi_{period}': ta.momentum.rsi(self.close, window=period)
-            for period in INDICATOR_PARAMS['RSI']
-        }
+        return self.compute(self.outputs('rsi'))
 
     def calculate_macd(self) -> Dict[str, pd.Series]:
         """Calcula MACD"""
-        params = INDICATOR_PARAMS['MACD']
-        macd = ta.trend.MACD(
-            self.close,
-            window_fast=params['fast'],
-            window_slow=params['slow'],
-            window_sign=params['signal']
-        )
-        
-        return {
-            'macd': macd.macd(),
-            'macd_signal': macd.macd_signal(),
-            'macd_hist': macd.macd_diff()
-        }
+        return self.compute(self.outputs('macd'))
 
     def calculate_bollinger(self) -> Dict[str, pd.Series]:
         """Calcula Bollinger Bands"""
-        params = INDICATOR_PARAMS['BB']
-        bollinger = ta.volatility.BollingerBands(
-            self.close,
-            window=params['window'],
-            window_dev=params['std']
-        )
-        
-        return {
-            'bb_upper': bollinger.bollinger_hband(),
-            'bb_middle': bollinger.bollinger_mavg(),
-            'bb_lower': bollinger.bollinger_lband(),
-            'bb_width': (bollinger.bollinger_hband() - bollinger.bollinger_lband()) / bollinger.bollinger_mavg()
-        }
+        return self.compute(self.outputs('bollinger'))
 
     def calculate_atr(self) -> Dict[str, pd.Series]:
         """Calcula ATR"""
-        params = INDICATOR_PARAMS['ATR']
-        return {
-            'atr': ta.volatility.average_true_range(
-                self.high,
-                self.low,
-                self.close,
-                window=params['window']
-            )
-        }
+        return self.compute(self.outputs('atr'))
 
     def get_latest_values(self) -> Dict:
         """Retorna os valores mais recentes de todos os indicadores"""
-        indicators = self.calculate_all()
-        latest = {}
-        
-        # Verifica quantos dados temos disponíveis
         data_length = len(self.df)
+        # sma_200 é descartada com menos de 200 períodos: nem chega a ser calculada
+        names = [name for name in self.outputs() if data_length >= 200 or name != 'sma_200']
+
+        values: Dict[str, Dict[str, Any]] = {}
+        for name, series in self.compute(names).items():
+            values.setdefault(self.registry[name].category, {})[name] = series.iloc[-1]
+        return self.format_latest(values, data_length)
+
+    @staticmethod
+    def format_latest(values: Dict[str, Dict[str, Optional[float]]], data_length: int) -> Dict:
+        """
+        Monta o dicionário de saída a partir do último valor de cada indicador
+        (NaN/None = dados insuficientes). Também usado pelo motor incremental.
+        """
+        latest = {}
         
         # Lista de indicadores que devem sempre estar presentes (mesmo que null)
         required_indicators = {
@@ -112,20 +160,18 @@ class TechnicalIndicators:
             required_indicators['sma'].append('sma_200')
             # EMA 50 é suficiente, não precisamos de EMA 200 para timeframes curtos
         
-        for category, values in indicators.items():
+        for category, category_values in values.items():
             latest[category] = {}
             
             # Primeiro, adiciona todos os valores calculados
-            for name, series in values.items():
+            for name, value in category_values.items():
                 # Só inclui se está na lista de obrigatórios ou se temos dados suficientes
                 if category in required_indicators and name in required_indicators[category]:
-                    value = series.iloc[-1]
                     if pd.notna(value):
                         latest[category][name] = float(value)
                     else:
                         latest[category][name] = None
                 elif name not in ['sma_200']:  # Inclui outros indicadores normalmente
-                    value = series.iloc[-1]
                     if pd.notna(value):
                         latest[category][name] = float(value)
             
@@ -135,4 +181,4 @@ class TechnicalIndicators:
                     if required_name not in latest[category]:
                         latest[category][required_name] = None
         
-        return latest 
\ No newline at end of file
+        return latest
@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Dict
+
+def calculate_volume_profile(high: np.ndarray, low: np.ndarray, volume: np.ndarray,
+                             bins: int = 50, value_area_pct: float = 0.7) -> Dict[str, float]:
+    """
+    Perfil de volume vetorizado: POC, VAH e VAL.
+
+    O volume de cada vela é distribuído uniformemente entre low e high, pela
+    fração da vela que sobrepõe cada faixa de preço (bins - 1 faixas entre o
+    menor low e o maior high). A matriz velas x faixas é calculada em uma
+    única passada NumPy. POC é a faixa de maior volume; a value area soma as
+    faixas em ordem decrescente de volume até value_area_pct do total.
+
+    Desempates e somas seguem a mesma ordem da implementação iterativa
+    anterior (faixas na ordem em que foram tocadas pela primeira vez), de
+    modo que POC/VAH/VAL são idênticos.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    if len(high) < 2:
+        return {"poc": 0, "vah": 0, "val": 0}
+
+    # Cria faixas de preço
+    edges = np.linspace(low.min(), high.max(), bins)
+    bin_low = edges[:-1]
+    bin_high = edges[1:]
+    bin_mid = (bin_low + bin_high) / 2
+
+    # Sobreposição vela x faixa (só velas com amplitude > 0)
+    candle_range = high - low
+    valid = candle_range > 0
+    high, low, volume, candle_range = high[valid], low[valid], volume[valid], candle_range[valid]
+    touched = (bin_low <= high[:, None]) & (bin_high >= low[:, None])
+    if not touched.any():
+        return {"poc": 0, "vah": 0, "val": 0}
+
+    overlap = np.minimum(bin_high, high[:, None]) - np.maximum(bin_low, low[:, None])
+    contribution = np.where(touched, volume[:, None] * (overlap / candle_range[:, None]), 0.0)
+    # Redução no eixo das velas: soma sequencial por faixa, na ordem das velas
+    profile = contribution.sum(axis=0)
+
+    # Faixas tocadas, ordenadas pela primeira vela que as tocou (ordem de desempate)
+    hit = touched.any(axis=0)
+    first_touch = np.argmax(touched, axis=0)
+    order = np.lexsort((np.arange(len(bin_mid)), first_touch))
+    order = order[hit[order]]
+    prices = bin_mid[order]
+    volumes = profile[order]
+
+    # POC (Point of Control): primeira faixa com o maior volume
+    poc_price = prices[np.argmax(volumes)]
+
+    # Value Area: faixas por volume decrescente até atingir o percentual do total
+    target_volume = np.cumsum(volumes)[-1] * value_area_pct
+    by_volume = np.argsort(-volumes, kind='stable')
+    reached = np.cumsum(volumes[by_volume]) >= target_volume
+    count = int(np.argmax(reached)) + 1 if reached.any() else len(by_volume)
+    value_area_prices = prices[by_volume[:count]]
+
+    return {
+        "poc": float(poc_price),
+        "vah": float(value_area_prices.max()),
+        "val": float(value_area_prices.min())
+    }
@@ -1,143 +1,90 @@
-import json
-from datetime import datetime, timezone, timedelta
-import pandas as pd
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Callable, Optional
 import logging
 import numpy as np
 
 from .collectors.binance_futures_collector import BinanceFuturesCollector
 from .indicators.technical_indicators import TechnicalIndicators
-from .config import SYMBOL, TIMEFRAMES, USE_BINANCE_US
+from .indicators.streaming_indicators import StreamingIndicators
+from .indicators.batch_indicators import batch_latest_values
+from .indicators.volume_profile import calculate_volume_profile
+from .utils import json_codec
+from .utils.compression import SUFFIXES, method_name
+from .utils.candle_array import CandleArray
+from .config import (SYMBOL, TIMEFRAMES, CONCURRENT_COLLECTION,
+                     COLLECTOR_MAX_WORKERS, JSON_COMPACT_OUTPUT, STREAMING_INDICATORS_ENABLED,
+                     BATCH_INDICATORS_ENABLED, SNAPSHOT_COMPRESSION, COMPRESSION_LEVEL)
 
 class MarketDataCollector:
-    def __init__(self):
+    def __init__(self, concurrent: bool = CONCURRENT_COLLECTION, max_workers: int = COLLECTOR_MAX_WORKERS,
+                 symbol: str = SYMBOL, collector: Optional[BinanceFuturesCollector] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
         self.logger = logging.getLogger(__name__)
-        self.collector = BinanceFuturesCollector()
-        self.symbol = SYMBOL
+        self.collector = collector if collector is not None else BinanceFuturesCollector(symbol)
+        self.symbol = self.collector.symbol
         # Cache para armazenar histórico de funding e delta volume
         self.funding_history = []
         self.delta_volume_cumulative = []
+        # Motores incrementais de indicadores por timeframe (opcional)
+        self.streaming_indicators: Optional[Dict[str, StreamingIndicators]] = (
+            {} if STREAMING_INDICATORS_ENABLED else None
+        )
 
-    def _create_dataframe(self, klines: list) -> pd.DataFrame:
-        """Converte lista de candles em DataFrame"""
-        df = pd.DataFrame(klines, columns=['open', 'high', 'low', 'close', 'volume', 'timestamp'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = df[col].astype(float)
-        return df
+        # Modo concorrente: pool limitado reutilizado entre ciclos
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        # Pool pode ser compartilhado entre coletores (ver MultiSymbolCollector)
+        self._executor: Optional[ThreadPoolExecutor] = executor
+        # Tempos (ms) por estágio da última coleta
+        self.last_stage_timings: Dict[str, float] = {}
 
-    def _calculate_vwap(self, df: pd.DataFrame, periods: int = None) -> float:
+    def _calculate_vwap(self, candles: CandleArray, periods: int = None) -> float:
         """Calcula VWAP para um período específico"""
-        if periods and len(df) > periods:
-            df = df.tail(periods)
+        if periods and len(candles) > periods:
+            candles = candles.tail(periods)
         
         # VWAP = (∑(price × volume)) / ∑volume
-        typical_price = (df['high'] + df['low'] + df['close']) / 3
-        vwap = (typical_price * df['volume']).sum() / df['volume'].sum()
+        typical_price = (candles.high + candles.low + candles.close) / 3
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = (typical_price * candles.volume).sum() / candles.volume.sum()
         return float(vwap)
 
-    def _calculate_volume_profile(self, df: pd.DataFrame, bins: int = 50) -> Dict:
+    def _calculate_volume_profile(self, candles: CandleArray, bins: int = 50, value_area_pct: float = 0.7) -> Dict:
         """Calcula perfil de volume para determinar POC, VAH, VAL"""
-        if len(df) < 2:
-            return {"poc": 0, "vah": 0, "val": 0}
-        
-        # Cria faixas de preço
-        price_min = df['low'].min()
-        price_max = df['high'].max()
-        price_bins = np.linspace(price_min, price_max, bins)
-        
-        # Distribui volume por faixa de preço
-        volume_profile = {}
-        for i, row in df.iterrows():
-            # Distribui o volume da vela proporcionalmente entre high e low
-            candle_range = row['high'] - row['low']
-            if candle_range > 0:
-                for bin_idx in range(len(price_bins) - 1):
-                    bin_low = price_bins[bin_idx]
-                    bin_high = price_bins[bin_idx + 1]
-                    bin_mid = (bin_low + bin_high) / 2
-                    
-                    # Verifica se o bin intersecta com a vela
-                    if bin_low <= row['high'] and bin_high >= row['low']:
-                        # Calcula sobreposição
-                        overlap_low = max(bin_low, row['low'])
-                        overlap_high = min(bin_high, row['high'])
-                        overlap_ratio = (overlap_high - overlap_low) / candle_range
-                        
-                        if bin_mid not in volume_profile:
-                            volume_profile[bin_mid] = 0
-                        volume_profile[bin_mid] += row['volume'] * overlap_ratio
-        
-        if not volume_profile:
-            return {"poc": 0, "vah": 0, "val": 0}
-        
-        # Encontra POC (Point of Control) - preço com maior volume
-        poc_price = max(volume_profile, key=volume_profile.get)
-        
-        # Calcula Value Area (70% do volume)
-        total_volume = sum(volume_profile.values())
-        target_volume = total_volume * 0.7
-        
-        # Ordena por volume para encontrar value area
-        sorted_prices = sorted(volume_profile.items(), key=lambda x: x[1], reverse=True)
-        
-        value_area_volume = 0
-        value_area_prices = []
-        
-        for price, volume in sorted_prices:
-            value_area_volume += volume
-            value_area_prices.append(price)
-            if value_area_volume >= target_volume:
-                break
-        
-        vah = max(value_area_prices) if value_area_prices else poc_price
-        val = min(value_area_prices) if value_area_prices else poc_price
-        
-        return {
-            "poc": float(poc_price),
-            "vah": float(vah),
-            "val": float(val)
-        }
+        return calculate_volume_profile(
+            candles.high,
+            candles.low,
+            candles.volume,
+            bins=bins,
+            value_area_pct=value_area_pct
+        )
 
-    def _detect_absorption(self, candle: List, cvd_change: float) -> bool:
-        """Detecta absorção em uma vela"""
-        try:
-            open_price, high, low, close, volume = candle[:5]
-            
-            # Critérios para absorção:
-            # 1. Alto volume (acima da média)
-            # 2. CVD contrário à direção do candle
-            # 3. Pavio >= 50% da vela
-            
-            body_size = abs(close - open_price)
-            candle_range = high - low
-            
-            # Verifica se tem pavio significativo
-            if candle_range > 0:
-                if close > open_price:  # Candle verde
-                    upper_wick = high - close
-                    lower_wick = open_price - low
-                    max_wick = max(upper_wick, lower_wick)
-                    wick_ratio = max_wick / candle_range
-                    
-                    # Absorção em candle verde: CVD negativo + pavio >= 50%
-                    if cvd_change < 0 and wick_ratio >= 0.5:
-                        return True
-                        
-                else:  # Candle vermelho
-                    upper_wick = high - open_price
-                    lower_wick = close - low
-                    max_wick = max(upper_wick, lower_wick)
-                    wick_ratio = max_wick / candle_range
-                    
-                    # Absorção em candle vermelho: CVD positivo + pavio >= 50%
-                    if cvd_change > 0 and wick_ratio >= 0.5:
-                        return True
-            
-            return False
-            
-        except:
-            return False
+    def _detect_absorption(self, candles: CandleArray, cvd_changes: List[float]) -> np.ndarray:
+        """Detecta absorção em cada vela (cvd_changes alinhado às velas; faltantes contam como 0)"""
+        # Critérios para absorção:
+        # 1. Alto volume (acima da média)
+        # 2. CVD contrário à direção do candle
+        # 3. Pavio >= 50% da vela
+        cvd = np.zeros(len(candles))
+        count = min(len(cvd_changes), len(candles))
+        cvd[:count] = np.asarray(cvd_changes[:count], dtype=float)
+
+        open_price, high, low, close = candles.open, candles.high, candles.low, candles.close
+        candle_range = high - low
+        green = close > open_price
+
+        # Maior pavio: verde (high - close, open - low); vermelho (high - open, close - low)
+        max_wick = np.where(green,
+                            np.maximum(high - close, open_price - low),
+                            np.maximum(high - open_price, close - low))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            long_wick = (candle_range > 0) & (max_wick / candle_range >= 0.5)
+
+        # Absorção: CVD negativo em candle verde, positivo em candle vermelho
+        against_cvd = np.where(green, cvd < 0, cvd > 0)
+        return long_wick & against_cvd
 
     def _calculate_imbalance_score(self, order_book: Dict, current_price: float) -> float:
         """Calcula score de imbalance baseado na posição do preço no spread"""
@@ -179,160 +126,265 @@ class MarketDataCollector:
         if len(self.delta_volume_cumulative) > 50:
             self.delta_volume_cumulative = self.delta_volume_cumulative[-50:]
 
-    def collect_market_data(self) -> Dict[str, Any]:
-        """Coleta todos os dados de mercado e retorna JSON formatado"""
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Cria (uma única vez) o pool de threads usado no modo concorrente"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='market-data'
+            )
+        return self._executor
+
+    def _timed(self, name: str, func: Callable, timings: Dict[str, float]) -> Any:
+        """Executa um estágio registrando seu tempo em ms"""
+        start = time.perf_counter()
         try:
-            # Coleta dados básicos
-            current_price = self.collector.get_current_price()
-            order_book = self.collector.get_order_book()
-            volume_stats = self.collector.get_volume_stats()
-            funding_data = self.collector.get_funding_rate()
-            open_interest = self.collector.get_open_interest()
+            return func()
+        finally:
+            timings[name] = (time.perf_counter() - start) * 1000
+
+    def _run_stages(self, stages: Dict[str, Callable], timings: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Executa estágios independentes de coleta, em paralelo ou em sequência.
+        Se algum estágio falhar, relança o primeiro erro na ordem dos estágios
+        só depois que todos terminarem (nenhum segue rodando no próximo ciclo).
+        """
+        if not self.concurrent:
+            return {name: self._timed(name, func, timings) for name, func in stages.items()}
+
+        executor = self._get_executor()
+        futures = {
+            name: executor.submit(self._timed, name, func, timings)
+            for name, func in stages.items()
+        }
+        wait(futures.values())
+        return {name: future.result() for name, future in futures.items()}
+
+    def _fetch_stages(self) -> Dict[str, Callable]:
+        """Define as requisições independentes de um ciclo de coleta"""
+        stages = {
+            'current_price': self.collector.get_current_price,
+            'order_book': self.collector.get_order_book,
+            'volume_stats': self.collector.get_volume_stats,
+            'funding_rate': self.collector.get_funding_rate,
+            'open_interest': self.collector.get_open_interest,
+            'liquidations': self.collector.get_liquidations_24h,
+            'cvd': self.collector.get_cvd_data,
+        }
+        for tf, interval in TIMEFRAMES.items():
+            # Mais dados para VWAP
+            stages[f'klines_{tf}'] = lambda interval=interval: self.collector.get_klines(interval, limit=200)
+        return stages
+
+    def _log_stage_timings(self, timings: Dict[str, float]):
+        """Loga o detalhamento de tempo por estágio da coleta"""
+        mode = 'paralelo' if self.concurrent else 'sequencial'
+        fetch_sum = sum(v for k, v in timings.items() if k not in ('fetch', 'processing', 'total'))
+        breakdown = ', '.join(
+            f"{name}={ms:.0f}ms" for name, ms in sorted(timings.items(), key=lambda x: x[1], reverse=True)
+            if name not in ('fetch', 'processing', 'total')
+        )
+        self.logger.info(
+            f"Coleta ({mode}) em {timings.get('total', 0):.0f}ms - "
+            f"requisições {timings.get('fetch', 0):.0f}ms (soma {fetch_sum:.0f}ms), "
+            f"processamento {timings.get('processing', 0):.0f}ms"
+        )
+        self.logger.debug(f"Tempos por estágio: {breakdown}")
+
+        usage = self.collector.get_rate_limit_usage()
+        if usage['server_used_weight'] is not None:
+            self.logger.info(
+                f"Peso de requisições: {usage['server_used_weight']}/{usage['weight_limit']} "
+                f"({usage['server_used_pct']:.1f}%), esperas {usage['total_wait_s']:.2f}s"
+            )
+
+    def _latest_indicators(self, tf: str, klines: CandleArray) -> Dict:
+        """Indicadores da vela mais recente: motor incremental ou recálculo completo via ta"""
+        if self.streaming_indicators is not None and klines:
+            engine = self.streaming_indicators.setdefault(tf, StreamingIndicators())
+            engine.sync(klines)
+            return TechnicalIndicators.format_latest(engine.latest(), len(engine))
+        return TechnicalIndicators(klines.to_dataframe()).get_latest_values()
+
+    def _process_results(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Monta o JSON de mercado a partir dos resultados dos estágios de coleta"""
+        # Coleta dados básicos
+        current_price = results['current_price']
+        order_book = results['order_book']
+        volume_stats = results['volume_stats']
+        funding_data = results['funding_rate']
+        open_interest = results['open_interest']
+        
+        # Atualiza histórico de funding
+        self._update_funding_history(funding_data['funding_rate'])
+        
+        # Calcula delta volume e atualiza histórico
+        taker_buy = volume_stats.get('taker_buy_vol_24h', 0)
+        taker_sell = volume_stats.get('taker_sell_vol_24h', 0)
+        delta_volume_absolute = taker_buy - taker_sell
+        self._update_delta_volume_cumulative(delta_volume_absolute)
+        
+        # Calcula imbalance score
+        imbalance_score = self._calculate_imbalance_score(order_book, current_price)
+        
+        # Métricas opcionais
+        liquidations_data = results['liquidations']
+        cvd_data = results['cvd']
+
+        # Indicadores de todos os timeframes em lote (matrizes timeframes x candles)
+        batch_indicators = {}
+        if self.streaming_indicators is None and BATCH_INDICATORS_ENABLED:
+            batch_indicators = batch_latest_values({
+                tf: results[f'klines_{tf}'] for tf in TIMEFRAMES if results[f'klines_{tf}']
+            })
+
+        # Coleta candles para diferentes timeframes
+        timeframes_data = {}
+        vwap_data = {}
+        
+        for tf, interval in TIMEFRAMES.items():
+            klines = CandleArray.coerce(results[f'klines_{tf}'])
             
-            # Atualiza histórico de funding
-            self._update_funding_history(funding_data['funding_rate'])
+            # Calcula VWAP para diferentes períodos
+            if tf == '1h':
+                vwap_data['1h'] = self._calculate_vwap(klines, 60)  # 60 períodos de 1h
+            elif tf == '4h':
+                vwap_data['4h'] = self._calculate_vwap(klines, 24)  # 24 períodos de 4h = 4 dias
+            elif tf == '1d':
+                # VWAP diário desde abertura UTC (usa dados de hoje apenas)
+                # Para simplificar, usa todos os dados disponíveis se for timeframe diário
+                if len(klines) > 0:
+                    vwap_data['d'] = self._calculate_vwap(klines)
+                else:
+                    vwap_data['d'] = current_price
             
-            # Calcula delta volume e atualiza histórico
-            taker_buy = volume_stats.get('taker_buy_vol_24h', 0)
-            taker_sell = volume_stats.get('taker_sell_vol_24h', 0)
-            delta_volume_absolute = taker_buy - taker_sell
-            self._update_delta_volume_cumulative(delta_volume_absolute)
+            # Calcula volume profile para 4h
+            volume_profile_4h = {}
+            if tf == '4h':
+                volume_profile_4h = self._calculate_volume_profile(klines.tail(24))  # Últimas 4h
             
-            # Calcula imbalance score
-            imbalance_score = self._calculate_imbalance_score(order_book, current_price)
+            # Calcula indicadores técnicos
+            if tf in batch_indicators:
+                latest_indicators = batch_indicators[tf]
+            else:
+                latest_indicators = self._latest_indicators(tf, klines)
             
-            # Coleta métricas opcionais
-            liquidations_data = self.collector.get_liquidations_24h()
-            cvd_data = self.collector.get_cvd_data()
-
-            # Coleta candles para diferentes timeframes
-            timeframes_data = {}
-            vwap_data = {}
+            # Adiciona indicadores melhorados para 1h
+            if tf == '1h':
+                # Adiciona mais indicadores para análise
+                latest_indicators['advanced'] = {
+                    'rsi_14': latest_indicators.get('rsi', {}).get('rsi_14'),
+                    'macd': {
+                        'line': latest_indicators.get('macd', {}).get('macd'),
+                        'signal': latest_indicators.get('macd', {}).get('macd_signal'),
+                        'histogram': latest_indicators.get('macd', {}).get('macd_hist')
+                    },
+                    'ema_9': latest_indicators.get('ema', {}).get('ema_9'),
+                    'ema_21': latest_indicators.get('ema', {}).get('ema_21')
+                }
             
-            for tf, interval in TIMEFRAMES.items():
-                klines = self.collector.get_klines(interval, limit=200)  # Mais dados para VWAP
-                df = self._create_dataframe(klines)
-                
-                # Calcula VWAP para diferentes períodos
-                if tf == '1h':
-                    vwap_data['1h'] = self._calculate_vwap(df, 60)  # 60 períodos de 1h
-                elif tf == '4h':
-                    vwap_data['4h'] = self._calculate_vwap(df, 24)  # 24 períodos de 4h = 4 dias
-                elif tf == '1d':
-                    # VWAP diário desde abertura UTC (usa dados de hoje apenas)
-                    # Para simplificar, usa todos os dados disponíveis se for timeframe diário
-                    if len(df) > 0:
-                        vwap_data['d'] = self._calculate_vwap(df)
-                    else:
-                        vwap_data['d'] = current_price
-                
-                # Calcula volume profile para 4h
-                volume_profile_4h = {}
-                if tf == '4h':
-                    volume_profile_4h = self._calculate_volume_profile(df.tail(24))  # Últimas 4h
-                
-                # Calcula indicadores técnicos
-                indicators = TechnicalIndicators(df)
-                latest_indicators = indicators.get_latest_values()
-                
-                # Adiciona indicadores melhorados para 1h
-                if tf == '1h':
-                    # Adiciona mais indicadores para análise
-                    latest_indicators['advanced'] = {
-                        'rsi_14': latest_indicators.get('rsi', {}).get('rsi_14'),
-                        'macd': {
-                            'line': latest_indicators.get('macd', {}).get('macd'),
-                            'signal': latest_indicators.get('macd', {}).get('macd_signal'),
-                            'histogram': latest_indicators.get('macd', {}).get('macd_hist')
-                        },
-                        'ema_9': latest_indicators.get('ema', {}).get('ema_9'),
-                        'ema_21': latest_indicators.get('ema', {}).get('ema_21')
+            # Detecta absorção nas velas (apenas para 15m)
+            enhanced_candles = []
+            if tf == '15m':
+                absorption = self._detect_absorption(klines, cvd_data.get('perp_cvd_changes', []))
+                for candle, absorbed in zip(klines, absorption.tolist()):
+                    candle_dict = {
+                        'ohlcv': candle,
+                        'absorcao': absorbed
                     }
+                    enhanced_candles.append(candle_dict)
                 
-                # Detecta absorção nas velas (apenas para 15m)
-                enhanced_candles = []
-                if tf == '15m':
-                    cvd_changes = cvd_data.get('perp_cvd_changes', [0] * len(klines))
-                    for i, candle in enumerate(klines):
-                        cvd_change = cvd_changes[i] if i < len(cvd_changes) else 0
-                        candle_dict = {
-                            'ohlcv': candle,
-                            'absorcao': self._detect_absorption(candle, cvd_change)
-                        }
-                        enhanced_candles.append(candle_dict)
-                    
-                    timeframes_data[tf] = {
-                        'candles': enhanced_candles,
-                        'indicators': latest_indicators
-                    }
-                else:
-                    timeframes_data[tf] = {
-                        'candles': klines,
-                        'indicators': latest_indicators
-                    }
-                
-                # Adiciona volume profile para 4h
-                if tf == '4h':
-                    timeframes_data[tf]['volume_profile_4h'] = volume_profile_4h
-
-            # Monta o JSON final com melhorias
-            market_data = {
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'symbol': self.symbol,
-                'current_price': current_price,
-                
-                # VWAP implementado
-                'vwap': vwap_data,
-                
-                # Order book com imbalance score
-                'order_book': {
-                    **order_book,
-                    'imbalance_score': imbalance_score
-                },
-                
-                # Derivatives com funding history
-                'derivatives': {
-                    **open_interest,
-                    **funding_data,
-                    'funding_history': self.funding_history.copy()
-                },
-                
-                # Stats com delta volume
-                'stats': volume_stats,
+                timeframes_data[tf] = {
+                    'candles': enhanced_candles,
+                    'indicators': latest_indicators
+                }
+            else:
+                timeframes_data[tf] = {
+                    'candles': klines.to_list(),
+                    'indicators': latest_indicators
+                }
+            
+            # Adiciona volume profile para 4h
+            if tf == '4h':
+                timeframes_data[tf]['volume_profile_4h'] = volume_profile_4h
+
+        # Monta o JSON final com melhorias
+        market_data = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'symbol': self.symbol,
+            'current_price': current_price,
+            
+            # VWAP implementado
+            'vwap': vwap_data,
+            
+            # Order book com imbalance score
+            'order_book': {
+                **order_book,
+                'imbalance_score': imbalance_score
+            },
+            
+            # Derivatives com funding history
+            'derivatives': {
+                **open_interest,
+                **funding_data,
+                'funding_history': self.funding_history.copy()
+            },
+            
+            # Stats com delta volume
+            'stats': volume_stats,
+            
+            # Flow com delta volume absoluto e cumulativo
+            'flow': {
+                **cvd_data,
+                'delta_volume_absolute': delta_volume_absolute,
+                'delta_volume_cumulative': self.delta_volume_cumulative.copy()
+            },
+            
+            'timeframes': timeframes_data
+        }
+        
+        # Adiciona liquidações apenas se disponível
+        if liquidations_data:
+            market_data['liquidations'] = liquidations_data
+            
+            # Tenta calcular clusters de liquidação (simplificado)
+            try:
+                long_liq = liquidations_data.get('long_liq_24h', 0)
+                short_liq = liquidations_data.get('short_liq_24h', 0)
                 
-                # Flow com delta volume absoluto e cumulativo
-                'flow': {
-                    **cvd_data,
-                    'delta_volume_absolute': delta_volume_absolute,
-                    'delta_volume_cumulative': self.delta_volume_cumulative.copy()
-                },
+                # Estimativa simples de clusters baseada no preço atual
+                price_ranges = []
+                if long_liq > 0:
+                    range_below = f"{int(current_price * 0.98)}-{int(current_price * 0.99)}"
+                    price_ranges.append({"range": range_below, "total_usdt": long_liq})
                 
-                'timeframes': timeframes_data
-            }
-            
-            # Adiciona liquidações apenas se disponível
-            if liquidations_data:
-                market_data['liquidations'] = liquidations_data
+                if short_liq > 0:
+                    range_above = f"{int(current_price * 1.01)}-{int(current_price * 1.02)}"
+                    price_ranges.append({"range": range_above, "total_usdt": short_liq})
                 
-                # Tenta calcular clusters de liquidação (simplificado)
-                try:
-                    long_liq = liquidations_data.get('long_liq_24h', 0)
-                    short_liq = liquidations_data.get('short_liq_24h', 0)
-                    
-                    # Estimativa simples de clusters baseada no preço atual
-                    price_ranges = []
-                    if long_liq > 0:
-                        range_below = f"{int(current_price * 0.98)}-{int(current_price * 0.99)}"
-                        price_ranges.append({"range": range_below, "total_usdt": long_liq})
-                    
-                    if short_liq > 0:
-                        range_above = f"{int(current_price * 1.01)}-{int(current_price * 1.02)}"
-                        price_ranges.append({"range": range_above, "total_usdt": short_liq})
-                    
-                    if price_ranges:
-                        market_data['liquidations']['liquidations_clusters'] = price_ranges
-                except:
-                    pass
+                if price_ranges:
+                    market_data['liquidations']['liquidations_clusters'] = price_ranges
+            except:
+                pass
+
+        return market_data
+
+    def collect_market_data(self) -> Dict[str, Any]:
+        """Coleta todos os dados de mercado e retorna JSON formatado"""
+        try:
+            timings: Dict[str, float] = {}
+            cycle_start = time.perf_counter()
+
+            # Dispara as requisições independentes (em paralelo no modo concorrente)
+            results = self._timed('fetch', lambda: self._run_stages(self._fetch_stages(), timings), timings)
+            processing_start = time.perf_counter()
+
+            market_data = self._process_results(results)
+
+            timings['processing'] = (time.perf_counter() - processing_start) * 1000
+            timings['total'] = (time.perf_counter() - cycle_start) * 1000
+            self.last_stage_timings = timings
+            self._log_stage_timings(timings)
 
             return market_data
 
@@ -340,12 +392,16 @@ class MarketDataCollector:
             self.logger.error(f"Erro ao coletar dados de mercado: {str(e)}")
             raise
 
-    def save_to_file(self, data: Dict[str, Any], filename: str = 'market_data.json'):
-        """Salva os dados em um arquivo JSON"""
+    def save_to_file(self, data: Dict[str, Any], filename: str = 'market_data.json') -> str:
+        """Salva os dados em um arquivo JSON (comprimido com SNAPSHOT_COMPRESSION); retorna o caminho gravado"""
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            self.logger.info(f"Dados salvos em {filename}")
+            method = method_name(SNAPSHOT_COMPRESSION)
+            if method is not None and not filename.endswith(SUFFIXES[method]):
+                filename += SUFFIXES[method]
+            stats = json_codec.dump(data, filename, compact=JSON_COMPACT_OUTPUT,
+                                    compression=method, level=COMPRESSION_LEVEL)
+            self.logger.info(f"Dados salvos em {filename} ({stats.describe()})")
+            return filename
         except Exception as e:
             self.logger.error(f"Erro ao salvar dados: {str(e)}")
             raise
@@ -0,0 +1,191 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Sequence
+import logging
+
+from .collectors.base_collector import BaseCollector
+from .collectors.binance_futures_collector import BinanceFuturesCollector
+from .collectors.response_cache import ResponseCache
+from .collectors.websocket_liquidations import WebSocketLiquidationsCollector
+from .collectors.websocket_trades import WebSocketTradesCollector
+from .market_data_collector import MarketDataCollector
+from .utils import json_codec
+from .utils.compression import SUFFIXES, method_name
+from .config import (SYMBOLS, MULTI_SYMBOL_MAX_WORKERS, HTTP_POOL_SIZE, HTTP_WARMUP_CONNECTIONS,
+                     RESPONSE_CACHE_TTLS, TRADE_STREAM_ENABLED, JSON_COMPACT_OUTPUT,
+                     SNAPSHOT_COMPRESSION, COMPRESSION_LEVEL)
+
+class MultiSymbolCollector:
+    """
+    Coleta snapshots de mercado para vários símbolos em um único processo.
+
+    Todos os símbolos compartilham o pool de threads, as sessões HTTP (pools de
+    conexões keep-alive por host), o cache de respostas, o orçamento de peso da
+    Binance (um limitador por host) e as conexões WebSocket de liquidações e de
+    trades (streams combinados).
+
+    Limitação: o livro de ordens (ORDER_BOOK_STREAM_ENABLED) e os candles
+    (KLINE_STREAM_ENABLED) continuam com uma conexão WebSocket por símbolo, pois
+    cada um tem seu próprio estado de sincronização com o snapshot REST. Com N
+    símbolos são até 2*N conexões além das 3 compartilhadas; a Binance limita a
+    300 novas conexões a cada 5 minutos por IP, o que pesa nas reconexões.
+    """
+
+    def __init__(self, symbols: Sequence[str] = SYMBOLS, max_workers: int = MULTI_SYMBOL_MAX_WORKERS):
+        self.logger = logging.getLogger(__name__)
+        self.symbols = [symbol.upper() for symbol in symbols]
+        if not self.symbols:
+            raise ValueError("Nenhum símbolo informado")
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='multi-symbol')
+
+        # Um pool de conexões por host, dimensionado para o pool de threads
+        pool_size = max(HTTP_POOL_SIZE, max_workers)
+        self.session = BaseCollector._create_session(pool_size)
+        self.spot_session = BaseCollector._create_session(pool_size)
+        self.cache = ResponseCache(RESPONSE_CACHE_TTLS, max_entries=256 * len(self.symbols))
+
+        # Uma conexão WebSocket por tipo de stream para todos os símbolos
+        self.ws_liquidations = WebSocketLiquidationsCollector(self.symbols)
+        self.ws_liquidations.start_stream()
+        self.ws_perp_trades = None
+        self.ws_spot_trades = None
+        if TRADE_STREAM_ENABLED:
+            self.ws_perp_trades = WebSocketTradesCollector(self.symbols, 'futures')
+            self.ws_spot_trades = WebSocketTradesCollector(self.symbols, 'spot')
+            self.ws_perp_trades.start_stream()
+            self.ws_spot_trades.start_stream()
+
+        self.collectors: Dict[str, MarketDataCollector] = {}
+        for symbol in self.symbols:
+            futures_collector = BinanceFuturesCollector(
+                symbol,
+                session=self.session,
+                spot_session=self.spot_session,
+                cache=self.cache,
+                ws_liquidations=self.ws_liquidations,
+                ws_perp_trades=self.ws_perp_trades,
+                ws_spot_trades=self.ws_spot_trades,
+                warm_up_connections=0
+            )
+            self.collectors[symbol] = MarketDataCollector(
+                concurrent=True,
+                collector=futures_collector,
+                executor=self.executor
+            )
+
+        # Aquecimento único das sessões compartilhadas
+        first = self.collectors[self.symbols[0]].collector
+        first.warm_up(min(pool_size, HTTP_WARMUP_CONNECTIONS * len(self.symbols)))
+        first.spot_collector.warm_up()
+
+        # Tempos (ms) por símbolo da última coleta
+        self.last_timings: Dict[str, Dict[str, float]] = {}
+
+    def _submit_all(self, timings: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, Future]]:
+        """
+        Enfileira os estágios de todos os símbolos no pool compartilhado.
+
+        A ordem é por símbolo: o primeiro símbolo termina suas requisições antes
+        e seu processamento (pandas/indicadores) se sobrepõe à rede dos demais.
+        O limitador de peso compartilhado espaça as requisições se o orçamento
+        apertar.
+        """
+        futures = {}
+        for symbol, collector in self.collectors.items():
+            futures[symbol] = {
+                name: self.executor.submit(collector._timed, name, func, timings[symbol])
+                for name, func in collector._fetch_stages().items()
+            }
+        return futures
+
+    def collect_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Coleta os dados de mercado de todos os símbolos.
+        Símbolos com erro são registrados no log e omitidos do resultado.
+        """
+        cycle_start = time.perf_counter()
+        timings = {symbol: {} for symbol in self.symbols}
+        futures = self._submit_all(timings)
+
+        market_data = {}
+        failed: List[str] = []
+        for symbol, collector in self.collectors.items():
+            try:
+                # Estágios em ordem: relança o primeiro erro, como no coletor de um símbolo
+                results = {name: future.result() for name, future in futures[symbol].items()}
+                timings[symbol]['fetch'] = (time.perf_counter() - cycle_start) * 1000
+                processing_start = time.perf_counter()
+                market_data[symbol] = collector._process_results(results)
+                timings[symbol]['processing'] = (time.perf_counter() - processing_start) * 1000
+                timings[symbol]['total'] = (time.perf_counter() - cycle_start) * 1000
+                collector.last_stage_timings = timings[symbol]
+            except Exception as e:
+                failed.append(symbol)
+                self.logger.error(f"Erro ao coletar dados de {symbol}: {str(e)}")
+
+        self.last_timings = timings
+        self._log_cycle(time.perf_counter() - cycle_start, failed)
+        return market_data
+
+    def _log_cycle(self, elapsed: float, failed: List[str]):
+        """Loga o tempo do ciclo, os símbolos com falha e o uso do orçamento de peso"""
+        self.logger.info(
+            f"{len(self.symbols) - len(failed)}/{len(self.symbols)} símbolo(s) coletado(s) em {elapsed * 1000:.0f}ms"
+            + (f" - falhas: {', '.join(failed)}" if failed else "")
+        )
+        for symbol, symbol_timings in self.last_timings.items():
+            if 'total' in symbol_timings:
+                self.logger.debug(
+                    f"{symbol}: pronto em {symbol_timings['total']:.0f}ms "
+                    f"(processamento {symbol_timings['processing']:.0f}ms)"
+                )
+
+        usage = self.collectors[self.symbols[0]].collector.get_rate_limit_usage()
+        if usage['server_used_weight'] is not None:
+            self.logger.info(
+                f"Peso de requisições: {usage['server_used_weight']}/{usage['weight_limit']} "
+                f"({usage['server_used_pct']:.1f}%), esperas {usage['total_wait_s']:.2f}s"
+            )
+
+    def save_to_file(self, data: Dict[str, Any], filename: str = 'market_data_multi.json') -> str:
+        """Salva os dados de todos os símbolos em um arquivo JSON (opcionalmente comprimido); retorna o caminho gravado"""
+        try:
+            method = method_name(SNAPSHOT_COMPRESSION)
+            if method is not None and not filename.endswith(SUFFIXES[method]):
+                filename += SUFFIXES[method]
+            stats = json_codec.dump(data, filename, compact=JSON_COMPACT_OUTPUT,
+                                    compression=method, level=COMPRESSION_LEVEL)
+            self.logger.info(f"Dados salvos em {filename} ({stats.describe()})")
+            return filename
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar dados: {str(e)}")
+            raise
+
+    def close(self):
+        """Para os streams compartilhados e o pool de threads"""
+        for stream in (self.ws_liquidations, self.ws_perp_trades, self.ws_spot_trades):
+            if stream is not None:
+                stream.stop_stream()
+        for collector in self.collectors.values():
+            for stream in collector.collector._owned_streams:
+                stream.stop_stream()
+        self.executor.shutdown(wait=False)
+
+def main():
+    # Configura logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    # Coleta dados de todos os símbolos configurados (SYMBOLS)
+    collector = MultiSymbolCollector()
+    try:
+        market_data = collector.collect_all()
+        collector.save_to_file(market_data)
+    finally:
+        collector.close()
+
+if __name__ == '__main__':
+    main()
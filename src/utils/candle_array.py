@@ -0,0 +1,127 @@
+import numpy as np
+from typing import Iterator, List, Sequence, Union
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume', 'timestamp')
+
+class CandleArray:
+    """
+    Série de candles em colunas NumPy: um bloco float64 (6 x candles), uma
+    linha contígua por campo de FIELDS.
+
+    As colunas (open, high, low, close, volume) são views sem cópia, prontas
+    para indicadores, VWAP, perfil de volume e absorção. Timestamps (ms) ficam
+    no mesmo bloco (exatos em float64) e são expostos como int64. O bloco é
+    somente leitura e fatias compartilham a memória, então uma série pode ser
+    repassada (cache, estágios, indicadores) sem cópias defensivas.
+
+    Indexar por inteiro ou iterar devolve candles no formato de lista
+    [open, high, low, close, volume, timestamp]; pandas é só um adaptador
+    (to_dataframe).
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: np.ndarray):
+        if data.ndim != 2 or data.shape[0] != len(FIELDS):
+            raise ValueError(f"Bloco de candles deve ter formato ({len(FIELDS)}, n): {data.shape}")
+        if data.flags.writeable:
+            data.setflags(write=False)
+        self._data = data
+
+    @classmethod
+    def empty(cls) -> 'CandleArray':
+        return cls(np.empty((len(FIELDS), 0)))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[float]]) -> 'CandleArray':
+        """Candles [open, high, low, close, volume, timestamp]"""
+        if len(rows) == 0:
+            return cls.empty()
+        return cls(np.ascontiguousarray(np.array(rows, dtype=float)[:, :len(FIELDS)].T))
+
+    @classmethod
+    def from_binance(cls, klines: Sequence[Sequence]) -> 'CandleArray':
+        """Resposta de /klines ([open_time, "open", "high", "low", "close", "volume", ...])"""
+        if len(klines) == 0:
+            return cls.empty()
+        # NumPy converte as strings de preço direto para float64, sem floats intermediários
+        raw = np.array([kline[:6] for kline in klines], dtype=float)
+        return cls(np.ascontiguousarray(raw[:, [1, 2, 3, 4, 5, 0]].T))
+
+    @classmethod
+    def coerce(cls, candles: Union['CandleArray', Sequence[Sequence[float]]]) -> 'CandleArray':
+        return candles if isinstance(candles, CandleArray) else cls.from_rows(candles)
+
+    @classmethod
+    def concat(cls, parts: Sequence['CandleArray']) -> 'CandleArray':
+        return cls(np.concatenate([part._data for part in parts], axis=1))
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._data[0]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._data[1]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._data[2]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._data[3]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._data[4]
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self._data[5].astype(np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def __len__(self) -> int:
+        return self._data.shape[1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CandleArray(self._data[:, index])
+        *values, timestamp = self._data[:, index].tolist()
+        return values + [int(timestamp)]
+
+    def __iter__(self) -> Iterator[List]:
+        for *values, timestamp in self._data.T.tolist():
+            yield values + [int(timestamp)]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CandleArray):
+            return NotImplemented
+        return np.array_equal(self._data, other._data)
+
+    def __repr__(self) -> str:
+        return f"CandleArray({len(self)} candles)"
+
+    def tail(self, count: int) -> 'CandleArray':
+        return self[-count:] if count else self[:0]
+
+    def last_timestamp(self) -> int:
+        return int(self._data[5, -1])
+
+    def searchsorted(self, timestamp: int) -> int:
+        """Posição do primeiro candle com timestamp >= timestamp"""
+        return int(np.searchsorted(self._data[5], timestamp, side='left'))
+
+    def to_list(self) -> List[List]:
+        """Candles no formato de lista (saída JSON)"""
+        return list(self)
+
+    def to_dataframe(self):
+        """Adaptador pandas (timestamp como datetime)"""
+        import pandas as pd
+        df = pd.DataFrame({field: self._data[i] for i, field in enumerate(FIELDS[:-1])})
+        df['timestamp'] = pd.to_datetime(self.timestamp, unit='ms')
+        return df
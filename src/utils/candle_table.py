@@ -0,0 +1,173 @@
+import os
+import logging
+import numpy as np
+from typing import Dict, List, Sequence
+
+# Registro de um candle fechado na tabela
+CANDLE_RECORD = np.dtype([('open_time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                          ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')])
+
+class CandleTable:
+    """
+    Tabela deduplicada dos candles fechados de um intervalo: registros de
+    tamanho fixo em ordem de abertura, append-only em disco e espelhados em
+    memória. Um candle é gravado uma única vez, não importa em quantos
+    snapshots apareça.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = logging.getLogger(f"{self.__class__.__name__}[{os.path.basename(path)}]")
+        raw = b''
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                raw = f.read()
+        usable = len(raw) - len(raw) % CANDLE_RECORD.itemsize
+        if usable != len(raw):
+            self.logger.warning(f"Registro incompleto no fim da tabela descartado ({len(raw) - usable} bytes)")
+            with open(path, 'wb') as f:
+                f.write(raw[:usable])
+        self.records = np.frombuffer(raw[:usable], dtype=CANDLE_RECORD).copy()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _to_records(candles: Sequence[Sequence[float]]) -> np.ndarray:
+        records = np.zeros(len(candles), dtype=CANDLE_RECORD)
+        if len(candles):
+            values = np.array([candle[:5] for candle in candles], dtype=float)
+            for i, field in enumerate(CANDLE_RECORD.names[1:]):
+                records[field] = values[:, i]
+            records['open_time'] = [int(candle[5]) for candle in candles]
+        return records
+
+    @staticmethod
+    def _to_candles(records: np.ndarray) -> List[List]:
+        """Registros no formato [open, high, low, close, volume, timestamp]"""
+        return [[o, h, l, c, v, t] for t, o, h, l, c, v in records.tolist()]
+
+    def _span(self, from_ts: int, to_ts: int) -> np.ndarray:
+        times = self.records['open_time']
+        lo = int(np.searchsorted(times, from_ts, side='left'))
+        hi = int(np.searchsorted(times, to_ts, side='right'))
+        return self.records[lo:hi]
+
+    def store(self, candles: Sequence[Sequence[float]]) -> bool:
+        """
+        Grava os candles fechados ainda ausentes (posteriores ao último da
+        tabela). Retorna True se, depois disso, o trecho da tabela entre o
+        primeiro e o último candle é exatamente a lista recebida; False se há
+        divergência (candle anterior à tabela, valores diferentes ou lacunas),
+        caso em que quem chamou deve manter os candles no próprio snapshot.
+        """
+        if not candles:
+            return True
+        records = self._to_records(candles)
+        if np.any(np.diff(records['open_time']) <= 0):
+            return False
+        last = self.records['open_time'][-1] if len(self.records) else None
+        new = records if last is None else records[records['open_time'] > last]
+        if len(new):
+            with open(self.path, 'ab') as f:
+                f.write(new.tobytes())
+            self.records = np.concatenate([self.records, new])
+        span = self._span(int(records['open_time'][0]), int(records['open_time'][-1]))
+        return len(span) == len(records) and bool(np.all(span == records))
+
+    def get(self, from_ts: int, to_ts: int) -> List[List]:
+        """Candles com from_ts <= abertura <= to_ts"""
+        return self._to_candles(self._span(from_ts, to_ts))
+
+    def prune(self, before_ts: int):
+        """Remove os candles abertos antes de before_ts (reescrita atômica)"""
+        keep = self.records[self.records['open_time'] >= before_ts]
+        if len(keep) == len(self.records):
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(keep.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.logger.debug(f"Tabela compactada: {len(self.records) - len(keep)} candle(s) removido(s)")
+        self.records = keep
+
+def normalize_snapshot(snapshot: Dict, tables: Dict[str, CandleTable]) -> Dict:
+    """
+    Troca os candles de cada timeframe (exceto o último, em formação) por uma
+    referência (intervalo, primeira e última abertura) à tabela do intervalo.
+    O snapshot original não é alterado; timeframes cujos candles não batem
+    com a tabela ficam como estão.
+    """
+    timeframes = snapshot.get('timeframes')
+    if not isinstance(timeframes, dict):
+        return snapshot
+
+    normalized_timeframes = {}
+    for interval, data in timeframes.items():
+        candles = data.get('candles') if isinstance(data, dict) else None
+        table = tables.get(interval)
+        if not candles or table is None:
+            normalized_timeframes[interval] = data
+            continue
+
+        # Velas de 15m vêm como {'ohlcv': [...], 'absorcao': bool}
+        flagged = isinstance(candles[0], dict)
+        ohlcv = [candle['ohlcv'] for candle in candles] if flagged else candles
+        closed = ohlcv[:-1]
+        if not table.store(closed):
+            normalized_timeframes[interval] = data
+            continue
+
+        reference = {
+            'interval': interval,
+            'from': int(closed[0][5]) if closed else None,
+            'to': int(closed[-1][5]) if closed else None,
+            'count': len(closed),
+            'tail': ohlcv[-1:]
+        }
+        if flagged:
+            reference['absorcao'] = [candle.get('absorcao', False) for candle in candles]
+        # Mesma ordem de chaves, com candles_ref no lugar de candles
+        normalized_timeframes[interval] = {
+            ('candles_ref' if key == 'candles' else key): (reference if key == 'candles' else value)
+            for key, value in data.items()
+        }
+    return {**snapshot, 'timeframes': normalized_timeframes}
+
+def denormalize_snapshot(snapshot: Dict, tables: Dict[str, CandleTable]) -> Dict:
+    """Reconstrói os candles referenciados por normalize_snapshot (formato original)"""
+    timeframes = snapshot.get('timeframes')
+    if not isinstance(timeframes, dict):
+        return snapshot
+
+    for interval, data in timeframes.items():
+        reference = data.get('candles_ref') if isinstance(data, dict) else None
+        if reference is None:
+            continue
+        closed: List[List] = []
+        if reference['count']:
+            table = tables.get(reference['interval'])
+            closed = table.get(reference['from'], reference['to']) if table is not None else []
+            if len(closed) != reference['count']:
+                raise ValueError(f"Candles de {interval} ausentes da tabela "
+                                 f"({len(closed)}/{reference['count']})")
+        ohlcv = closed + reference['tail']
+        candles = ohlcv
+        if 'absorcao' in reference:
+            candles = [{'ohlcv': candle, 'absorcao': flag} for candle, flag in zip(ohlcv, reference['absorcao'])]
+        timeframes[interval] = {
+            ('candles' if key == 'candles_ref' else key): (candles if key == 'candles_ref' else value)
+            for key, value in data.items()
+        }
+    return snapshot
+
+def oldest_reference(snapshot: Dict) -> Dict[str, int]:
+    """Primeira abertura referenciada por intervalo em um snapshot normalizado"""
+    oldest: Dict[str, int] = {}
+    for data in (snapshot.get('timeframes') or {}).values():
+        reference = data.get('candles_ref') if isinstance(data, dict) else None
+        if reference and reference['count']:
+            oldest[reference['interval']] = reference['from']
+    return oldest
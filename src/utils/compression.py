@@ -0,0 +1,126 @@
+import gzip
+import lzma
+import time
+from typing import BinaryIO, NamedTuple, Optional, Tuple
+
+# Métodos suportados (biblioteca padrão): sufixo do arquivo e subtipo MIME de cada um
+SUFFIXES = {'gzip': '.gz', 'lzma': '.xz'}
+MIME_SUBTYPES = {'gzip': 'gzip', 'lzma': 'x-xz'}
+_MAGIC = {'gzip': b'\x1f\x8b', 'lzma': b'\xfd7zXZ\x00'}
+_ALIASES = {'gz': 'gzip', 'xz': 'lzma'}
+
+class CompressionStats(NamedTuple):
+    """Resultado de uma escrita: tamanhos antes/depois e tempo gasto comprimindo"""
+    method: Optional[str]
+    raw_bytes: int
+    stored_bytes: int
+    elapsed_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.stored_bytes if self.stored_bytes else 1.0
+
+    def describe(self) -> str:
+        if self.method is None:
+            return f"sem compressão, {self.raw_bytes / 1024:.1f}KB"
+        return (f"{self.method} {self.raw_bytes / 1024:.1f}KB -> {self.stored_bytes / 1024:.1f}KB "
+                f"({self.ratio:.1f}x, {self.elapsed_ms:.1f}ms)")
+
+def method_name(method: Optional[str]) -> Optional[str]:
+    """Normaliza o método configurado ('gzip', 'lzma'); None, '' ou 'none' = sem compressão"""
+    if method is None:
+        return None
+    method = method.strip().lower()
+    if method in ('', 'none', 'off', 'false'):
+        return None
+    method = _ALIASES.get(method, method)
+    if method not in SUFFIXES:
+        raise ValueError(f"Compressão desconhecida: {method} (use gzip, lzma ou none)")
+    return method
+
+def detect(data: bytes) -> Optional[str]:
+    """Método usado em data, pelos bytes iniciais; None se não estiver comprimido"""
+    for method, magic in _MAGIC.items():
+        if data[:len(magic)] == magic:
+            return method
+    return None
+
+def compress(data: bytes, method: Optional[str], level: int = 6) -> Tuple[bytes, CompressionStats]:
+    """Comprime data em memória (sem método, devolve data como está)"""
+    method = method_name(method)
+    if method is None:
+        return data, CompressionStats(None, len(data), len(data), 0.0)
+    start = time.perf_counter()
+    if method == 'gzip':
+        compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    else:
+        compressed = lzma.compress(data, preset=level)
+    return compressed, CompressionStats(method, len(data), len(compressed), (time.perf_counter() - start) * 1000)
+
+def decompress(data: bytes) -> bytes:
+    """Descomprime se data estiver em gzip/lzma; caso contrário devolve data como está"""
+    method = detect(data)
+    if method == 'gzip':
+        return gzip.decompress(data)
+    if method == 'lzma':
+        return lzma.decompress(data)
+    return data
+
+def open_read(path: str) -> BinaryIO:
+    """Abre o arquivo para leitura, descomprimindo em streaming se for gzip/lzma"""
+    with open(path, 'rb') as f:
+        method = detect(f.read(max(len(magic) for magic in _MAGIC.values())))
+    if method == 'gzip':
+        return gzip.open(path, 'rb')
+    if method == 'lzma':
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+def read_bytes(path: str) -> bytes:
+    """Conteúdo do arquivo, já descomprimido"""
+    with open_read(path) as f:
+        return f.read()
+
+class CompressedWriter:
+    """
+    Escrita em streaming em um arquivo, comprimida com o método escolhido
+    (ou direta, sem método). Conta os bytes recebidos e o tempo gasto nas
+    escritas; close() devolve as estatísticas da escrita.
+    """
+
+    def __init__(self, path: str, method: Optional[str], level: int = 6):
+        self.method = method_name(method)
+        self.raw_bytes = 0
+        self.elapsed = 0.0
+        self._raw = open(path, 'wb')
+        if self.method == 'gzip':
+            self._file = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=level, mtime=0)
+        elif self.method == 'lzma':
+            self._file = lzma.LZMAFile(self._raw, mode='wb', preset=level)
+        else:
+            self._file = self._raw
+        self.stats: Optional[CompressionStats] = None
+
+    def write(self, data: bytes):
+        start = time.perf_counter()
+        self._file.write(data)
+        self.elapsed += time.perf_counter() - start
+        self.raw_bytes += len(data)
+
+    def close(self) -> CompressionStats:
+        if self.stats is None:
+            start = time.perf_counter()
+            if self._file is not self._raw:
+                self._file.close()
+            stored_bytes = self._raw.tell()
+            self._raw.close()
+            self.elapsed += time.perf_counter() - start
+            elapsed_ms = self.elapsed * 1000 if self.method is not None else 0.0
+            self.stats = CompressionStats(self.method, self.raw_bytes, stored_bytes, elapsed_ms)
+        return self.stats
+
+    def __enter__(self) -> 'CompressedWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
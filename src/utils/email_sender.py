@@ -1,19 +1,56 @@
 import smtplib
-import json
 import os
 import glob
+import queue
+import threading
+import time
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 import logging
-from typing import Dict, Optional
+from typing import Any, Dict, NamedTuple, Optional
+from . import json_codec
+from . import compression
+from ..config import JSON_COMPACT_OUTPUT, ATTACHMENT_COMPRESSION, COMPRESSION_LEVEL
+
+class QueuedReport(NamedTuple):
+    """Relatório aguardando envio na fila da thread de envio"""
+    created_at: datetime
+    enqueued_at: float
+    market_data: Dict
+    options: Dict[str, Any]
+    consolidated_content: Optional[bytes]  # Lido no agendamento: o arquivo é substituído a cada ciclo
 
 class EmailSender:
+    """
+    Envio dos relatórios por SMTP.
+
+    A conexão (STARTTLS + login) é aberta uma vez e reutilizada entre envios
+    e por test_connection; antes de cada uso é verificada com NOOP e, se o
+    servidor a derrubou ou o envio falha, é reaberta e o envio repetido uma
+    vez.
+
+    submit_market_data() só coloca o relatório em uma fila limitada; uma
+    thread em segundo plano monta e envia as mensagens. Quando ela fica para
+    trás, relatórios antigos são descartados: a fila cheia perde o mais
+    antigo, a thread envia só o mais recente que encontrar na fila e ignora
+    os que passaram de EMAIL_MAX_REPORT_AGE. Assim a coleta nunca espera
+    pelo servidor de email. O arquivo consolidado é lido no agendamento,
+    então o anexo é sempre do mesmo ciclo que o corpo do email.
+    """
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.load_config()
+        self._server: Optional[smtplib.SMTP] = None
+        self._smtp_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
 
     def load_config(self):
         """Carrega configurações do email"""
@@ -31,6 +68,32 @@ class EmailSender:
         self.subject_prefix = os.getenv('EMAIL_SUBJECT_PREFIX', '[BTC Market Data]')
         self.email_enabled = os.getenv('EMAIL_ENABLED', 'false').lower() == 'true'
 
+        # Envio em segundo plano: tamanho da fila, idade máxima de um relatório (s) e timeout SMTP (s)
+        self.background_send = os.getenv('EMAIL_BACKGROUND_SEND', 'true').lower() == 'true'
+        self.queue_size = max(int(os.getenv('EMAIL_QUEUE_SIZE', '2')), 1)
+        self.max_report_age = float(os.getenv('EMAIL_MAX_REPORT_AGE', '600'))
+        self.smtp_timeout = float(os.getenv('EMAIL_SMTP_TIMEOUT', '30'))
+        self.attachment_compression = compression.method_name(ATTACHMENT_COMPRESSION)
+
+    def create_json_attachment(self, content: bytes, filename: str) -> MIMEBase:
+        """
+        Anexo a partir do conteúdo de um JSON. Conteúdo já comprimido (gzip/lzma)
+        vai como está; senão é comprimido com ATTACHMENT_COMPRESSION, se
+        configurado, antes do base64.
+        """
+        method = compression.detect(content)
+        if method is None and self.attachment_compression is not None:
+            content, stats = compression.compress(content, self.attachment_compression, COMPRESSION_LEVEL)
+            method = stats.method
+            filename += compression.SUFFIXES[method]
+            self.logger.info(f"[ATTACH] {filename} comprimido ({stats.describe()})")
+
+        attachment = MIMEBase('application', compression.MIME_SUBTYPES.get(method, 'json'))
+        attachment.set_payload(content)
+        encoders.encode_base64(attachment)
+        attachment.add_header('Content-Disposition', f'attachment; filename="{filename}"')
+        return attachment
+
     def create_market_summary_html(self, market_data: Dict) -> str:
         """Cria um resumo HTML dos dados de mercado"""
         def format_number(num):
@@ -177,119 +240,104 @@ class EmailSender:
 
         return html
 
-    def send_market_data(self, market_data: Dict, attach_json: bool = True, json_folder: str = None, consolidated_file: str = None) -> bool:
-        """Envia email com dados de mercado"""
-        if not self.email_enabled:
-            self.logger.info("Email desabilitado via configuração")
-            return False
-
-        if not self.email_user or not self.email_password or not self.email_to:
-            self.logger.error("Configurações de email incompletas")
-            return False
-
-        try:
-            # Cria a mensagem
-            msg = MIMEMultipart('alternative')
-            
-            timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            price = market_data['current_price']
-            
-            msg['Subject'] = f"{self.subject_prefix} BTC: ${price:,.2f} - {timestamp}"
-            msg['From'] = self.email_from
-            msg['To'] = self.email_to
+    def create_message(self, market_data: Dict, attach_json: bool = True, json_folder: str = None,
+                       consolidated_file: str = None, created_at: Optional[datetime] = None,
+                       consolidated_content: Optional[bytes] = None) -> MIMEMultipart:
+        """
+        Monta o email (texto, HTML e anexos) com os dados de mercado.
+        consolidated_content, se informado, é o conteúdo já lido de
+        consolidated_file (que então só dá o nome do anexo).
+        """
+        # Cria a mensagem
+        msg = MIMEMultipart('alternative')
+        
+        timestamp = (created_at or datetime.now()).strftime("%d/%m/%Y %H:%M:%S")
+        price = market_data['current_price']
+        
+        msg['Subject'] = f"{self.subject_prefix} BTC: ${price:,.2f} - {timestamp}"
+        msg['From'] = self.email_from
+        msg['To'] = self.email_to
 
-            # Texto simples
-            text_content = f"""
+        # Texto simples
+        text_content = f"""
 Relatório de Mercado - Bitcoin (BTC/USDT)
 Timestamp: {market_data['timestamp']}
 Preço Atual: ${market_data['current_price']:,.2f} USDT
 
 Para ver o relatório completo, visualize este email em HTML ou consulte o arquivo JSON anexo.
-            """
+        """
 
-            # HTML formatado
-            html_content = self.create_market_summary_html(market_data)
+        # HTML formatado
+        html_content = self.create_market_summary_html(market_data)
 
-            # Anexa as partes
-            part1 = MIMEText(text_content, 'plain', 'utf-8')
-            part2 = MIMEText(html_content, 'html', 'utf-8')
-            
-            msg.attach(part1)
-            msg.attach(part2)
-
-            # Anexa JSONs individuais se solicitado
-            if attach_json and json_folder and os.path.exists(json_folder):
-                # Anexa todos os JSONs da pasta
-                json_files = glob.glob(os.path.join(json_folder, "market_data_2*.json"))  # Só individuais
-                json_files.sort(key=os.path.getmtime, reverse=True)  # Mais recentes primeiro
-                
-                attached_count = 0
-                for json_file in json_files:
-                    try:
-                        with open(json_file, 'r', encoding='utf-8') as f:
-                            json_content = f.read()
-                        
-                        attachment = MIMEBase('application', 'json')
-                        attachment.set_payload(json_content.encode('utf-8'))
-                        encoders.encode_base64(attachment)
-                        
-                        filename = os.path.basename(json_file)
-                        attachment.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename="{filename}"'
-                        )
-                        msg.attach(attachment)
-                        attached_count += 1
-                        
-                    except Exception as e:
-                        self.logger.warning(f"Erro ao anexar {json_file}: {str(e)}")
-                
-                self.logger.info(f"[ATTACH] {attached_count} arquivo(s) JSON individuais anexado(s)")
+        # Anexa as partes
+        part1 = MIMEText(text_content, 'plain', 'utf-8')
+        part2 = MIMEText(html_content, 'html', 'utf-8')
+        
+        msg.attach(part1)
+        msg.attach(part2)
+
+        # Anexa JSONs individuais se solicitado
+        if attach_json and json_folder and os.path.exists(json_folder):
+            # Anexa todos os JSONs da pasta
+            json_files = glob.glob(os.path.join(json_folder, "market_data_2*.json*"))  # Só individuais
+            json_files.sort(key=os.path.getmtime, reverse=True)  # Mais recentes primeiro
             
-            # Anexa o arquivo consolidado se existir (SEMPRE, independente do attach_json)
-            if consolidated_file and os.path.exists(consolidated_file):
+            attached_count = 0
+            for json_file in json_files:
                 try:
-                    with open(consolidated_file, 'r', encoding='utf-8') as f:
-                        consolidated_content = f.read()
+                    with open(json_file, 'rb') as f:
+                        json_content = f.read()
                     
-                    consolidated_attachment = MIMEBase('application', 'json')
-                    consolidated_attachment.set_payload(consolidated_content.encode('utf-8'))
-                    encoders.encode_base64(consolidated_attachment)
-                    
-                    consolidated_attachment.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename="market_data_consolidated_for_ai.json"'
-                    )
-                    msg.attach(consolidated_attachment)
-                    self.logger.info("[AI-FILE] Arquivo consolidado anexado")
+                    msg.attach(self.create_json_attachment(json_content, os.path.basename(json_file)))
+                    attached_count += 1
                     
                 except Exception as e:
-                    self.logger.error(f"[ERROR] Erro ao anexar arquivo consolidado: {str(e)}")
+                    self.logger.warning(f"Erro ao anexar {json_file}: {str(e)}")
             
-            # Anexa JSON atual se não há pasta nem consolidado
-            if attach_json and not json_folder and not consolidated_file:
-                # Comportamento padrão - apenas o JSON atual
-                json_data = json.dumps(market_data, indent=2, ensure_ascii=False)
+            self.logger.info(f"[ATTACH] {attached_count} arquivo(s) JSON individuais anexado(s)")
+        
+        # Anexa o arquivo consolidado se existir (SEMPRE, independente do attach_json)
+        if consolidated_file and (consolidated_content is not None or os.path.exists(consolidated_file)):
+            try:
+                if consolidated_content is None:
+                    with open(consolidated_file, 'rb') as f:
+                        consolidated_content = f.read()
                 
-                attachment = MIMEBase('application', 'json')
-                attachment.set_payload(json_data.encode('utf-8'))
-                encoders.encode_base64(attachment)
+                # Nome do arquivo gerado (market_data_consolidated_for_ai.json, .gz ou .xz)
+                msg.attach(self.create_json_attachment(consolidated_content, os.path.basename(consolidated_file)))
+                self.logger.info("[AI-FILE] Arquivo consolidado anexado")
                 
-                timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-                attachment.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename="market_data_{timestamp_file}.json"'
-                )
-                msg.attach(attachment)
-                self.logger.info("[ATTACH] 1 arquivo JSON atual anexado")
-
-            # Envia o email
-            server = smtplib.SMTP(self.email_host, self.email_port)
-            server.starttls()
-            server.login(self.email_user, self.email_password)
+            except Exception as e:
+                self.logger.error(f"[ERROR] Erro ao anexar arquivo consolidado: {str(e)}")
+        
+        # Anexa JSON atual se não há pasta nem consolidado
+        if attach_json and not json_folder and not consolidated_file:
+            # Comportamento padrão - apenas o JSON atual
+            json_data = json_codec.dumpb(market_data, compact=JSON_COMPACT_OUTPUT)
             
-            server.send_message(msg)
-            server.quit()
+            timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
+            msg.attach(self.create_json_attachment(json_data, f"market_data_{timestamp_file}.json"))
+            self.logger.info("[ATTACH] 1 arquivo JSON atual anexado")
+
+        return msg
+
+    def send_market_data(self, market_data: Dict, attach_json: bool = True, json_folder: str = None,
+                         consolidated_file: str = None, created_at: Optional[datetime] = None,
+                         consolidated_content: Optional[bytes] = None) -> bool:
+        """Envia email com dados de mercado (na thread atual, pela conexão SMTP persistente)"""
+        if not self.email_enabled:
+            self.logger.info("Email desabilitado via configuração")
+            return False
+
+        if not self.email_user or not self.email_password or not self.email_to:
+            self.logger.error("Configurações de email incompletas")
+            return False
+
+        try:
+            msg = self.create_message(market_data, attach_json, json_folder, consolidated_file, created_at,
+                                      consolidated_content)
+            self._deliver(msg)
 
             self.logger.info(f"Email enviado com sucesso para {self.email_to}")
             return True
@@ -298,21 +346,156 @@ Para ver o relatório completo, visualize este email em HTML ou consulte o arqui
             self.logger.error(f"Erro ao enviar email: {str(e)}")
             return False
 
+    def _connect(self) -> smtplib.SMTP:
+        """Conexão SMTP autenticada, reaproveitada se ainda responde (com lock)"""
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.logger.info("[SMTP] Conexão perdida, reconectando")
+            self._disconnect()
+
+        server = smtplib.SMTP(self.email_host, self.email_port, timeout=self.smtp_timeout)
+        try:
+            server.starttls()
+            server.login(self.email_user, self.email_password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        return server
+
+    def _disconnect(self):
+        """Encerra a conexão SMTP atual, se houver (com lock)"""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _deliver(self, msg: MIMEMultipart):
+        """Envia pela conexão persistente; se falhar, reconecta e tenta mais uma vez"""
+        with self._smtp_lock:
+            try:
+                self._connect().send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                self.logger.warning(f"[SMTP] Falha no envio ({str(e)}), tentando com nova conexão")
+                self._disconnect()
+                self._connect().send_message(msg)
+
+    def submit_market_data(self, market_data: Dict, **options) -> bool:
+        """
+        Agenda o envio em segundo plano (mesmos argumentos de send_market_data)
+        e retorna sem esperar pelo SMTP. O consolidado é lido agora, não no
+        envio. Com EMAIL_BACKGROUND_SEND=false envia na hora. Retorna False
+        se o email está desabilitado.
+        """
+        if not self.background_send:
+            return self.send_market_data(market_data, **options)
+        if not self.email_enabled:
+            self.logger.info("Email desabilitado via configuração")
+            return False
+
+        consolidated_content = None
+        consolidated_file = options.get('consolidated_file')
+        if consolidated_file and os.path.exists(consolidated_file):
+            with open(consolidated_file, 'rb') as f:
+                consolidated_content = f.read()
+
+        self._start_worker()
+        self._put_dropping_oldest(QueuedReport(datetime.now(), time.monotonic(), market_data, options,
+                                               consolidated_content))
+        return True
+
+    def _put_dropping_oldest(self, item: QueuedReport):
+        """Coloca na fila sem bloquear; com a fila cheia o relatório mais antigo perde a vez"""
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped_count += 1
+                self.logger.warning("[QUEUE] Fila de email cheia, relatório mais antigo descartado")
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_worker, name="EmailSender", daemon=True)
+            self._worker.start()
+
+    def _run_worker(self):
+        """Thread de envio: manda sempre o relatório mais recente da fila; None encerra"""
+        stopping = False
+        while not stopping:
+            report = self._queue.get()
+            # Relatórios que chegaram enquanto o anterior era enviado: só o mais recente importa
+            skipped = 0
+            while report is not None:
+                try:
+                    newer = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    # Encerramento pedido depois deste relatório: ele ainda é enviado
+                    stopping = True
+                    break
+                skipped += 1
+                report = newer
+            if skipped:
+                self.dropped_count += skipped
+                self.logger.warning(f"[QUEUE] {skipped} relatório(s) antigo(s) substituído(s) pelo mais recente")
+            if report is None:
+                break
+
+            age = time.monotonic() - report.enqueued_at
+            if age > self.max_report_age:
+                self.dropped_count += 1
+                self.logger.warning(f"[QUEUE] Relatório descartado: {age:.0f}s na fila")
+                continue
+
+            if self.send_market_data(report.market_data, created_at=report.created_at,
+                                     consolidated_content=report.consolidated_content, **report.options):
+                self.sent_count += 1
+            else:
+                self.failed_count += 1
+
+    def close(self, timeout: float = 10):
+        """
+        Para a thread de envio depois de enviar o último relatório pendente e
+        encerra a conexão SMTP (espera até timeout segundos)
+        """
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            deadline = time.monotonic() + timeout
+            try:
+                # Bloqueia até haver espaço: nenhum relatório pendente é descartado pelo encerramento
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                self.logger.warning("[QUEUE] Thread de envio não respondeu ao encerramento")
+            worker.join(max(deadline - time.monotonic(), 0))
+        with self._smtp_lock:
+            self._disconnect()
+
     def test_connection(self) -> bool:
-        """Testa a conexão com o servidor de email"""
+        """Testa a conexão com o servidor de email (a conexão fica aberta para os envios)"""
         if not self.email_user or not self.email_password:
             self.logger.error("Credenciais de email não configuradas")
             return False
 
         try:
-            server = smtplib.SMTP(self.email_host, self.email_port)
-            server.starttls()
-            server.login(self.email_user, self.email_password)
-            server.quit()
+            with self._smtp_lock:
+                self._connect()
             
             self.logger.info("Conexão com servidor de email testada com sucesso")
             return True
             
         except Exception as e:
             self.logger.error(f"Erro ao testar conexão de email: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
@@ -0,0 +1,175 @@
+import os
+import queue
+import struct
+import threading
+import time
+import logging
+from typing import BinaryIO, Iterator, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class EventJournal:
+    """
+    Journal binário append-only de eventos (timestamp + valores float64).
+
+    append() só enfileira o evento; uma thread de fundo grava os eventos em
+    lotes (uma escrita por lote), de modo que quem produz os eventos nunca
+    espera pelo disco. Registros têm tamanho fixo: um registro incompleto no
+    fim do arquivo (queda no meio de uma escrita) é descartado na leitura.
+    A compactação reescreve o arquivo só com os eventos ainda dentro da
+    retenção, de forma atômica (arquivo temporário + os.replace); a thread de
+    gravação compacta ao iniciar e depois a cada compact_interval.
+
+    Só uma instância grava em cada arquivo: a primeira escrita (ou
+    compactação) obtém um lock exclusivo em <path>.lock, mantido até stop().
+    Antes de start() a instância só lê o arquivo e não obtém o lock.
+    Outra instância com o mesmo caminho, no mesmo processo ou em outro, ainda
+    lê o journal, mas não grava nem compacta (evita eventos duplicados e
+    compactações concorrentes). O diretório só é criado na primeira escrita.
+    """
+
+    def __init__(self, path: str, num_values: int, retention_seconds: float,
+                 flush_interval: float = 1.0, compact_interval: float = 3600, max_queue: int = 100000):
+        self.path = path
+        self.record = struct.Struct('<d' + 'd' * num_values)
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.logger = logging.getLogger(f"{self.__class__.__name__}[{os.path.basename(path)}]")
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.thread: Optional[threading.Thread] = None
+        self.is_running = False
+        self.dropped = 0
+        self.last_compaction = time.time()
+        self._lock_file: Optional[BinaryIO] = None
+        self._lock_denied = False
+
+    def _acquire(self) -> bool:
+        """Garante o lock de escrita do arquivo (criando o diretório); False se outra instância o tem"""
+        if self._lock_file is not None:
+            return True
+        if self._lock_denied:
+            return False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(f"{self.path}.lock", 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            self._lock_denied = True
+            self.logger.warning("Journal em uso por outra instância: eventos desta não serão gravados")
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release(self):
+        """Libera o lock de escrita (fechar o arquivo desfaz o lock)"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self._lock_denied = False
+
+    def start(self):
+        """Inicia a thread de gravação"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True, name=f"journal-{os.path.basename(self.path)}")
+        self.thread.start()
+
+    def stop(self):
+        """Grava os eventos pendentes e para a thread"""
+        self.is_running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        self._release()
+
+    def append(self, ts: float, values: Sequence[float]):
+        """Enfileira um evento para gravação (não bloqueia)"""
+        try:
+            self.queue.put_nowait((ts, *values))
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first=None) -> list:
+        batch = [first] if first is not None else []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write(self, batch: list):
+        if not batch or not self._acquire():
+            return
+        data = b''.join(self.record.pack(*event) for event in batch)
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def _writer_loop(self):
+        """Compacta o journal, depois grava lotes de eventos e compacta periodicamente"""
+        try:
+            self.compact()
+        except Exception as e:
+            self.logger.error(f"Erro ao compactar journal: {e}")
+        while self.is_running or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+            try:
+                self._write(self._drain(first))
+                if time.time() - self.last_compaction >= self.compact_interval:
+                    self.compact()
+            except Exception as e:
+                self.logger.error(f"Erro ao gravar journal: {e}")
+            if first is not None:
+                # Agrupa os eventos que chegarem durante o intervalo em uma escrita só
+                time.sleep(self.flush_interval)
+
+    def load(self, since: Optional[float] = None) -> Iterator[Tuple[float, ...]]:
+        """Lê os eventos gravados (opcionalmente só os com timestamp >= since)"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return iter(())
+
+        usable = len(data) - len(data) % self.record.size
+        if usable != len(data):
+            self.logger.warning(f"Registro incompleto no fim do journal descartado ({len(data) - usable} bytes)")
+        records = self.record.iter_unpack(memoryview(data)[:usable])
+        if since is None:
+            return records
+        return (event for event in records if event[0] >= since)
+
+    def compact(self, events: Optional[Sequence[Tuple[float, ...]]] = None):
+        """
+        Reescreve o journal mantendo apenas os eventos dentro da retenção
+        (ou os eventos já carregados, se informados). Também elimina um
+        eventual registro incompleto no fim do arquivo. Não faz nada se o
+        journal ainda não existe ou se outra instância grava nele.
+        """
+        if not os.path.exists(self.path) or not self._acquire():
+            return
+        if events is None:
+            events = list(self.load(time.time() - self.retention_seconds))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(self.record.pack(*event) for event in events))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.last_compaction = time.time()
+        self.logger.debug(f"Journal compactado: {len(events)} evento(s) mantido(s)")
@@ -0,0 +1,101 @@
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Optional, Union
+import logging
+
+import numpy as np
+
+from ..config import JSON_BACKEND
+from .compression import CompressedWriter, CompressionStats, read_bytes
+
+logger = logging.getLogger(__name__)
+
+# Backend rápido opcional: orjson (parse/serialização em C, saída em bytes UTF-8)
+orjson = None
+if JSON_BACKEND in ('auto', 'orjson'):
+    try:
+        import orjson
+    except ImportError:
+        if JSON_BACKEND == 'orjson':
+            logger.warning("orjson não instalado, usando json da biblioteca padrão")
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# Mesmo resultado nos dois backends:
+# - NaN/Infinity viram null (JSON válido);
+# - tipos NumPy viram números/listas nativos, datas viram ISO 8601;
+# - texto em UTF-8, sem escapes \uXXXX;
+# - modo indentado (2 espaços) para leitura humana ou compacto para máquinas.
+
+def _default(obj: Any) -> Any:
+    """Converte tipos não nativos do JSON (NumPy, datas)"""
+    if isinstance(obj, (np.ndarray, np.float32)) and obj.dtype == np.float32:
+        # Menor representação em float32 (como o orjson), não o valor estendido para float64
+        return obj.astype(str).astype(float).tolist()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Tipo {type(obj).__name__} não serializável em JSON")
+
+def _replace_non_finite(obj: Any) -> Any:
+    """Substitui NaN/Infinity por None (equivalente ao comportamento do orjson)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _replace_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_non_finite(value) for value in obj]
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return _replace_non_finite(_default(obj))
+    return obj
+
+def _stdlib_loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Decodifica JSON (str ou bytes)"""
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+def _stdlib_dumpb(obj: Any, compact: bool = False) -> bytes:
+    """Serializa para bytes UTF-8 (indentado com 2 espaços, ou compacto)"""
+    kwargs = {'separators': (',', ':')} if compact else {'indent': 2}
+    try:
+        text = json.dumps(obj, ensure_ascii=False, allow_nan=False, default=_default, **kwargs)
+    except ValueError:
+        # Só percorre a estrutura quando há NaN/Infinity
+        text = json.dumps(_replace_non_finite(obj), ensure_ascii=False, default=_default, **kwargs)
+    return text.encode('utf-8')
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _orjson_loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        """Decodifica JSON (str ou bytes)"""
+        return orjson.loads(data)
+
+    def _orjson_dumpb(obj: Any, compact: bool = False) -> bytes:
+        """Serializa para bytes UTF-8 (indentado com 2 espaços, ou compacto)"""
+        options = _OPTIONS if compact else _OPTIONS | orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=options)
+
+    loads, dumpb = _orjson_loads, _orjson_dumpb
+else:
+    loads, dumpb = _stdlib_loads, _stdlib_dumpb
+
+def dumps(obj: Any, compact: bool = False) -> str:
+    """Serializa para str"""
+    return dumpb(obj, compact).decode('utf-8')
+
+def dump(obj: Any, path: str, compact: bool = False, compression: Optional[str] = None,
+         level: int = 6) -> CompressionStats:
+    """Grava o objeto como JSON no arquivo (UTF-8), opcionalmente comprimido (gzip/lzma)"""
+    with CompressedWriter(path, compression, level) as writer:
+        writer.write(dumpb(obj, compact))
+    return writer.stats
+
+def load(path: str) -> Any:
+    """Lê um arquivo JSON (comprimido ou não)"""
+    return loads(read_bytes(path))
@@ -0,0 +1,294 @@
+import mmap
+import os
+import struct
+import threading
+import logging
+import numpy as np
+from bisect import bisect_right
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# Cabeçalho de cada registro: tipo, timestamp (epoch s), níveis de bids, níveis de asks.
+# Em seguida vêm os níveis (preço, quantidade) em float64: bids e depois asks.
+HEADER = struct.Struct('<BdII')
+KEYFRAME = 1
+DELTA = 2
+SEGMENT_SUFFIX = '.obk'
+
+Side = Tuple[np.ndarray, np.ndarray]  # (preços crescentes, quantidades)
+
+def _sorted_side(prices: np.ndarray, qtys: np.ndarray) -> Side:
+    prices = np.asarray(prices, dtype=float)
+    qtys = np.asarray(qtys, dtype=float)
+    order = np.argsort(prices, kind='stable')
+    return prices[order], qtys[order]
+
+def _matches(prices: np.ndarray, reference: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Para cada preço: se existe em reference (ordenado) e a posição correspondente"""
+    if not len(reference):
+        return np.zeros(len(prices), dtype=bool), np.zeros(len(prices), dtype=int)
+    position = np.minimum(np.searchsorted(reference, prices), len(reference) - 1)
+    return reference[position] == prices, position
+
+def _side_delta(previous: Side, current: Side) -> np.ndarray:
+    """Níveis (preço, quantidade) que mudaram; níveis que saíram vão com quantidade zero"""
+    prev_prices, prev_qtys = previous
+    prices, qtys = current
+
+    known, position = _matches(prices, prev_prices)
+    changed = ~known
+    changed[known] = prev_qtys[position[known]] != qtys[known]
+    removed = ~_matches(prev_prices, prices)[0]
+
+    return np.concatenate([
+        np.column_stack((prices[changed], qtys[changed])),
+        np.column_stack((prev_prices[removed], np.zeros(int(removed.sum()))))
+    ])
+
+class OrderBookRecorder:
+    """
+    Gravador do histórico do livro de ordens em segmentos binários.
+
+    Cada registro é um keyframe (livro completo) ou um delta (só os níveis
+    que mudaram desde o registro anterior; quantidade zero remove o nível).
+    Um keyframe é gravado a cada keyframe_seconds e no início de cada
+    segmento, de modo que cada segmento pode ser lido isoladamente. A
+    retenção remove segmentos inteiros.
+    """
+
+    def __init__(self, directory: str, keyframe_seconds: float = 300, segment_seconds: float = 3600,
+                 retention_seconds: Optional[float] = None):
+        self.directory = directory
+        self.keyframe_seconds = keyframe_seconds
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds or None
+        self.logger = logging.getLogger(f"{self.__class__.__name__}[{os.path.basename(directory)}]")
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        # Única listagem do diretório: segmentos existentes (para a retenção)
+        self._segment_starts: List[int] = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+        self._file: Optional[BinaryIO] = None
+        self._segment_start: Optional[float] = None
+        self._last_keyframe: Optional[float] = None
+        self._last_ts: Optional[float] = None
+        self._state: Optional[Tuple[Side, Side]] = None
+        self.bytes_written = 0
+        self.records_written = 0
+
+    def _segment_path(self, start_ms: int) -> str:
+        return os.path.join(self.directory, f"{start_ms}{SEGMENT_SUFFIX}")
+
+    def _open_segment(self, ts: float):
+        """Fecha o segmento atual e abre um novo (com lock)"""
+        if self._file is not None:
+            self._file.close()
+        start_ms = int(ts * 1000)
+        self._file = open(self._segment_path(start_ms), 'ab')
+        self._segment_start = ts
+        self._segment_starts.append(start_ms)
+        self._last_keyframe = None
+        self._enforce_retention(ts)
+
+    def _enforce_retention(self, now: float):
+        """Remove segmentos cujo sucessor já começa fora da retenção (com lock)"""
+        if self.retention_seconds is None:
+            return
+        cutoff_ms = (now - self.retention_seconds) * 1000
+        while len(self._segment_starts) > 1 and self._segment_starts[1] <= cutoff_ms:
+            path = self._segment_path(self._segment_starts.pop(0))
+            if os.path.exists(path):
+                os.remove(path)
+            self.logger.info(f"[CLEAN] Segmento do livro removido pela retenção: {os.path.basename(path)}")
+
+    def record(self, ts: float, bid_prices: np.ndarray, bid_qtys: np.ndarray,
+               ask_prices: np.ndarray, ask_qtys: np.ndarray) -> int:
+        """Grava o livro no instante ts (keyframe ou delta); retorna o tamanho do registro em bytes"""
+        current = (_sorted_side(bid_prices, bid_qtys), _sorted_side(ask_prices, ask_qtys))
+        with self.lock:
+            if self._last_ts is not None and ts < self._last_ts:
+                raise ValueError("Livro anterior ao último gravado")
+            if self._file is None or ts >= self._segment_start + self.segment_seconds:
+                self._open_segment(ts)
+
+            if self._last_keyframe is None or ts - self._last_keyframe >= self.keyframe_seconds:
+                kind = KEYFRAME
+                bids = np.column_stack(current[0])
+                asks = np.column_stack(current[1])
+                self._last_keyframe = ts
+            else:
+                kind = DELTA
+                bids = _side_delta(self._state[0], current[0])
+                asks = _side_delta(self._state[1], current[1])
+
+            record = HEADER.pack(kind, ts, len(bids), len(asks)) + bids.tobytes() + asks.tobytes()
+            self._file.write(record)
+            self._file.flush()
+            self._state = current
+            self._last_ts = ts
+            self.bytes_written += len(record)
+            self.records_written += 1
+        return len(record)
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class _SegmentView:
+    """Segmento mapeado em memória, com o índice dos cabeçalhos (sem ler os níveis)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+        timestamps, offsets, kinds = [], [], []
+        offset = 0
+        while offset + HEADER.size <= self.size:
+            kind, ts, n_bids, n_asks = HEADER.unpack_from(self.buffer, offset)
+            end = offset + HEADER.size + (n_bids + n_asks) * 16
+            if end > self.size or (timestamps and ts < timestamps[-1]):
+                break  # Registro incompleto ou inválido no fim (gravação interrompida)
+            timestamps.append(ts)
+            offsets.append(offset)
+            kinds.append(kind)
+            offset = end
+        self.timestamps = np.array(timestamps)
+        self.offsets = offsets
+        self.keyframes = np.flatnonzero(np.array(kinds) == KEYFRAME)
+
+    def levels(self, position: int) -> Tuple[int, np.ndarray, np.ndarray]:
+        """
+        (tipo, níveis de bids, níveis de asks) do registro; arrays sobre o mmap,
+        sem cópia, que mantêm o mapeamento vivo enquanto existirem.
+        """
+        kind, _, n_bids, n_asks = HEADER.unpack_from(self.buffer, self.offsets[position])
+        start = self.offsets[position] + HEADER.size
+        levels = np.frombuffer(self.buffer, dtype='<f8', count=(n_bids + n_asks) * 2, offset=start).reshape(-1, 2)
+        return kind, levels[:n_bids], levels[n_bids:]
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                # Arrays de levels() ainda usam o mapeamento: é liberado junto com o último deles
+                pass
+
+class OrderBookReader:
+    """
+    Leitor do histórico gravado por OrderBookRecorder.
+
+    Os segmentos são mapeados em memória (mmap) sob demanda: só os
+    cabeçalhos são percorridos para indexar timestamps e keyframes, e os
+    níveis são lidos direto do mapeamento. book_at() localiza segmento e
+    keyframe por busca binária e aplica apenas os deltas até o instante
+    pedido; replay() percorre um intervalo aplicando os deltas em sequência.
+    Segmentos removidos pela retenção depois da listagem são ignorados.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._starts: List[int] = []
+        self._views: Dict[int, _SegmentView] = {}
+        self.refresh()
+
+    def refresh(self):
+        """Lista de novo os segmentos (novos segmentos gravados depois da abertura)"""
+        self._starts = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+        # Mapeamentos antigos não são fechados aqui: um replay em andamento pode
+        # estar usando a view; o mmap é liberado quando ninguém mais a referencia
+        for start in set(self._views) - set(self._starts):
+            del self._views[start]
+
+    def _view(self, start: int) -> Optional[_SegmentView]:
+        """View do segmento iniciado em start (ms); None se ele já foi removido"""
+        view = self._views.get(start)
+        path = os.path.join(self.directory, f"{start}{SEGMENT_SUFFIX}")
+        try:
+            # Segmento que cresceu desde o mapeamento (ainda em gravação): mapeia de novo
+            if view is None or os.path.getsize(path) != view.size:
+                view = self._views[start] = _SegmentView(path)
+        except FileNotFoundError:
+            self._views.pop(start, None)
+            if start in self._starts:
+                self._starts.remove(start)
+            return None
+        return view
+
+    @staticmethod
+    def _apply(book: Tuple[Dict[float, float], Dict[float, float]], kind: int,
+               bids: np.ndarray, asks: np.ndarray):
+        for side, levels in zip(book, (bids, asks)):
+            if kind == KEYFRAME:
+                side.clear()
+            for price, qty in levels.tolist():
+                if qty == 0:
+                    side.pop(price, None)
+                else:
+                    side[price] = qty
+
+    @staticmethod
+    def _levels(book: Tuple[Dict[float, float], Dict[float, float]]) -> Tuple[List[List[float]], List[List[float]]]:
+        """Níveis [preço, quantidade]: bids do maior para o menor preço, asks do menor para o maior"""
+        bids, asks = book
+        return ([[price, bids[price]] for price in sorted(bids, reverse=True)],
+                [[price, asks[price]] for price in sorted(asks)])
+
+    def book_at(self, ts: float) -> Optional[Tuple[float, List[List[float]], List[List[float]]]]:
+        """Livro (timestamp do registro, bids, asks) mais recente com timestamp <= ts; None se não houver"""
+        index = bisect_right(self._starts, int(ts * 1000))
+        for start in reversed(self._starts[:index]):
+            view = self._view(start)
+            if view is None:
+                continue
+            position = int(np.searchsorted(view.timestamps, ts, side='right')) - 1
+            keyframe = int(np.searchsorted(view.keyframes, position, side='right')) - 1
+            if position >= 0 and keyframe >= 0:
+                book: Tuple[Dict[float, float], Dict[float, float]] = ({}, {})
+                for record in range(int(view.keyframes[keyframe]), position + 1):
+                    self._apply(book, *view.levels(record))
+                return (float(view.timestamps[position]), *self._levels(book))
+            # Nada gravado até ts neste segmento: tenta o anterior
+        return None
+
+    def replay(self, start: Optional[float] = None, end: Optional[float] = None
+               ) -> Iterator[Tuple[float, List[List[float]], List[List[float]]]]:
+        """Livros (timestamp, bids, asks) gravados com start <= timestamp <= end, em ordem"""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        first = max(bisect_right(self._starts, start * 1000) - 1, 0)
+        for segment_start in self._starts[first:]:
+            if segment_start > end * 1000:
+                break
+            view = self._view(segment_start)
+            if view is None:
+                continue
+            book: Tuple[Dict[float, float], Dict[float, float]] = ({}, {})
+            # Começa no último keyframe antes de start para ter o livro completo
+            position = int(np.searchsorted(view.timestamps, start, side='left'))
+            keyframe = int(np.searchsorted(view.keyframes, position, side='right')) - 1
+            record = int(view.keyframes[keyframe]) if keyframe >= 0 else 0
+            synced = False
+            for record in range(record, len(view.timestamps)):
+                kind, bids, asks = view.levels(record)
+                synced = synced or kind == KEYFRAME
+                self._apply(book, kind, bids, asks)
+                ts = float(view.timestamps[record])
+                if ts > end:
+                    return
+                if synced and ts >= start:
+                    yield (ts, *self._levels(book))
+
+    def close(self):
+        for view in self._views.values():
+            view.close()
+        self._views = {}
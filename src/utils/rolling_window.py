@@ -0,0 +1,126 @@
+import threading
+import time
+from array import array
+from typing import Dict, Optional, Sequence
+
+class RollingWindowAggregator:
+    """
+    Somas em janelas deslizantes de tempo sobre um anel fixo de buckets.
+
+    Cada bucket acumula os campos dos eventos do seu intervalo de tempo. Para cada
+    janela é mantido um total corrente: quando o tempo avança, os buckets que
+    saem da janela são subtraídos. Leituras custam O(1) amortizado e a memória
+    depende só do número de buckets (maior janela / tamanho do bucket), não da
+    taxa de eventos.
+    """
+
+    def __init__(self, fields: Sequence[str], windows: Dict[str, float], bucket_seconds: float):
+        self.fields = tuple(fields)
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = {
+            name: max(1, int(round(seconds / bucket_seconds)))
+            for name, seconds in windows.items()
+        }
+        self.size = max(self.window_buckets.values())
+
+        # Um anel por campo: array('d') evita objetos float por bucket
+        self._rings = [array('d', bytes(8 * self.size)) for _ in self.fields]
+        self._totals = {name: [0.0] * len(self.fields) for name in self.window_buckets}
+        self._head: Optional[int] = None  # Índice absoluto do bucket mais recente
+        self._first_bucket: Optional[int] = None
+
+        self.lock = threading.Lock()
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def _reset(self, bucket: int):
+        """Zera o anel e os totais; a cobertura recomeça no bucket atual (com lock)"""
+        for ring in self._rings:
+            for slot in range(self.size):
+                ring[slot] = 0.0
+        for totals in self._totals.values():
+            for i in range(len(totals)):
+                totals[i] = 0.0
+        self._head = bucket
+        self._first_bucket = bucket
+
+    def _recompute_totals(self):
+        """Recalcula os totais a partir do anel (elimina erro acumulado de ponto flutuante)"""
+        for name, length in self.window_buckets.items():
+            totals = self._totals[name]
+            slots = [(self._head - k) % self.size for k in range(length)]
+            for i, ring in enumerate(self._rings):
+                totals[i] = sum(ring[slot] for slot in slots)
+
+    def _advance(self, bucket: int):
+        """Avança o bucket mais recente, expirando o que sai de cada janela (com lock)"""
+        if self._head is None:
+            self._head = bucket
+            self._first_bucket = bucket
+            return
+        if bucket <= self._head:
+            return
+        if bucket - self._head >= self.size:
+            self._reset(bucket)
+            return
+
+        for step in range(self._head + 1, bucket + 1):
+            for name, length in self.window_buckets.items():
+                leaving = (step - length) % self.size
+                totals = self._totals[name]
+                for i, ring in enumerate(self._rings):
+                    totals[i] -= ring[leaving]
+            slot = step % self.size
+            for ring in self._rings:
+                ring[slot] = 0.0
+            if slot == 0:
+                self._head = step
+                self._recompute_totals()
+        self._head = bucket
+
+    def add(self, ts: float, values: Sequence[float]):
+        """Soma os valores (na ordem de fields) no bucket do instante ts (segundos)"""
+        bucket = self._bucket(ts)
+        with self.lock:
+            self._advance(bucket)
+            age = self._head - bucket
+            if age >= self.size:
+                return  # Evento mais antigo que a maior janela
+            if self._first_bucket is None or bucket < self._first_bucket:
+                self._first_bucket = bucket
+
+            slot = bucket % self.size
+            for i, value in enumerate(values):
+                self._rings[i][slot] += value
+            for name, length in self.window_buckets.items():
+                if age < length:
+                    totals = self._totals[name]
+                    for i, value in enumerate(values):
+                        totals[i] += value
+
+    def reset(self, now: Optional[float] = None):
+        """Descarta tudo o que foi acumulado; a cobertura recomeça em now (padrão: agora)"""
+        with self.lock:
+            self._reset(self._bucket(time.time() if now is None else now))
+
+    def totals(self, window: str, now: Optional[float] = None) -> Dict[str, float]:
+        """Totais da janela até o instante now (padrão: agora)"""
+        with self.lock:
+            self._advance(self._bucket(time.time() if now is None else now))
+            return dict(zip(self.fields, self._totals[window]))
+
+    def all_totals(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Totais de todas as janelas"""
+        with self.lock:
+            self._advance(self._bucket(time.time() if now is None else now))
+            return {name: dict(zip(self.fields, totals)) for name, totals in self._totals.items()}
+
+    def coverage_seconds(self, now: Optional[float] = None) -> float:
+        """Há quanto tempo há dados acumulados (limitado à maior janela)"""
+        with self.lock:
+            if self._first_bucket is None:
+                return 0.0
+            now = time.time() if now is None else now
+            covered = now - self._first_bucket * self.bucket_seconds
+            return max(0.0, min(covered, self.size * self.bucket_seconds))
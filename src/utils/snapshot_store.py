@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+import logging
+import numpy as np
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from . import json_codec
+from .compression import CompressionStats, compress, decompress, method_name
+from .candle_table import CandleTable, normalize_snapshot, denormalize_snapshot, oldest_reference
+
+# Métricas escalares guardadas em colunas no índice: nome -> caminho no snapshot
+METRIC_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'current_price': ('current_price',),
+    'vwap_1h': ('vwap', '1h'),
+    'vwap_4h': ('vwap', '4h'),
+    'vwap_d': ('vwap', 'd'),
+    'spread': ('order_book', 'spread'),
+    'imbalance_pct': ('order_book', 'imbalance_pct'),
+    'imbalance_score': ('order_book', 'imbalance_score'),
+    'funding_rate': ('derivatives', 'funding_rate'),
+    'open_interest_usd': ('derivatives', 'open_interest_usd'),
+    'oi_change_4h_pct': ('derivatives', 'oi_change_4h_pct'),
+    'volume_24h': ('stats', 'volume_24h'),
+    'delta_volume_absolute': ('flow', 'delta_volume_absolute'),
+    'perp_cvd': ('flow', 'perp_cvd'),
+    'spot_cvd': ('flow', 'spot_cvd'),
+    'total_liqs_24h': ('liquidations', 'total_liqs_24h'),
+}
+
+def _metric_value(snapshot: Dict, path: Sequence[str]) -> float:
+    value: Any = snapshot
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return np.nan
+        value = value[key]
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class _Segment:
+    """Um segmento: payloads JSON (comprimidos ou não) concatenados (.seg) + índice de registros fixos (.idx)"""
+
+    def __init__(self, base_path: str, dtype: np.dtype):
+        self.data_path = f"{base_path}.seg"
+        self.index_path = f"{base_path}.idx"
+        self.dtype = dtype
+        self.index = np.empty(0, dtype=dtype)
+        self.data_size = 0
+
+    def load(self, logger: logging.Logger):
+        """Carrega o índice, descartando registros incompletos ou sem payload gravado"""
+        self.data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        raw = b''
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                raw = f.read()
+        usable = len(raw) - len(raw) % self.dtype.itemsize
+        index = np.frombuffer(raw[:usable], dtype=self.dtype).copy()
+        complete = index['offset'] + index['length'] <= self.data_size
+        if usable != len(raw) or not complete.all():
+            logger.warning(f"Registros incompletos descartados em {os.path.basename(self.index_path)}")
+            index = index[complete]
+            with open(self.index_path, 'wb') as f:
+                f.write(index.tobytes())
+        self.index = index
+
+    def append(self, ts: float, payload: bytes, metrics: Sequence[float]):
+        record = np.zeros(1, dtype=self.dtype)
+        record['ts'] = ts
+        record['offset'] = self.data_size
+        record['length'] = len(payload)
+        for name, value in zip(self.dtype.names[3:], metrics):
+            record[name] = value
+        # Payload primeiro: um registro de índice só existe para payload completo
+        with open(self.data_path, 'ab') as f:
+            f.write(payload)
+        with open(self.index_path, 'ab') as f:
+            f.write(record.tobytes())
+        self.data_size += len(payload)
+        self.index = np.concatenate([self.index, record])
+
+    def read(self, positions: np.ndarray) -> Iterator[Tuple[float, Dict]]:
+        """Snapshots como gravados (candles normalizados continuam como referências)"""
+        if len(positions) == 0:
+            return
+        with open(self.data_path, 'rb') as f:
+            for record in self.index[positions]:
+                f.seek(int(record['offset']))
+                yield float(record['ts']), json_codec.loads(decompress(f.read(int(record['length']))))
+
+    def remove(self):
+        for path in (self.data_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+class SnapshotStore:
+    """
+    Série temporal local de snapshots de mercado, append-only.
+
+    Os snapshots são gravados (JSON compacto) em segmentos que cobrem
+    segment_seconds cada; o índice de cada segmento tem registros de tamanho
+    fixo (timestamp, posição, tamanho e as métricas escalares de
+    METRIC_FIELDS), mantidos também em memória. Leituras por intervalo de
+    tempo localizam segmentos e registros por busca binária; métricas são
+    lidas como colunas NumPy sem abrir os payloads.
+
+    A retenção (por idade e/ou quantidade) remove segmentos inteiros, sem
+    varrer o diretório; o diretório só é listado ao abrir o store. Leituras
+    já respeitam a retenção exata, mesmo antes de o segmento ser removido.
+
+    Com normalize_candles, os candles fechados de cada timeframe vão uma única
+    vez para uma CandleTable por intervalo e os snapshots guardam só a faixa
+    de aberturas referenciada (mais o candle em formação). As leituras
+    reconstroem o formato original; a retenção também compacta as tabelas.
+
+    Com compression ('gzip' ou 'lzma'), cada payload é comprimido
+    individualmente; o formato é detectado na leitura, então segmentos
+    gravados com ou sem compressão convivem. last_write guarda o tamanho e o
+    tempo de compressão da última gravação.
+    """
+
+    def __init__(self, directory: str, retention_seconds: Optional[float] = None,
+                 retention_count: Optional[int] = None, segment_seconds: float = 3600,
+                 metrics: Dict[str, Tuple[str, ...]] = METRIC_FIELDS, normalize_candles: bool = False,
+                 compression: Optional[str] = None, compression_level: int = 6):
+        self.directory = directory
+        self.retention_seconds = retention_seconds or None
+        self.retention_count = retention_count or None
+        self.segment_seconds = segment_seconds
+        self.normalize_candles = normalize_candles
+        self.compression = method_name(compression)
+        self.compression_level = compression_level
+        self.last_write: Optional[CompressionStats] = None
+        self.metric_fields = dict(metrics)
+        self.dtype = np.dtype([('ts', '<f8'), ('offset', '<i8'), ('length', '<i8')] +
+                              [(name, '<f8') for name in self.metric_fields])
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments: List[_Segment] = []
+        self._segment_starts: List[float] = []
+        self.candle_tables: Dict[str, CandleTable] = {}
+        self._open()
+
+    def _open(self):
+        """Descobre os segmentos e tabelas de candles existentes (única listagem do diretório)"""
+        names = os.listdir(self.directory)
+        for name in names:
+            if name.startswith('candles_') and name.endswith('.tbl'):
+                self._table(name[len('candles_'):-len('.tbl')])
+        starts = sorted(
+            int(name[:-4]) for name in names
+            if name.endswith('.idx') and name[:-4].isdigit()
+        )
+        for start_ms in starts:
+            segment = _Segment(os.path.join(self.directory, str(start_ms)), self.dtype)
+            segment.load(self.logger)
+            self._segments.append(segment)
+            self._segment_starts.append(start_ms / 1000)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(segment.index) for segment in self._segments)
+
+    def _table(self, interval: str) -> CandleTable:
+        if interval not in self.candle_tables:
+            self.candle_tables[interval] = CandleTable(os.path.join(self.directory, f"candles_{interval}.tbl"))
+        return self.candle_tables[interval]
+
+    def normalize(self, snapshot: Dict) -> Dict:
+        """
+        Snapshot com os candles fechados trocados por referências às tabelas
+        (gravando os candles novos nelas). Idempotente: normalizar de novo o
+        mesmo snapshot não grava nada.
+        """
+        with self.lock:
+            for interval in snapshot.get('timeframes') or {}:
+                self._table(interval)
+            return normalize_snapshot(snapshot, self.candle_tables)
+
+    def candles(self, interval: str, from_ts: int, to_ts: int) -> List[List]:
+        """Candles fechados da tabela do intervalo com from_ts <= abertura <= to_ts"""
+        with self.lock:
+            table = self.candle_tables.get(interval)
+            return table.get(from_ts, to_ts) if table is not None else []
+
+    def append(self, snapshot: Dict, ts: Optional[float] = None) -> float:
+        """Grava um snapshot; retorna o timestamp (epoch em segundos) usado"""
+        ts = time.time() if ts is None else ts
+        metrics = [_metric_value(snapshot, path) for path in self.metric_fields.values()]
+        if self.normalize_candles:
+            snapshot = self.normalize(snapshot)
+        payload, stats = compress(json_codec.dumpb(snapshot, compact=True), self.compression, self.compression_level)
+
+        with self.lock:
+            if self._segments and len(self._segments[-1].index) and ts < self._segments[-1].index['ts'][-1]:
+                raise ValueError("Snapshot anterior ao último gravado")
+            if not self._segments or ts >= self._segment_starts[-1] + self.segment_seconds:
+                start_ms = int(ts * 1000)
+                self._segments.append(_Segment(os.path.join(self.directory, str(start_ms)), self.dtype))
+                self._segment_starts.append(start_ms / 1000)
+            self._segments[-1].append(ts, payload, metrics)
+            self.last_write = stats
+            self._enforce_retention(ts)
+        return ts
+
+    def _cutoff(self, now: Optional[float] = None) -> float:
+        """Menor timestamp dentro da retenção (com lock)"""
+        cutoff = -np.inf
+        if self.retention_seconds is not None:
+            cutoff = (time.time() if now is None else now) - self.retention_seconds
+        if self.retention_count is not None:
+            remaining = self.retention_count
+            for segment in reversed(self._segments):
+                if remaining <= len(segment.index):
+                    if remaining > 0:
+                        cutoff = max(cutoff, float(segment.index['ts'][-remaining]))
+                    break
+                remaining -= len(segment.index)
+        return cutoff
+
+    def _enforce_retention(self, now: Optional[float] = None):
+        """Remove segmentos totalmente fora da retenção (com lock); o segmento atual é mantido"""
+        cutoff = self._cutoff(now)
+        removed = 0
+        while len(self._segments) > 1 and (
+                not len(self._segments[0].index) or self._segments[0].index['ts'][-1] < cutoff):
+            self._segments.pop(0).remove()
+            self._segment_starts.pop(0)
+            removed += 1
+        if removed:
+            self.logger.info(f"[CLEAN] {removed} segmento(s) de snapshots removido(s) pela retenção")
+            self._prune_tables()
+
+    def _prune_tables(self):
+        """Remove das tabelas os candles anteriores ao que o snapshot mais antigo referencia (com lock)"""
+        if not self.candle_tables:
+            return
+        oldest = self._segments[0] if self._segments else None
+        if oldest is None or not len(oldest.index):
+            return
+        # Aberturas referenciadas só avançam com o tempo: basta o primeiro snapshot mantido
+        _, snapshot = next(oldest.read(np.arange(1)))
+        for interval, from_ts in oldest_reference(snapshot).items():
+            if interval in self.candle_tables:
+                self.candle_tables[interval].prune(from_ts)
+
+    def _locate(self, start: Optional[float], end: Optional[float]) -> List[Tuple[_Segment, np.ndarray]]:
+        """Registros com start <= ts <= end por segmento, respeitando a retenção (com lock)"""
+        start = max(self._cutoff(), -np.inf if start is None else start)
+        end = np.inf if end is None else end
+        # Primeiro segmento que pode conter start: o último que começa em ou antes dele
+        first = max(bisect_right(self._segment_starts, start) - 1, 0)
+        located = []
+        for segment in self._segments[first:]:
+            timestamps = segment.index['ts']
+            lo = int(np.searchsorted(timestamps, start, side='left'))
+            hi = int(np.searchsorted(timestamps, end, side='right'))
+            if lo < hi:
+                located.append((segment, np.arange(lo, hi)))
+            if len(timestamps) and timestamps[-1] > end:
+                break
+        return located
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, Dict]]:
+        """Snapshots (timestamp, dados) com start <= timestamp <= end, do mais antigo ao mais recente"""
+        with self.lock:
+            return [(ts, denormalize_snapshot(snapshot, self.candle_tables))
+                    for segment, positions in self._locate(start, end)
+                    for ts, snapshot in segment.read(positions)]
+
+    def latest(self, count: int) -> List[Tuple[float, Dict]]:
+        """Os count snapshots mais recentes, do mais recente ao mais antigo"""
+        with self.lock:
+            selected = []
+            remaining = count
+            for segment in reversed(self._segments):
+                if remaining <= 0:
+                    break
+                take = min(remaining, len(segment.index))
+                selected.append((segment, np.arange(len(segment.index) - take, len(segment.index))))
+                remaining -= take
+            cutoff = self._cutoff()
+            snapshots = [(ts, denormalize_snapshot(snapshot, self.candle_tables))
+                         for segment, positions in reversed(selected)
+                         for ts, snapshot in segment.read(positions)]
+        return [item for item in reversed(snapshots) if item[0] >= cutoff]
+
+    def metrics(self, names: Optional[Sequence[str]] = None, start: Optional[float] = None,
+                end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Colunas de métricas escalares (e 'ts') no intervalo, sem ler os snapshots"""
+        names = list(self.metric_fields) if names is None else list(names)
+        with self.lock:
+            located = self._locate(start, end)
+            parts = [segment.index[positions] for segment, positions in located]
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=self.dtype)
+        return {name: records[name].copy() for name in ['ts'] + names}
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from src.utils.candle_array import CandleArray
+from src.collectors import websocket_liquidations
+from src.collectors.base_stream import BaseWebSocketStream
+from src.collectors.binance_futures_collector import BinanceFuturesCollector
+from src.collectors.kline_cache import KlineCache
+from src.collectors.websocket_klines import WebSocketKlinesCollector
+from src.config import KLINE_INCREMENTAL_LIMIT
+
+def test_from_binance_columns_and_rows():
+    """Testa a conversão da resposta REST e o formato de lista dos candles"""
+    raw = [[1700000000000 + i * 60000, f"{100 + i}.5", f"{101 + i}", f"{99 + i}", f"{100 + i}.25", "3.5",
+            1700000059999 + i * 60000, "350.0", 10, "1.5", "150.0", "0"] for i in range(5)]
+    candles = CandleArray.from_binance(raw)
+
+    assert len(candles) == 5
+    assert candles.close.flags.c_contiguous and not candles.close.flags.writeable
+    assert candles.timestamp.dtype == np.int64
+    assert candles[0] == [100.5, 101.0, 99.0, 100.25, 3.5, 1700000000000]
+    assert candles.tail(2).to_list() == candles.to_list()[-2:]
+    assert candles.to_dataframe()['close'].tolist() == candles.close.tolist()
+
+def test_kline_cache_merge_replaces_forming_candle():
+    """Testa a incorporação de candles novos a partir do timestamp do primeiro"""
+    cache = KlineCache()
+    cache.replace('BTCUSDT', '1m', CandleArray.from_rows([[1, 2, 0, 1, 1, t] for t in range(10)]))
+    before = cache.get('BTCUSDT', '1m', 5)
+
+    cache.merge('BTCUSDT', '1m', CandleArray.from_rows([[5, 6, 4, 5, 1, 9], [7, 8, 6, 7, 1, 10]]), max_size=10)
+    candles = cache.get('BTCUSDT', '1m')
+
+    assert candles.timestamp.tolist() == list(range(1, 11))
+    assert candles[-2] == [5.0, 6.0, 4.0, 5.0, 1.0, 9]
+    # Séries já devolvidas não mudam
+    assert before.timestamp.tolist() == list(range(5, 10)) and before[-1][0] == 1.0
+    assert cache.get('ETHUSDT', '1m').to_list() == []
+
+def test_kline_cache_merge_appends_and_trims_to_max_size():
+    """Testa que candles posteriores ao último são anexados e a janela é limitada a max_size"""
+    cache = KlineCache()
+    cache.merge('BTCUSDT', '1m', CandleArray.from_rows([[1, 2, 0, 1, 1, t] for t in range(5)]), max_size=5)
+    cache.merge('BTCUSDT', '1m', CandleArray.from_rows([[2, 3, 1, 2, 1, t] for t in (5, 6)]), max_size=5)
+
+    assert cache.get('BTCUSDT', '1m').timestamp.tolist() == [2, 3, 4, 5, 6]
+    assert cache.last_open_time('BTCUSDT', '1m') == 6 and cache.size('BTCUSDT', '1m') == 5
+    cache.merge('BTCUSDT', '1m', CandleArray.empty(), max_size=5)
+    assert cache.size('BTCUSDT', '1m') == 5
+
+MINUTE = 60_000
+
+def kline_rows(first, count, close=100.0):
+    """Resposta REST de klines a partir do minuto first"""
+    return [[(first + i) * MINUTE, "100", "101", "99", str(close), "1"] for i in range(count)]
+
+@pytest.fixture
+def futures(monkeypatch):
+    """Coletor de futuros sem streams nem rede; _make_request responde com as linhas de collector.rest"""
+    monkeypatch.setattr(BaseWebSocketStream, 'start_stream', lambda self: None)
+    monkeypatch.setattr(websocket_liquidations, 'LIQUIDATION_JOURNAL_ENABLED', False)
+    collector = BinanceFuturesCollector('BTCUSDT', warm_up_connections=0)
+    collector.rest = kline_rows(0, 200)
+    collector.requests = []
+
+    def make_request(endpoint, params=None, use_cache=True):
+        collector.requests.append(dict(params))
+        rows = [row for row in collector.rest if row[0] >= params.get('startTime', 0)]
+        return rows[:params['limit']] if 'startTime' in params else rows[-params['limit']:]
+    collector._make_request = make_request
+    return collector
+
+def test_get_klines_cold_start_then_incremental(futures):
+    """Testa busca completa no início e, depois, só os candles a partir do último em cache"""
+    candles = futures.get_klines('1m', 50)
+    assert futures.requests == [{'symbol': 'BTCUSDT', 'interval': '1m', 'limit': 50}]
+    assert candles.timestamp.tolist() == [t * MINUTE for t in range(150, 200)]
+
+    # Candle em formação (minuto 199) fechou com outro preço e abriu o minuto 200
+    futures.rest = kline_rows(0, 199) + kline_rows(199, 2, close=105.0)
+    candles = futures.get_klines('1m', 50)
+    assert futures.requests[-1] == {'symbol': 'BTCUSDT', 'interval': '1m', 'limit': KLINE_INCREMENTAL_LIMIT,
+                                    'startTime': 199 * MINUTE}
+    assert candles.timestamp.tolist() == [t * MINUTE for t in range(151, 201)]
+    assert candles.close[-2:].tolist() == [105.0, 105.0] and candles.close[-3] == 100.0
+    assert futures.kline_cache.size('BTCUSDT', '1m') == 50
+
+def test_get_klines_full_reload_after_gap_or_larger_limit(futures):
+    """Testa recarga completa quando o incremento vem cheio (lacuna) ou o limit cresce"""
+    futures.get_klines('1m', 50)
+    futures.rest = kline_rows(0, 400)  # Lacuna maior que KLINE_INCREMENTAL_LIMIT candles
+    candles = futures.get_klines('1m', 50)
+    assert [('startTime' in params) for params in futures.requests] == [False, True, False]
+    assert candles.timestamp.tolist() == [t * MINUTE for t in range(350, 400)]
+
+    candles = futures.get_klines('1m', 80)  # Cache menor que o pedido: busca completa
+    assert 'startTime' not in futures.requests[-1] and len(candles) == 80
+
+def kline_event(minute, close):
+    """Evento do stream combinado <symbol>@kline_1m"""
+    return {'stream': 'btcusdt@kline_1m', 'data': {'e': 'kline', 's': 'BTCUSDT', 'k': {
+        'i': '1m', 't': minute * MINUTE, 'o': '100', 'h': '101', 'l': '99', 'c': str(close), 'v': '1'}}}
+
+def test_kline_stream_gap_falls_back_to_rest(futures, monkeypatch):
+    """Testa que o stream mantém a janela ao vivo e que uma lacuna volta a usar REST"""
+    monkeypatch.setattr(WebSocketKlinesCollector, 'is_connected', lambda self: True)
+    futures.ws_klines = WebSocketKlinesCollector('BTCUSDT', ['1m'], futures.kline_cache)
+    futures.get_klines('1m', 50)
+    assert futures.ws_klines.is_live('1m')
+
+    # Ao vivo: candle em formação e o seguinte vêm do stream, sem REST
+    futures.ws_klines._handle_message(kline_event(199, 103.0))
+    futures.ws_klines._handle_message(kline_event(200, 104.0))
+    candles = futures.get_klines('1m', 50)
+    assert len(futures.requests) == 1
+    assert candles.timestamp[-1] == 200 * MINUTE and candles.close[-2:].tolist() == [103.0, 104.0]
+
+    # Lacuna: o minuto 201 não chegou, o evento do 202 não é incorporado
+    futures.ws_klines._handle_message(kline_event(202, 106.0))
+    assert not futures.ws_klines.is_live('1m')
+    assert futures.kline_cache.last_open_time('BTCUSDT', '1m') == 200 * MINUTE
+
+    futures.rest = kline_rows(0, 203)
+    candles = futures.get_klines('1m', 50)
+    assert futures.requests[-1]['startTime'] == 200 * MINUTE
+    assert candles.timestamp[-1] == 202 * MINUTE
+    assert futures.ws_klines.is_live('1m')  # Sincronizado de novo pelo REST
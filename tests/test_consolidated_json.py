@@ -0,0 +1,72 @@
+import importlib
+import os
+import time
+import pytest
+from src.utils import json_codec
+from src.utils.compression import detect, read_bytes
+
+START = time.time() - 3600  # Dentro da retenção do histórico
+
+def make_snapshot(step):
+    """Snapshot de coleta com janela de 1h que avança a cada passo"""
+    candles = [[100.0 + t, 101.0 + t, 99.0 + t, 100.5 + t, 2.0, t * 3_600_000] for t in range(step, step + 50)]
+    return {
+        'timestamp': f'2024-01-01T00:{step:02d}:00',
+        'current_price': 100000.0 + step,
+        'order_book': {'imbalance_score': 0.5},
+        'derivatives': {'funding_rate': 0.0001, 'funding_history': [0.0001, 0.0002]},
+        'flow': {'delta_volume_absolute': step - 2.0, 'delta_volume_cumulative': [1.0, 2.0]},
+        'timeframes': {'1h': {'candles': candles, 'indicators': {'rsi': {'rsi_14': 55.0}}}}
+    }
+
+@pytest.fixture
+def make_scheduler(tmp_path, monkeypatch):
+    """Agendador sem coletor nem email, com histórico e pasta de saída em tmp_path"""
+    monkeypatch.chdir(tmp_path)  # O módulo cria o log (e a pasta de JSONs) no diretório atual
+    scheduler_module = importlib.import_module('run_collector_with_email')
+    monkeypatch.setattr(scheduler_module, 'MarketDataCollector', lambda: None)
+    monkeypatch.setattr(scheduler_module, 'EmailSender', lambda: None)
+    monkeypatch.setattr(scheduler_module, 'SNAPSHOT_STORE_DIR', str(tmp_path / 'history'))
+    monkeypatch.setattr(scheduler_module, 'CONSOLIDATED_SNAPSHOTS', 3)
+
+    def make(compression, include_raw):
+        monkeypatch.setattr(scheduler_module, 'ATTACHMENT_COMPRESSION', compression)
+        monkeypatch.setattr(scheduler_module, 'CONSOLIDATED_INCLUDE_RAW', include_raw)
+        return scheduler_module.MarketEmailScheduler()
+    return make
+
+def collect(scheduler, steps):
+    for step in steps:
+        data = make_snapshot(step)
+        scheduler.add_snapshot(scheduler.store.append(data, ts=START + step * 120), data)
+
+@pytest.mark.parametrize('compression,include_raw', [('none', False), ('gzip', True), ('lzma', False)])
+def test_consolidated_file_is_valid_json_with_bounded_ring(make_scheduler, compression, include_raw):
+    """Testa JSON válido com e sem compressão, anel limitado e snapshot_info por posição"""
+    scheduler = make_scheduler(compression, include_raw)
+    collect(scheduler, range(5))
+    path = scheduler.generate_consolidated_json()
+
+    with open(path, 'rb') as f:
+        assert detect(f.read(6)) == (None if compression == 'none' else compression)
+    assert not os.path.exists(f"{path}.tmp")
+    document = json_codec.loads(read_bytes(path))
+    snapshots = document['market_snapshots']
+    assert len(scheduler.snapshot_ring) == 3 and document['ai_analysis_metadata']['total_snapshots'] == 3
+    assert [s['price_data']['current_price_usdt'] for s in snapshots] == [100004.0, 100003.0, 100002.0]
+    assert [s['snapshot_info']['sequence_number'] for s in snapshots] == [1, 2, 3]
+    assert snapshots[0]['snapshot_info']['is_most_recent'] and snapshots[0]['snapshot_info']['collection_time'] == '2024-01-01T00:04:00'
+    assert snapshots[0]['technical_indicators']['1h'] == {'rsi': {'rsi_14': 55.0}}
+    assert document['ai_analysis_metadata']['quick_insights']['flow_analysis']['delta_trend'] == 'bullish'
+    assert ('candle_tables' in document) == include_raw
+    if include_raw:
+        assert 'full_data' in snapshots[0]['raw_data_reference']
+
+    # Reinício: o anel é recarregado do histórico e o arquivo é substituído
+    restarted = make_scheduler(compression, include_raw)
+    assert [entry.body['price_data']['current_price_usdt'] for entry in restarted.snapshot_ring] == \
+        [100004.0, 100003.0, 100002.0]
+    collect(restarted, [5])
+    document = json_codec.loads(read_bytes(restarted.generate_consolidated_json()))
+    assert [s['price_data']['current_price_usdt'] for s in document['market_snapshots']] == \
+        [100005.0, 100004.0, 100003.0]
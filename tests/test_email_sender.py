@@ -0,0 +1,115 @@
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+import pytest
+from src.utils import email_sender as email_sender_module
+from src.utils.email_sender import EmailSender
+
+class FakeSMTP:
+    """Servidor SMTP falso: registra conexões e mensagens; pode cair ou travar sob comando"""
+    connections = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.alive = True
+        self.fail_next_send = False
+        self.gate = None
+        self.sending = threading.Event()
+        FakeSMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("conexão encerrada")
+        return 250, b'OK'
+
+    def send_message(self, msg):
+        self.sending.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail_next_send:
+            self.fail_next_send = False
+            raise smtplib.SMTPServerDisconnected("conexão encerrada")
+        self.sent.append(msg['Subject'])
+
+    def quit(self):
+        self.alive = False
+
+    def close(self):
+        self.alive = False
+
+@pytest.fixture
+def sender(monkeypatch):
+    FakeSMTP.connections = []
+    monkeypatch.setattr(email_sender_module.smtplib, 'SMTP', FakeSMTP)
+    for name, value in {'EMAIL_ENABLED': 'true', 'EMAIL_USER': 'bot@example.com', 'EMAIL_PASSWORD': 'x',
+                        'EMAIL_TO': 'trader@example.com', 'EMAIL_QUEUE_SIZE': '2'}.items():
+        monkeypatch.setenv(name, value)
+    sender = EmailSender()
+
+    def create_message(market_data, attach_json=True, json_folder=None, consolidated_file=None,
+                       created_at=None, consolidated_content=None):
+        msg = MIMEText('relatório')
+        # Assunto "n" ou "n/conteúdo do consolidado anexado"
+        msg['Subject'] = str(market_data['n']) + (f"/{consolidated_content.decode()}" if consolidated_content else "")
+        return msg
+    sender.create_message = create_message
+    yield sender
+    sender.close(timeout=1)
+
+def test_persistent_connection_and_reconnect(sender):
+    """Testa reuso da conexão (inclusive a de test_connection) e reconexão após queda ou falha"""
+    assert sender.test_connection()
+    assert sender.send_market_data({'n': 1}) and sender.send_market_data({'n': 2})
+    assert len(FakeSMTP.connections) == 1 and FakeSMTP.connections[0].sent == ['1', '2']
+
+    FakeSMTP.connections[0].alive = False  # Servidor derrubou a conexão ociosa
+    assert sender.send_market_data({'n': 3})
+    FakeSMTP.connections[1].fail_next_send = True  # Cai no meio do envio: reenvia por nova conexão
+    assert sender.send_market_data({'n': 4})
+    assert [connection.sent for connection in FakeSMTP.connections] == [['1', '2'], ['3'], ['4']]
+
+def test_background_queue_coalesces_stale_reports(sender):
+    """Testa que submit não espera pelo SMTP e que relatórios acumulados viram só o mais recente"""
+    assert sender.test_connection()
+    connection = FakeSMTP.connections[0]
+    connection.gate = threading.Event()  # Servidor lento: o primeiro envio fica preso
+
+    start = time.perf_counter()
+    assert sender.submit_market_data({'n': 0}, attach_json=False)
+    assert connection.sending.wait(5)
+    for n in range(1, 6):
+        assert sender.submit_market_data({'n': n}, attach_json=False)
+    assert time.perf_counter() - start < 0.5
+
+    connection.gate.set()
+    deadline = time.time() + 5
+    while sender.sent_count < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert connection.sent == ['0', '5']
+    assert sender.dropped_count == 4 and sender.failed_count == 0
+
+def test_queued_report_keeps_its_attachment_and_close_flushes(sender, tmp_path):
+    """Testa que o anexo é o do ciclo agendado e que close() envia o último relatório pendente"""
+    consolidated = tmp_path / 'market_data_consolidated_for_ai.json'
+    assert sender.test_connection()
+    connection = FakeSMTP.connections[0]
+    connection.gate = threading.Event()
+
+    for n in range(3):
+        consolidated.write_bytes(f'ciclo{n}'.encode())  # Substituído a cada ciclo, como no agendador
+        assert sender.submit_market_data({'n': n}, attach_json=False, consolidated_file=str(consolidated))
+        if n == 0:
+            assert connection.sending.wait(5)
+    consolidated.write_bytes(b'ciclo3')
+
+    connection.gate.set()
+    sender.close(timeout=5)
+    assert connection.sent == ['0/ciclo0', '2/ciclo2']
+    assert not sender._worker.is_alive()
@@ -0,0 +1,107 @@
+import os
+import time
+import pytest
+from src.utils.event_journal import EventJournal
+from src.collectors import websocket_liquidations
+from src.collectors.base_stream import BaseWebSocketStream
+from src.collectors.websocket_liquidations import WebSocketLiquidationsCollector
+
+def liquidation(symbol, side, price, qty, ts_ms):
+    return {'o': {'s': symbol, 'S': side, 'ap': str(price), 'q': str(qty), 'T': ts_ms}}
+
+def test_batched_writes_truncated_tail_and_compaction(tmp_path):
+    """Testa gravação em lotes, descarte de registro incompleto e compactação atômica"""
+    path = str(tmp_path / 'journal' / 'events.journal')
+    journal = EventJournal(path, num_values=2, retention_seconds=3600, flush_interval=0.05)
+    assert not os.path.exists(tmp_path / 'journal')  # Diretório só na primeira escrita
+
+    writes = []
+    original_write = journal._write
+    journal._write = lambda batch: (writes.append(len(batch)) if batch else None, original_write(batch))
+    now = time.time()
+    for i in range(500):
+        journal.append(now - 7210 + i * 20, (float(i), 0.0))  # Nenhum evento no limite da retenção
+    journal.start()
+    journal.stop()
+    assert sum(writes) == 500 and len(writes) < 10
+    assert [event[1] for event in journal.load()] == [float(i) for i in range(500)]
+
+    # Queda no meio de uma escrita: registro incompleto no fim é ignorado
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 5)
+    assert len(list(journal.load())) == 500
+
+    # Compactação: só eventos dentro da retenção, sem resto do registro incompleto nem arquivo temporário
+    journal.compact()
+    kept = list(journal.load())
+    assert kept and all(ts >= now - 3600 for ts, *_ in kept)
+    assert [event[1] for event in kept] == [float(i) for i in range(181, 500)]
+    assert os.path.getsize(path) == len(kept) * journal.record.size
+    assert not os.path.exists(f"{path}.tmp")
+    journal.stop()  # Compactação manual tomou o lock: libera
+
+@pytest.fixture
+def journal_path(tmp_path, monkeypatch):
+    """Journal de liquidações em tmp_path; start_stream só inicia o journal (sem conexão)"""
+    path = str(tmp_path / 'data' / 'liquidations_{symbol}.journal')
+    monkeypatch.setattr(websocket_liquidations, 'LIQUIDATION_JOURNAL_ENABLED', True)
+    monkeypatch.setattr(websocket_liquidations, 'LIQUIDATION_JOURNAL_PATH', path)
+    monkeypatch.setattr(BaseWebSocketStream, 'start_stream', lambda self: None)
+    return path
+
+def test_restore_rebuilds_24h_window(tmp_path, journal_path):
+    """Testa que a janela de 24h é reconstruída do journal ao reiniciar (sem criar diretório antes)"""
+    collector = WebSocketLiquidationsCollector('BTCUSDT')
+    assert not os.path.exists(tmp_path / 'data')
+
+    now_ms = time.time() * 1000
+    collector._handle_message(liquidation('BTCUSDT', 'SELL', 100000, 0.5, now_ms - 3600_000))
+    collector._handle_message(liquidation('BTCUSDT', 'BUY', 100000, 0.2, now_ms - 60_000))
+    collector._handle_message(liquidation('BTCUSDT', 'SELL', 100000, 1.0, now_ms - 25 * 3600_000))  # Fora da janela
+    collector.journals['BTCUSDT'].flush_interval = 0.05
+    collector.start_stream()
+    collector.stop_stream()
+    expected = collector.get_liquidations_24h()
+    assert len(list(collector.journals['BTCUSDT'].load())) == 3
+
+    restarted = WebSocketLiquidationsCollector('BTCUSDT')
+    try:
+        assert restarted.get_liquidations_24h() == expected == {
+            'long_liqs_24h': 50000.0, 'short_liqs_24h': 20000.0, 'total_liqs_24h': 70000.0}
+        # Restauração só lê: a compactação (evento fora da janela removido) vem com start_stream
+        assert len(list(restarted.journals['BTCUSDT'].load())) == 3
+        assert restarted.journals['BTCUSDT']._lock_file is None
+        restarted.journals['BTCUSDT'].flush_interval = 0.05
+        restarted.start_stream()
+    finally:
+        restarted.stop_stream()
+    assert len(list(restarted.journals['BTCUSDT'].load())) == 2
+
+def test_only_started_instance_writes_or_compacts(journal_path):
+    """Testa que instâncias só construídas não tomam o lock e que duas iniciadas não gravam no mesmo arquivo"""
+    now = time.time()
+    idle = WebSocketLiquidationsCollector('BTCUSDT')  # Construída e nunca iniciada
+    first = WebSocketLiquidationsCollector('BTCUSDT')
+    second = WebSocketLiquidationsCollector('BTCUSDT')
+    try:
+        first.start_stream()
+        first.journals['BTCUSDT']._write([(now, 1.0, 0.0)])
+        assert first.journals['BTCUSDT']._lock_file is not None
+        assert idle.journals['BTCUSDT']._lock_file is None
+
+        second.start_stream()
+        second.journals['BTCUSDT']._write([(now, 1.0, 0.0)])  # Mesmo evento recebido pelas duas
+        second.journals['BTCUSDT'].compact([])
+        assert len(list(first.journals['BTCUSDT'].load())) == 1
+    finally:
+        for collector in (idle, first, second):
+            collector.stop_stream()
+
+    # Com as anteriores paradas, outra instância pode assumir o arquivo
+    third = WebSocketLiquidationsCollector('BTCUSDT')
+    try:
+        third.start_stream()
+        third.journals['BTCUSDT']._write([(now + 1, 0.0, 2.0)])
+        assert len(list(third.journals['BTCUSDT'].load())) == 2
+    finally:
+        third.stop_stream()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.indicators.technical_indicators import TechnicalIndicators
+from src.indicators.streaming_indicators import StreamingIndicators
+from src.indicators.batch_indicators import batch_latest_values
+
+def make_candles(n, seed=0, start_price=100000.0):
+    """Candles [open, high, low, close, volume, timestamp] de um passeio aleatório"""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.003)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.003)
+    volume = rng.random(n) * 50
+    return [[float(o), float(h), float(l), float(c), float(v), 1_700_000_000_000 + i * 60_000]
+            for i, (o, h, l, c, v) in enumerate(zip(open_, high, low, close, volume))]
+
+def ta_latest(candles):
+    df = pd.DataFrame(candles, columns=['open', 'high', 'low', 'close', 'volume', 'timestamp'])
+    return TechnicalIndicators(df).get_latest_values()
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for category in expected:
+        assert actual[category].keys() == expected[category].keys(), category
+        for name, value in expected[category].items():
+            if value is None:
+                assert actual[category][name] is None, name
+            else:
+                assert actual[category][name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+@pytest.mark.parametrize('n', [30, 60, 199, 260])
+def test_streaming_matches_ta(n):
+    """Testa o motor incremental contra o ta em séries de vários tamanhos"""
+    candles = make_candles(n, seed=n)
+    engine = StreamingIndicators()
+    engine.sync(candles)
+    assert len(engine) == n
+    assert_same(TechnicalIndicators.format_latest(engine.latest(), len(engine)), ta_latest(candles))
+
+def test_streaming_follows_forming_and_new_candles():
+    """Testa janelas deslizantes com a vela em formação mudando a cada ciclo"""
+    rng = np.random.default_rng(1)
+    history = make_candles(300, seed=2)
+    engine = StreamingIndicators()
+
+    for end in range(210, 300, 7):
+        candles = [list(candle) for candle in history[end - 200:end]]
+        # Vela em formação com valores parciais: depois chega com os finais
+        partial = list(candles[-1])
+        partial[3] = partial[0] * (1 + rng.normal(0, 0.002))
+        partial[1] = max(partial[1], partial[3])
+        partial[2] = min(partial[2], partial[3])
+        engine.sync(candles[:-1] + [partial])
+        assert_same(TechnicalIndicators.format_latest(engine.latest(), len(engine)),
+                    ta_latest(history[10:end - 1] + [partial]))
+        engine.sync(candles)
+
+        # Referência: ta sobre toda a série consumida pelo motor (desde a primeira janela)
+        assert_same(TechnicalIndicators.format_latest(engine.latest(), len(engine)), ta_latest(history[10:end]))
+
+def test_batch_matches_ta():
+    """Testa o cálculo em lote (séries de tamanhos diferentes) contra o ta série a série"""
+    series = {
+        '15m': make_candles(200, seed=11),
+        '1h': make_candles(200, seed=12, start_price=3000.0),
+        '1d': make_candles(120, seed=13),
+        'short': make_candles(14, seed=14)
+    }
+    latest = batch_latest_values(series)
+    assert list(latest) == list(series)
+    for key, candles in series.items():
+        assert_same(latest[key], ta_latest(candles))
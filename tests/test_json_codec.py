@@ -0,0 +1,34 @@
+import math
+from datetime import date, datetime, timezone
+import numpy as np
+import pytest
+from src.utils import json_codec
+
+orjson = pytest.importorskip('orjson')
+
+SAMPLE = {
+    'nan': float('nan'), 'inf': math.inf, 'ninf': -math.inf,
+    'np_nan': np.float64('nan'), 'np_inf': np.float32('inf'),
+    'float64': np.float64(101234.56), 'float32': np.float32(0.1), 'int64': np.int64(7), 'bool': np.bool_(True),
+    'array': np.array([1.25, np.nan, np.inf]), 'int_array': np.arange(3), 'f32_array': np.array([0.1, 2.5], dtype=np.float32),
+    'datetime': datetime(2024, 1, 2, 3, 4, 5), 'aware': datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc),
+    'date': date(2024, 1, 2), 'text': 'preço ✓', 'nested': [{'candles': [[0.1, None, True]]}], 1: 'chave int'
+}
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_orjson_and_stdlib_backends_match(compact):
+    """Testa que orjson e json da biblioteca padrão geram a mesma saída (NaN/inf, NumPy, datas)"""
+    fast = json_codec._orjson_dumpb(SAMPLE, compact)
+    stdlib = json_codec._stdlib_dumpb(SAMPLE, compact)
+    assert fast == stdlib
+
+    decoded = json_codec._stdlib_loads(stdlib)
+    assert decoded == json_codec._orjson_loads(fast)
+    assert decoded['nan'] is None and decoded['np_inf'] is None and decoded['array'] == [1.25, None, None]
+    assert decoded['float32'] == 0.1 and decoded['aware'] == '2024-01-02T03:04:05.123456+00:00'
+
+def test_exponent_floats_decode_equal():
+    """Testa valores em notação exponencial: texto pode diferir (1e20 / 1e+20), valor não"""
+    values = [1e20, 3.4e-12, np.float64(-2.5e30)]
+    assert json_codec._stdlib_loads(json_codec._stdlib_dumpb(values)) == \
+        json_codec._orjson_loads(json_codec._orjson_dumpb(values))
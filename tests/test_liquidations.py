@@ -0,0 +1,61 @@
+import json
+import time
+import pytest
+from src.collectors import base_stream, websocket_liquidations
+from src.collectors.websocket_liquidations import WebSocketLiquidationsCollector
+
+def force_order(symbol, side='SELL', price='100', qty='2', separators=(',', ':'), symbol_last=False):
+    """Evento !forceOrder@arr como texto bruto, com espaçamento e ordem de campos configuráveis"""
+    order = {'S': side, 'ap': price, 'q': qty, 'T': int(time.time() * 1000)}
+    order = {**order, 's': symbol} if symbol_last else {'s': symbol, **order}
+    return json.dumps({'e': 'forceOrder', 'o': order}, separators=separators)
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Conta as mensagens decodificadas (parse completo do JSON)"""
+    monkeypatch.setattr(websocket_liquidations, 'LIQUIDATION_JOURNAL_ENABLED', False)
+    calls = []
+    loads = base_stream.json_codec.loads
+    monkeypatch.setattr(base_stream.json_codec, 'loads', lambda message: calls.append(message) or loads(message))
+    return calls
+
+def test_peek_symbol_handles_spacing_and_field_order():
+    """Testa a extração do símbolo com espaços em torno do ":" e "s" depois de "S" """
+    peek = WebSocketLiquidationsCollector._peek_symbol
+    assert peek(force_order('BTCUSDT')) == 'BTCUSDT'
+    assert peek(force_order('ETHUSDT', separators=(', ', ': '))) == 'ETHUSDT'
+    assert peek(force_order('SOLUSDT', symbol_last=True)) == 'SOLUSDT'
+    assert peek('{"o": {"S": "BUY", "s" : "XRPUSDT"}}') == 'XRPUSDT'
+    assert peek('{"e":"forceOrder"}') is None
+
+def test_all_market_stream_drops_untracked_before_parse(parsed):
+    """Testa que, no stream de todo o mercado, símbolos não acompanhados nem são decodificados"""
+    collector = WebSocketLiquidationsCollector(['BTCUSDT', 'ETHUSDT'], use_all_market_stream=True)
+    assert collector._get_url().endswith('/ws/!forceOrder@arr')
+
+    collector._on_message(None, force_order('DOGEUSDT'))
+    collector._on_message(None, force_order('DOGEUSDT', separators=(', ', ' : '), symbol_last=True))
+    assert parsed == []
+
+    collector._on_message(None, force_order('BTCUSDT', 'SELL', separators=(', ', ' : ')))
+    collector._on_message(None, force_order('ETHUSDT', 'BUY', symbol_last=True))
+    collector._on_message(None, force_order('BTCUSDT', 'BUY', qty='1', separators=(', ', ': '), symbol_last=True))
+    assert len(parsed) == 3
+    assert collector.get_liquidations_24h('BTCUSDT') == {
+        'long_liqs_24h': 200.0, 'short_liqs_24h': 100.0, 'total_liqs_24h': 300.0}
+    assert collector.get_liquidations_24h('ETHUSDT')['short_liqs_24h'] == 200.0
+
+def test_all_symbols_and_combined_stream_dispatch(parsed):
+    """Testa o agregador 'ALL' (sem filtro) e o despacho do stream combinado por símbolo"""
+    everything = WebSocketLiquidationsCollector('ALL')
+    assert everything.use_all_market_stream
+    everything._on_message(None, force_order('DOGEUSDT'))
+    assert everything.get_liquidations_24h('ALL')['long_liqs_24h'] == 200.0
+
+    combined = WebSocketLiquidationsCollector(['BTCUSDT', 'ETHUSDT'])
+    assert not combined.use_all_market_stream
+    assert '/stream?streams=btcusdt@forceOrder/ethusdt@forceOrder' in combined._get_url()
+    message = json.dumps({'stream': 'ethusdt@forceOrder', 'data': json.loads(force_order('ETHUSDT'))})
+    combined._on_message(None, message)
+    assert combined.get_liquidations_24h('ETHUSDT')['long_liqs_24h'] == 200.0
+    assert combined.get_liquidations_24h('BTCUSDT')['total_liqs_24h'] == 0.0
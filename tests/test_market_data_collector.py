@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+import pytest
+from src.market_data_collector import MarketDataCollector
+from src.utils.candle_array import CandleArray
+from src.config import TIMEFRAMES
+
+class StubCollector:
+    """Coletor determinístico com latências aleatórias: a ordem de término varia entre execuções"""
+    symbol = 'BTCUSDT'
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.rng = random.Random(0)
+        self.lock = threading.Lock()
+        self.finished = []
+
+    def _respond(self, name, value):
+        with self.lock:
+            delay = self.rng.uniform(0, 0.02)
+        time.sleep(delay)
+        with self.lock:
+            self.finished.append(name)
+        if name == self.fail:
+            raise ConnectionError(f"{name} indisponível")
+        return value
+
+    def get_current_price(self):
+        return self._respond('current_price', 100000.0)
+
+    def get_order_book(self):
+        return self._respond('order_book', {'top': {'bids': [[99999.0, 1.0]], 'asks': [[100001.0, 2.0]]},
+                                            'spread': 2.0, 'imbalance_pct': -33.3})
+
+    def get_volume_stats(self):
+        return self._respond('volume_stats', {'volume_24h': 1e9, 'taker_buy_vol_24h': 6e8, 'taker_sell_vol_24h': 4e8})
+
+    def get_funding_rate(self):
+        return self._respond('funding_rate', {'funding_rate': 0.0001, 'funding_next': '2024-01-01T08:00:00+00:00'})
+
+    def get_open_interest(self):
+        return self._respond('open_interest', {'open_interest_coin': 80000.0, 'oi_change_4h_pct': 1.5})
+
+    def get_liquidations_24h(self):
+        return self._respond('liquidations', {'long_liqs_24h': 5e6, 'short_liqs_24h': 2e6, 'total_liqs_24h': 7e6})
+
+    def get_cvd_data(self):
+        return self._respond('cvd', {'perp_cvd': 1.0, 'spot_cvd': 2.0, 'perp_cvd_changes': [(-1) ** i for i in range(200)]})
+
+    def get_klines(self, interval, limit=200):
+        candles = [[100.0 + t % 13, 103.0 + t % 13, 97.0 + t % 11, 101.0 + t % 7, 5.0 + t % 3, t * 60000]
+                   for t in range(limit)]
+        return self._respond(f'klines_{interval}', CandleArray.from_rows(candles))
+
+    def get_rate_limit_usage(self):
+        return {'server_used_weight': None}
+
+def collect(concurrent, **kwargs):
+    collector = MarketDataCollector(concurrent=concurrent, max_workers=4, collector=StubCollector(**kwargs))
+    data = collector.collect_market_data()
+    data.pop('timestamp')
+    return collector, data
+
+def test_concurrent_stages_match_sequential():
+    """Testa que a coleta em paralelo gera o mesmo resultado da sequencial"""
+    sequential, expected = collect(False)
+    concurrent, data = collect(True)
+    assert data == expected
+    stages = set(sequential._fetch_stages())
+    assert stages == {'current_price', 'order_book', 'volume_stats', 'funding_rate', 'open_interest',
+                      'liquidations', 'cvd'} | {f'klines_{tf}' for tf in TIMEFRAMES}
+    assert stages <= set(concurrent.last_stage_timings)
+
+def test_failing_stage_is_isolated():
+    """Testa que um estágio com erro não interrompe os demais e o próximo ciclo funciona"""
+    collector = MarketDataCollector(concurrent=True, max_workers=4, collector=StubCollector(fail='order_book'))
+    stages = set(collector._fetch_stages())
+    timings = {}
+    with pytest.raises(ConnectionError, match='order_book'):
+        collector._run_stages(collector._fetch_stages(), timings)
+    # O erro só é relançado depois que todos os estágios terminaram
+    assert set(collector.collector.finished) == stages and set(timings) == stages
+
+    collector.collector.fail = None
+    data = collector.collect_market_data()
+    assert data['order_book']['spread'] == 2.0 and set(data['timeframes']) == set(TIMEFRAMES)
@@ -0,0 +1,77 @@
+import pytest
+from src import multi_symbol_collector
+from src.collectors import websocket_liquidations
+from src.collectors.base_collector import BaseCollector
+from src.collectors.base_stream import BaseWebSocketStream
+from src.multi_symbol_collector import MultiSymbolCollector
+
+SYMBOLS = ['btcusdt', 'ETHUSDT', 'solusdt']
+
+def fake_request(self, endpoint, params=None):
+    """Respostas REST mínimas e determinísticas para uma coleta completa"""
+    price = 100000.0
+    if 'premiumIndex' in endpoint:
+        return {'markPrice': str(price), 'lastFundingRate': '0.0001', 'nextFundingTime': 1700000000000}
+    if 'depth' in endpoint:
+        return {'bids': [[str(price - i), '1'] for i in range(1, 200)],
+                'asks': [[str(price + i), '1'] for i in range(1, 200)]}
+    if 'ticker' in endpoint:
+        return {'quoteVolume': '1000000'}
+    if 'aggTrades' in endpoint:
+        return [{'p': str(price), 'q': '1', 'm': i % 2 == 0} for i in range(50)]
+    if 'openInterestHist' in endpoint:
+        return [{'sumOpenInterest': '100'}] * 49
+    if 'klines' in endpoint:
+        return [[1700000000000 + i * 60000, str(price + i % 7), str(price + 10), str(price - 10),
+                 str(price + i % 5), '10'] for i in range(params['limit'])]
+    return {}
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Sem rede: streams não conectam, warm-up e requisições são registrados"""
+    started, warm_ups = [], []
+    monkeypatch.setattr(BaseWebSocketStream, 'start_stream', lambda self: started.append(self))
+    monkeypatch.setattr(BaseWebSocketStream, 'wait_for_connection', lambda self, timeout=10: False)
+    monkeypatch.setattr(BaseCollector, 'warm_up', lambda self, connections=1: warm_ups.append((self, connections)))
+    monkeypatch.setattr(BaseCollector, '_request_with_retry', fake_request)
+    monkeypatch.setattr(websocket_liquidations, 'LIQUIDATION_JOURNAL_ENABLED', False)
+    monkeypatch.setattr(multi_symbol_collector, 'TRADE_STREAM_ENABLED', True)
+    return started, warm_ups
+
+def test_symbols_share_executor_sessions_cache_and_streams(offline):
+    """Testa que N símbolos compartilham pool de threads, sessões, cache e streams de liquidações/trades"""
+    started, warm_ups = offline
+    multi = MultiSymbolCollector(SYMBOLS, max_workers=4)
+    try:
+        assert multi.symbols == ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+        collectors = [multi.collectors[symbol] for symbol in multi.symbols]
+        assert all(collector._executor is multi.executor for collector in collectors)
+
+        futures_collectors = [collector.collector for collector in collectors]
+        assert [c.symbol for c in futures_collectors] == multi.symbols
+        for c in futures_collectors:
+            assert c.session is multi.session and c.spot_collector.session is multi.spot_session
+            assert c.cache is multi.cache and c.spot_collector.cache is multi.cache
+            assert c.rate_limiter is futures_collectors[0].rate_limiter
+            assert c.ws_liquidations is multi.ws_liquidations
+            assert c.ws_perp_trades is multi.ws_perp_trades and c.ws_spot_trades is multi.ws_spot_trades
+
+        # Uma conexão de liquidações e uma de trades por mercado para todos os símbolos
+        shared = [multi.ws_liquidations, multi.ws_perp_trades, multi.ws_spot_trades]
+        assert all(stream in started for stream in shared)
+        assert sorted(multi.ws_perp_trades.aggregators) == multi.symbols
+        assert '/stream?streams=' in multi.ws_perp_trades._get_url()
+        # Livro de ordens e candles continuam com um stream por símbolo (limitação documentada)
+        per_symbol = [stream for stream in started if stream not in shared]
+        assert per_symbol == [stream for c in futures_collectors for stream in c._owned_streams]
+        assert all(stream.symbol.lower() == c.symbol.lower() for c in futures_collectors for stream in c._owned_streams)
+
+        # Aquecimento único: sessão de futuros e sessão spot
+        assert len(warm_ups) == 2
+
+        data = multi.collect_all()
+        assert sorted(data) == multi.symbols
+        assert all(data[symbol]['symbol'] == symbol for symbol in multi.symbols)
+        assert multi.cache.get_stats()['entries'] > 0
+    finally:
+        multi.close()
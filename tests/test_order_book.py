@@ -0,0 +1,124 @@
+import random
+import pytest
+from src.collectors.depth_curve import DepthCurve
+from src.collectors.local_order_book import LocalOrderBook
+from src.collectors.websocket_order_book import WebSocketOrderBook
+
+SNAPSHOT = {
+    'lastUpdateId': 100,
+    'bids': [['100.0', '1.0'], ['99.5', '2.0'], ['98.0', '3.0']],
+    'asks': [['100.5', '1.5'], ['101.0', '2.5'], ['103.0', '4.0']]
+}
+
+def depth_event(first_id, last_id, prev_id, bids=None, asks=None):
+    return {'e': 'depthUpdate', 'U': first_id, 'u': last_id, 'pu': prev_id,
+            'b': bids or [], 'a': asks or []}
+
+@pytest.fixture
+def stream():
+    """Livro local com fetcher de snapshot falso (sem conexão)"""
+    ws_book = WebSocketOrderBook('BTCUSDT', lambda: SNAPSHOT)
+    ws_book.resync_interval = 0
+    return ws_book
+
+def wait_sync(ws_book):
+    if ws_book.sync_thread:
+        ws_book.sync_thread.join(timeout=5)
+
+def test_local_book_updates_and_ordering():
+    """Testa ordenação dos níveis, remoção com quantidade zero e profundidade"""
+    book = LocalOrderBook()
+    book.load_snapshot(SNAPSHOT)
+    book.apply_diff([['99.8', '5.0'], ['99.5', '0']], [['100.5', '0'], ['100.7', '1.0']], 101)
+
+    assert book.snapshot_within(100) == ([98.0, 99.8, 100.0], [3.0, 5.0, 1.0],
+                                         [100.7, 101.0, 103.0], [1.0, 2.5, 4.0])
+    assert (book.bids.best(), book.asks.best()) == (100.0, 100.7)
+
+    # Até 1% do melhor bid (99.0 - 101.0); min_levels completa além do limite
+    assert book.snapshot_within(1.0, min_levels=1) == ([99.8, 100.0], [5.0, 1.0], [100.7, 101.0], [1.0, 2.5])
+    assert book.snapshot_within(0.0, min_levels=2) == ([99.8, 100.0], [5.0, 1.0], [100.7, 101.0], [1.0, 2.5])
+
+def test_stream_syncs_from_snapshot_and_buffer(stream):
+    """Testa a sincronização: descarta eventos antigos e aplica os posteriores ao snapshot"""
+    stream._handle_message(depth_event(90, 95, 89, bids=[['50.0', '1.0']]))
+    stream._handle_message(depth_event(96, 102, 95, bids=[['99.9', '7.0']]))
+    wait_sync(stream)
+    assert stream.state == 'synced'
+
+    stream._handle_message(depth_event(103, 105, 102, asks=[['100.5', '0']]))
+    curve = stream.get_depth_curve(100)
+    assert curve.top(5) == ([[100.0, 1.0], [99.9, 7.0], [99.5, 2.0], [98.0, 3.0]],
+                            [[101.0, 2.5], [103.0, 4.0]])  # Evento com u=95 (bid 50.0) descartado
+    assert stream.is_synced()
+
+def test_stream_buffer_keeps_newest_events(monkeypatch):
+    """Testa que o buffer sem sincronização é limitado e mantém só os eventos mais recentes"""
+    monkeypatch.setattr(WebSocketOrderBook, 'max_buffer', 3)
+    stream = WebSocketOrderBook('BTCUSDT', lambda: {**SNAPSHOT, 'lastUpdateId': 106})
+    stream.last_sync_attempt = float('inf')  # Segura a sincronização enquanto bufferiza
+    for first_id in range(90, 110, 2):
+        stream._handle_message(depth_event(first_id, first_id + 1, first_id - 1))
+    assert [event['U'] for event in stream.buffer] == [104, 106, 108]
+
+    stream._sync()
+    assert stream.state == 'synced' and stream.book.last_update_id == 109
+
+def test_stream_resyncs_on_gap(stream):
+    """Testa que uma lacuna em pu invalida o livro e dispara nova sincronização"""
+    stream._handle_message(depth_event(96, 102, 95))
+    wait_sync(stream)
+    assert stream.state == 'synced'
+
+    stream.snapshot_fetcher = lambda: {**SNAPSHOT, 'lastUpdateId': 110}
+    stream._handle_message(depth_event(108, 112, 107))
+    assert stream.resync_count == 1
+    wait_sync(stream)
+    assert stream.state == 'synced'
+    assert stream.book.last_update_id == 112
+
+def test_depth_curve_matches_level_scan():
+    """Testa a curva de profundidade (somas prefixadas) contra a soma direta dos níveis"""
+    rng = random.Random(3)
+    bids = sorted(([f"{100 - rng.uniform(0, 5):.2f}", f"{rng.uniform(0, 3):.3f}"] for _ in range(300)),
+                  key=lambda level: -float(level[0]))
+    asks = sorted(([f"{100.01 + rng.uniform(0, 5):.2f}", f"{rng.uniform(0, 3):.3f}"] for _ in range(300)),
+                  key=lambda level: float(level[0]))
+    curve = DepthCurve(bids, asks)
+    reference = float(bids[0][0])
+
+    pcts = [0.0, 0.1, 0.5, 1.0, 2.0, 10.0]
+    depth = curve.depth(pcts)
+    for i, pct in enumerate(pcts):
+        bid_levels = [(float(p), float(q)) for p, q in bids if float(p) >= reference * (1 - pct / 100)]
+        ask_levels = [(float(p), float(q)) for p, q in asks if float(p) <= reference * (1 + pct / 100)]
+        assert depth['bids']['base'][i] == pytest.approx(sum(q for _, q in bid_levels))
+        assert depth['bids']['usd'][i] == pytest.approx(sum(p * q for p, q in bid_levels))
+        assert depth['asks']['base'][i] == pytest.approx(sum(q for _, q in ask_levels))
+        assert depth['asks']['usd'][i] == pytest.approx(sum(p * q for p, q in ask_levels))
+
+    assert curve.depth_bps([100])['bids']['base'][0] == depth['bids']['base'][3]
+    assert curve.top(1) == ([[float(bids[0][0]), float(bids[0][1])]], [[float(asks[0][0]), float(asks[0][1])]])
+
+def test_depth_curve_from_stream_matches_level_copy(stream):
+    """Testa que a curva montada fora do lock é igual à construída a partir dos níveis do snapshot"""
+    rng = random.Random(5)
+    bids = [[100 - i * 0.01, rng.uniform(0.1, 3)] for i in range(1, 800)]
+    asks = [[100 + i * 0.01, rng.uniform(0.1, 3)] for i in range(800)]
+    stream.book.load_snapshot({'lastUpdateId': 1, 'bids': bids, 'asks': asks})
+    for pct, min_levels in ((5.0, 20), (0.05, 20), (0.0, 1)):
+        curve = stream.get_depth_curve(pct, min_levels)
+        # Níveis dentro do limite, completados até min_levels (bids e asks já do melhor ao pior)
+        count = lambda levels, inside: max(sum(map(inside, levels)), min_levels)
+        expected = DepthCurve(bids[:count(bids, lambda level: level[0] >= bids[0][0] * (1 - pct / 100))],
+                              asks[:count(asks, lambda level: level[0] <= bids[0][0] * (1 + pct / 100))])
+        for name in ('bid_prices', 'bid_qtys', 'ask_prices', 'ask_qtys'):
+            assert getattr(curve, name).tolist() == getattr(expected, name).tolist()
+        assert curve.top(20) == expected.top(20)
+        for side in ('bids', 'asks'):
+            assert curve.depth_bps([10, 50, 500])[side]['usd'].tolist() == \
+                expected.depth_bps([10, 50, 500])[side]['usd'].tolist()
+    assert len(stream.get_depth_curve(0.05, 20).bid_prices) == 20  # Mínimo de níveis além do limite
+
+    stream.book.load_snapshot({'lastUpdateId': 2, 'bids': [], 'asks': [[100.0, 1.0]]})
+    assert stream.get_depth_curve(5.0, 20) is None
@@ -0,0 +1,110 @@
+import numpy as np
+from src.utils.order_book_recorder import HEADER, OrderBookRecorder, OrderBookReader
+
+def random_books(count, seed=0):
+    """Livros que evoluem com poucas mudanças por passo (níveis entram, saem e mudam)"""
+    rng = np.random.default_rng(seed)
+    bids = {100000.0 - i * 0.1: float(rng.integers(1, 50)) for i in range(1, 300)}
+    asks = {100000.0 + i * 0.1: float(rng.integers(1, 50)) for i in range(300)}
+    for _ in range(count):
+        for side, sign in ((bids, -1), (asks, 1)):
+            prices = list(side)
+            for price in rng.choice(prices, 5, replace=False):
+                if rng.random() < 0.3:
+                    del side[price]
+                else:
+                    side[price] = float(rng.integers(1, 50))
+            side[round(100000.0 + sign * float(rng.integers(1, 400)) * 0.1, 1)] = float(rng.integers(1, 50))
+        yield ([[p, q] for p, q in sorted(bids.items(), reverse=True)],
+               [[p, q] for p, q in sorted(asks.items())])
+
+def record(recorder, ts, bids, asks):
+    bids, asks = np.array(bids), np.array(asks)
+    return recorder.record(ts, bids[:, 0], bids[:, 1], asks[:, 0], asks[:, 1])
+
+def test_seek_and_replay_rebuild_recorded_books(tmp_path):
+    """Testa a reconstrução do livro em qualquer instante (keyframes, deltas e vários segmentos)"""
+    recorder = OrderBookRecorder(str(tmp_path), keyframe_seconds=60, segment_seconds=300)
+    books = {}
+    sizes = []
+    for step, (bids, asks) in enumerate(random_books(100)):
+        ts = 1_700_000_000 + step * 10.0
+        sizes.append(record(recorder, ts, bids, asks))
+        books[ts] = (bids, asks)
+    recorder.close()
+
+    # Deltas são muito menores que os keyframes
+    assert max(sizes[1:6]) * 10 < sizes[0]
+
+    reader = OrderBookReader(str(tmp_path))
+    assert len(reader._starts) == 4
+    for ts in (1_700_000_000, 1_700_000_125, 1_700_000_299.5, 1_700_000_300, 1_700_000_990, 1_700_005_000):
+        recorded_at, bids, asks = reader.book_at(ts)
+        assert recorded_at == max(t for t in books if t <= ts)
+        assert (bids, asks) == books[recorded_at]
+    assert reader.book_at(1_699_999_999) is None
+
+    replayed = list(reader.replay(1_700_000_285, 1_700_000_600))
+    assert [ts for ts, _, _ in replayed] == [t for t in books if 1_700_000_285 <= t <= 1_700_000_600]
+    assert all((bids, asks) == books[ts] for ts, bids, asks in replayed)
+    reader.close()
+
+def test_truncated_record_and_retention(tmp_path):
+    """Testa o descarte de registro incompleto e a retenção por segmentos"""
+    recorder = OrderBookRecorder(str(tmp_path), keyframe_seconds=60, segment_seconds=100, retention_seconds=250)
+    books = list(random_books(60, seed=1))
+    for step, (bids, asks) in enumerate(books):
+        record(recorder, 1_700_000_000 + step * 10.0, bids, asks)
+    recorder.close()
+
+    reader = OrderBookReader(str(tmp_path))
+    assert len(reader._starts) == 4  # Segmentos de 100s: só os totalmente fora da retenção foram removidos
+    last_path = tmp_path / f"{reader._starts[-1]}.obk"
+    with open(last_path, 'ab') as f:
+        f.write(HEADER.pack(2, 1_700_000_600.0, 10, 0) + b'\x00' * 30)  # Gravação interrompida
+    reader.refresh()
+    ts, bids, asks = reader.book_at(1_700_001_000)
+    assert ts == 1_700_000_590 and (bids, asks) == books[-1]
+    reader.close()
+
+def test_views_stay_valid_while_segment_grows(tmp_path):
+    """Testa que arrays e replays em andamento continuam válidos quando o segmento é remapeado ou fechado"""
+    recorder = OrderBookRecorder(str(tmp_path), keyframe_seconds=60, segment_seconds=3600)
+    books = list(random_books(20, seed=2))
+    for step, (bids, asks) in enumerate(books[:10]):
+        record(recorder, 1_700_000_000 + step * 10.0, bids, asks)
+
+    reader = OrderBookReader(str(tmp_path))
+    start = reader._starts[0]
+    _, held_bids, _ = reader._view(start).levels(0)  # Array sobre o mmap, sem cópia
+    replay = reader.replay()
+    assert next(replay)[0] == 1_700_000_000
+
+    for step, (bids, asks) in enumerate(books[10:], start=10):
+        record(recorder, 1_700_000_000 + step * 10.0, bids, asks)
+    recorder.close()
+    assert reader.book_at(1_700_001_000)[1:] == books[-1]  # Segmento cresceu: mapeado de novo
+    reader.close()
+
+    assert held_bids[:, 0].tolist() == [price for price, _ in books[0][0]][::-1]
+    assert [ts for ts, _, _ in replay] == [1_700_000_000 + step * 10.0 for step in range(1, 10)]
+
+def test_segment_removed_after_listing_is_skipped(tmp_path):
+    """Testa que um segmento apagado pela retenção depois da listagem é ignorado, sem FileNotFoundError"""
+    recorder = OrderBookRecorder(str(tmp_path), keyframe_seconds=60, segment_seconds=100)
+    books = list(random_books(30, seed=3))
+    for step, (bids, asks) in enumerate(books):
+        record(recorder, 1_700_000_000 + step * 10.0, bids, asks)
+    recorder.close()
+
+    reader = OrderBookReader(str(tmp_path))
+    first, second = reader._starts[:2]
+    reader.book_at(1_700_000_050)  # Primeiro segmento já mapeado
+    (tmp_path / f"{first}.obk").unlink()
+    (tmp_path / f"{second}.obk").unlink()
+
+    assert reader.book_at(1_700_000_150) is None
+    replayed = [ts for ts, _, _ in reader.replay(1_700_000_000, 1_700_000_250)]
+    assert replayed == [1_700_000_000 + step * 10.0 for step in range(20, 26)]
+    assert reader._starts[0] > second
+    reader.close()
@@ -0,0 +1,93 @@
+import json
+import pytest
+import requests
+from src.collectors import rate_limiter
+from src.collectors.base_collector import BaseCollector
+from src.collectors.rate_limiter import USED_WEIGHT_HEADER, WeightRateLimiter, endpoint_weight
+
+class FakeTime:
+    """Relógio falso: sleep só avança o tempo"""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+def make_response(status, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = json.dumps(body if body is not None else {}).encode()
+    response.url = 'https://fapi.binance.com/fapi/v1/depth'
+    return response
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        return self.responses.pop(0)
+
+def test_endpoint_weight_tiers():
+    """Testa o peso pelas faixas de limit (depth) e os pesos fixos por endpoint"""
+    depth = '/fapi/v1/depth'
+    assert [endpoint_weight(depth, {'limit': limit}) for limit in (5, 50, 100, 500, 1000, 5000)] == [2, 2, 5, 10, 20, 20]
+    assert endpoint_weight(depth) == 20  # Sem limit: faixa mais pesada
+    assert endpoint_weight('/api/v3/depth', {'limit': '500'}) == 25
+    assert endpoint_weight('/fapi/v1/aggTrades', {'limit': 1000}) == 20
+    assert endpoint_weight('/fapi/v1/time') == 1
+
+def test_acquire_paces_at_safety_capacity(clock):
+    """Testa que acquire libera até 80% do limite e depois espera o reabastecimento"""
+    limiter = WeightRateLimiter(100, interval=60, safety_margin=0.8)
+    assert limiter.capacity == 80
+    assert limiter.acquire(50) == 0 and limiter.acquire(30) == 0
+    assert limiter.acquire(8) == pytest.approx(6.0)  # 8 de peso a 80/60 por segundo
+    assert limiter.get_usage()['throttled_requests'] == 1
+
+    clock.now += 120  # Nunca acumula além da capacidade
+    assert limiter.get_usage()['local_available_weight'] == 80
+
+def test_update_from_headers_clamps_to_server_usage(clock):
+    """Testa que o peso usado informado pela Binance reduz os tokens para capacity - used"""
+    limiter = WeightRateLimiter(100, safety_margin=0.8)
+    limiter.update_from_headers({USED_WEIGHT_HEADER: '50'})
+    assert limiter.tokens == 30
+    limiter.update_from_headers({USED_WEIGHT_HEADER: '10'})  # Nunca aumenta os tokens
+    assert limiter.tokens == 30
+    limiter.update_from_headers({USED_WEIGHT_HEADER: 'x'})
+    assert limiter.get_usage()['server_used_weight'] == 10
+
+def test_429_honours_retry_after_and_retries(clock):
+    """Testa que um 429 suspende pelo Retry-After e a requisição é repetida"""
+    session = FakeSession([make_response(429, headers={'Retry-After': '7'}),
+                           make_response(200, {'bids': []}, {USED_WEIGHT_HEADER: '12'})])
+    collector = BaseCollector('https://fapi.binance.com', rate_limiter=WeightRateLimiter(2400), session=session)
+
+    assert collector._request_with_retry('/fapi/v1/depth', {'limit': 100}) == {'bids': []}
+    assert len(session.calls) == 2
+    assert sum(clock.sleeps) == pytest.approx(7.0)  # Esperou o Retry-After antes de repetir
+    assert collector.rate_limiter.server_used_weight == 12
+
+def test_418_blocks_and_raises_without_retry(clock):
+    """Testa que um 418 (ban) bloqueia o limitador e falha sem nova tentativa"""
+    session = FakeSession([make_response(418, headers={'Retry-After': '120'}), make_response(200)])
+    collector = BaseCollector('https://fapi.binance.com', rate_limiter=WeightRateLimiter(2400), session=session)
+
+    with pytest.raises(requests.HTTPError):
+        collector._request_with_retry('/fapi/v1/depth', {'limit': 100})
+    assert len(session.calls) == 1
+    assert collector.rate_limiter.get_usage()['blocked_for_s'] == 120
@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+from src.collectors import response_cache
+from src.collectors.response_cache import ResponseCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'monotonic', clock)
+    return clock
+
+def counting_fetch(calls, value):
+    def fetch():
+        calls.append(value)
+        return value
+    return fetch
+
+def test_ttl_per_endpoint_and_params_in_key(clock):
+    """Testa expiração pelo TTL de cada endpoint e parâmetros como parte da chave"""
+    cache = ResponseCache({'/ticker': 10, '/depth': 1})
+    calls = []
+
+    assert cache.get_or_fetch('/ticker', {'symbol': 'BTCUSDT'}, counting_fetch(calls, 'btc')) == 'btc'
+    assert cache.get_or_fetch('/ticker', {'symbol': 'BTCUSDT'}, counting_fetch(calls, 'novo')) == 'btc'
+    assert cache.get_or_fetch('/ticker', {'symbol': 'ETHUSDT'}, counting_fetch(calls, 'eth')) == 'eth'
+    # Mesmos parâmetros em outra ordem: mesma chave
+    assert cache.make_key('/depth', {'symbol': 'BTCUSDT', 'limit': 5}) == \
+        cache.make_key('/depth', {'limit': 5, 'symbol': 'BTCUSDT'})
+    cache.get_or_fetch('/depth', {'symbol': 'BTCUSDT', 'limit': 5}, counting_fetch(calls, 'livro'))
+
+    clock.now += 2  # Expira só o /depth (TTL 1s)
+    assert cache.get_or_fetch('/depth', {'limit': 5, 'symbol': 'BTCUSDT'}, counting_fetch(calls, 'livro2')) == 'livro2'
+    assert cache.get_or_fetch('/ticker', {'symbol': 'BTCUSDT'}, counting_fetch(calls, 'novo')) == 'btc'
+
+    clock.now += 10
+    assert cache.get_or_fetch('/ticker', {'symbol': 'BTCUSDT'}, counting_fetch(calls, 'novo')) == 'novo'
+    # Endpoint sem TTL (padrão 0) nunca fica em cache
+    cache.get_or_fetch('/time', None, counting_fetch(calls, 't1'))
+    assert cache.get_or_fetch('/time', None, counting_fetch(calls, 't2')) == 't2'
+
+    assert calls == ['btc', 'eth', 'livro', 'livro2', 'novo', 't1', 't2']
+    assert cache.get_stats()['hits'] == 2
+
+def test_prune_removes_expired_entries(clock):
+    """Testa que, acima de max_entries, as entradas expiradas são removidas"""
+    cache = ResponseCache({'/a': 1, '/b': 100}, max_entries=3)
+    for i in range(3):
+        cache.get_or_fetch('/a', {'i': i}, lambda: i)
+    clock.now += 5
+    cache.get_or_fetch('/b', None, lambda: 'b')  # 4ª entrada: dispara a limpeza
+    assert list(cache._entries) == [cache.make_key('/b')]
+
+def run_concurrently(cache, fetch, count):
+    """Dispara count chamadores da mesma chave; retorna (threads, resultados)"""
+    results = [None] * count
+
+    def call(i):
+        try:
+            results[i] = cache.get_or_fetch('/depth', {'symbol': 'BTCUSDT'}, fetch)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+def test_concurrent_calls_share_one_fetch():
+    """Testa que chamadas simultâneas da mesma chave fazem um único fetch"""
+    cache = ResponseCache({'/depth': 5})
+    release, calls = threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'bids': []}
+
+    threads, results = run_concurrently(cache, fetch, 8)
+    wait_for(lambda: cache.coalesced == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_fetch_error_reaches_all_waiters_and_is_not_cached():
+    """Testa que o erro do fetch chega a todos os que aguardavam e não fica em cache"""
+    cache = ResponseCache({'/depth': 5})
+    release = threading.Event()
+
+    def failing_fetch():
+        release.wait(5)
+        raise ConnectionError("timeout")
+
+    threads, results = run_concurrently(cache, failing_fetch, 4)
+    wait_for(lambda: cache.coalesced == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    assert cache.get_or_fetch('/depth', {'symbol': 'BTCUSDT'}, lambda: 'ok') == 'ok'
+    assert cache.get_stats()['entries'] == 1
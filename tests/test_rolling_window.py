@@ -0,0 +1,59 @@
+import random
+import pytest
+from src.utils.rolling_window import RollingWindowAggregator
+
+WINDOWS = {'1m': 60, '5m': 300}
+
+@pytest.fixture
+def aggregator():
+    return RollingWindowAggregator(('buy', 'sell'), WINDOWS, bucket_seconds=10)
+
+def brute_force(events, now, seconds, bucket_seconds=10):
+    """Soma de referência: eventos cujo bucket está dentro da janela"""
+    head = int(now // bucket_seconds)
+    length = seconds // bucket_seconds
+    buy = sum(b for ts, b, _ in events if 0 <= head - int(ts // bucket_seconds) < length)
+    sell = sum(s for ts, _, s in events if 0 <= head - int(ts // bucket_seconds) < length)
+    return buy, sell
+
+def test_windows_expire_old_buckets(aggregator):
+    """Testa que cada janela só soma os buckets que ainda estão nela"""
+    aggregator.add(1000, (10.0, 0.0))
+    aggregator.add(1045, (0.0, 4.0))
+
+    assert aggregator.totals('1m', now=1050) == {'buy': 10.0, 'sell': 4.0}
+    assert aggregator.totals('1m', now=1061) == {'buy': 0.0, 'sell': 4.0}
+    assert aggregator.totals('5m', now=1061) == {'buy': 10.0, 'sell': 4.0}
+    assert aggregator.totals('5m', now=1400) == {'buy': 0.0, 'sell': 0.0}
+
+def test_matches_brute_force_with_late_events(aggregator):
+    """Testa totais contra soma direta, com eventos fora de ordem"""
+    rng = random.Random(7)
+    events = []
+    now = 10_000.0
+    for _ in range(2000):
+        now += rng.uniform(0, 3)
+        ts = now - rng.choice([0, 0, 0, 25, 90])  # Alguns eventos atrasados
+        buy, sell = rng.uniform(0, 5), rng.uniform(0, 5)
+        events.append((ts, buy, sell))
+        aggregator.add(ts, (buy, sell))
+
+        if rng.random() < 0.05:
+            for window, seconds in WINDOWS.items():
+                totals = aggregator.totals(window, now=now)
+                expected = brute_force(events, now, seconds)
+                assert totals['buy'] == pytest.approx(expected[0])
+                assert totals['sell'] == pytest.approx(expected[1])
+
+def test_long_gap_resets_everything(aggregator):
+    """Testa que um intervalo maior que a maior janela zera o anel"""
+    aggregator.add(1000, (3.0, 1.0))
+    aggregator.add(5000, (1.0, 0.0))
+    assert aggregator.totals('5m', now=5000) == {'buy': 1.0, 'sell': 0.0}
+    # Cobertura recomeça com o anel: nada anterior à lacuna conta
+    assert aggregator.coverage_seconds(now=5000) == 0
+    assert aggregator.coverage_seconds(now=5120) == 120
+
+    # Lacuna detectada por uma leitura (sem evento novo): mesma regra
+    assert aggregator.totals('1m', now=9000) == {'buy': 0.0, 'sell': 0.0}
+    assert aggregator.coverage_seconds(now=9030) == 30
@@ -0,0 +1,115 @@
+import numpy as np
+from src.utils import json_codec
+from src.utils.snapshot_store import SnapshotStore
+
+def make_snapshot(i):
+    return {'current_price': 100000.0 + i, 'order_book': {'imbalance_score': i / 100}, 'timeframes': {'1h': [i]}}
+
+def test_range_reads_and_metrics(tmp_path):
+    """Testa leituras por intervalo, mais recentes e colunas de métricas entre segmentos"""
+    store = SnapshotStore(str(tmp_path), segment_seconds=600)
+    for i in range(50):
+        store.append(make_snapshot(i), ts=1_700_000_000 + i * 120)
+
+    assert len(store) == 50 and len(store._segments) == 10
+    assert [ts for ts, _ in store.read(1_700_000_000 + 1190, 1_700_000_000 + 1560)] == \
+        [1_700_000_000 + i * 120 for i in range(10, 14)]
+    assert [data['current_price'] for _, data in store.latest(3)] == [100049.0, 100048.0, 100047.0]
+
+    metrics = store.metrics(['current_price', 'funding_rate'], start=1_700_000_000 + 120 * 45)
+    assert metrics['current_price'].tolist() == [100000.0 + i for i in range(45, 50)]
+    assert np.isnan(metrics['funding_rate']).all()
+
+    # Reabertura: mesmo conteúdo, lido do disco
+    reopened = SnapshotStore(str(tmp_path), segment_seconds=600)
+    assert reopened.read() == store.read()
+
+def test_retention_and_truncated_index(tmp_path):
+    """Testa retenção por quantidade/idade e descarte de registro incompleto no índice"""
+    store = SnapshotStore(str(tmp_path), retention_count=12, retention_seconds=3600, segment_seconds=600)
+    for i in range(50):
+        store.append(make_snapshot(i), ts=1_700_000_000 + i * 120)
+
+    # Segmentos inteiros fora da retenção são removidos; leituras respeitam o limite exato
+    assert len(store._segments) == 3
+    assert len(store.read()) == 0  # Tudo mais antigo que 1h em relação ao relógio atual
+
+    store.retention_seconds = None
+    assert [data['timeframes']['1h'][0] for _, data in store.read()] == list(range(38, 50))
+
+    with open(store._segments[-1].index_path, 'ab') as f:
+        f.write(b'\x00' * 7)
+    reopened = SnapshotStore(str(tmp_path), retention_count=12, segment_seconds=600)
+    assert [ts for ts, _ in reopened.latest(2)] == [1_700_000_000 + 49 * 120, 1_700_000_000 + 48 * 120]
+
+def make_candle_snapshot(step):
+    """Janela de 200 candles de 1m que avança a cada 3 passos, com o candle em formação mudando"""
+    first = step // 3
+    candles = [[100.0 + t, 101.0 + t, 99.0 + t, 100.5 + t, 2.0, t * 60000] for t in range(first, first + 200)]
+    candles[-1][3] += step * 0.25
+    return {
+        'current_price': candles[-1][3],
+        'timeframes': {
+            '15m': {'candles': [{'ohlcv': c, 'absorcao': t % 7 == 0} for t, c in enumerate(candles)],
+                    'indicators': {'rsi': {'rsi_14': 50.0}}},
+            '1h': {'candles': candles, 'indicators': {}}
+        }
+    }
+
+def test_normalized_candles_round_trip(tmp_path):
+    """Testa a reconstrução dos candles referenciados, a retenção das tabelas e o ganho de espaço"""
+    store = SnapshotStore(str(tmp_path / 'normalized'), retention_count=10, segment_seconds=600,
+                          normalize_candles=True)
+    plain = SnapshotStore(str(tmp_path / 'plain'), segment_seconds=600)
+    snapshots = [make_candle_snapshot(step) for step in range(30)]
+    for step, snapshot in enumerate(snapshots):
+        store.append(snapshot, ts=1_700_000_000 + step * 120)
+        plain.append(snapshot, ts=1_700_000_000 + step * 120)
+
+    assert [data for _, data in store.read()] == snapshots[-10:]
+    reopened = SnapshotStore(str(tmp_path / 'normalized'), retention_count=10, segment_seconds=600)
+    assert [data for _, data in reopened.latest(10)] == snapshots[-10:][::-1]
+
+    # Tabela podada até o primeiro candle referenciado pelo snapshot mais antigo mantido
+    oldest_kept = store._segments[0].index['ts'][0]
+    first_open_time = (int(oldest_kept - 1_700_000_000) // 120 // 3) * 60000
+    assert store.candle_tables['1h'].records['open_time'][0] == first_open_time
+
+    size = lambda s: sum(segment.data_size for segment in s._segments)
+    assert size(store) * 10 < size(plain)
+
+def test_normalized_candles_conflict_kept_inline(tmp_path):
+    """Testa que candles divergentes da tabela ficam no próprio snapshot"""
+    store = SnapshotStore(str(tmp_path), normalize_candles=True)
+    first, second = make_candle_snapshot(0), make_candle_snapshot(3)
+    candles = second['timeframes']['1h']['candles']
+    candles[5] = candles[5][:3] + [0.0] + candles[5][4:]  # Candle fechado divergente (só no 1h)
+    store.append(first, ts=1_700_000_000)
+    store.append(second, ts=1_700_000_120)
+
+    _, stored = next(store._segments[0].read(np.arange(1, 2)))
+    assert 'candles' in stored['timeframes']['1h'] and 'candles_ref' in stored['timeframes']['15m']
+    assert [data for _, data in store.read()] == [first, second]
+
+def test_compressed_payloads_and_files(tmp_path):
+    """Testa payloads comprimidos (gzip e lzma misturados com texto puro) e arquivos JSON comprimidos"""
+    snapshots = [make_snapshot(i) for i in range(6)]
+    for i, method in enumerate([None, 'gzip', 'lzma']):
+        store = SnapshotStore(str(tmp_path / 'store'), compression=method)
+        for j in (2 * i, 2 * i + 1):
+            store.append(snapshots[j], ts=1_700_000_000 + j * 120)
+        assert store.last_write.method == method
+    assert [data for _, data in SnapshotStore(str(tmp_path / 'store')).read()] == snapshots
+
+    # JSON puro, gzip e xz lado a lado no mesmo segmento
+    segment = store._segments[-1]
+    with open(segment.data_path, 'rb') as f:
+        data = f.read()
+    assert [data[offset:offset + 1] for offset in segment.index['offset'].tolist()] == [b'{'] * 2 + [b'\x1f'] * 2 + [b'\xfd'] * 2
+
+    big = {'candles': [[100000.0 + i, 1.5, i] for i in range(2000)]}
+    for method in (None, 'gzip', 'lzma'):
+        path = str(tmp_path / f"data_{method}.json")
+        stats = json_codec.dump(big, path, compression=method)
+        assert json_codec.load(path) == big
+        assert (stats.ratio > 5) == (method is not None)
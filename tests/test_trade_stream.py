@@ -0,0 +1,61 @@
+import time
+import pytest
+from src.collectors import websocket_liquidations
+from src.collectors.base_stream import BaseWebSocketStream
+from src.collectors.binance_futures_collector import BinanceFuturesCollector
+from src.collectors.websocket_trades import WebSocketTradesCollector
+from src.config import CVD_WINDOWS, CVD_PRIMARY_WINDOW
+
+def agg_trade(symbol, price, qty, sell, ts):
+    """Evento aggTrade do stream combinado (m = true: venda agressora)"""
+    return {'stream': f'{symbol.lower()}@aggTrade',
+            'data': {'e': 'aggTrade', 's': symbol, 'p': str(price), 'q': str(qty), 'm': sell, 'T': int(ts * 1000)}}
+
+REST_TRADES = [{'p': '100', 'q': '1', 'm': False}, {'p': '100', 'q': '3', 'm': True}]  # CVD = -200
+
+@pytest.fixture
+def connected(monkeypatch):
+    """Streams sem rede considerados conectados"""
+    monkeypatch.setattr(BaseWebSocketStream, 'start_stream', lambda self: None)
+    monkeypatch.setattr(BaseWebSocketStream, 'is_connected', lambda self: True)
+    monkeypatch.setattr(websocket_liquidations, 'LIQUIDATION_JOURNAL_ENABLED', False)
+
+def test_reconnect_resets_windows_and_coverage(connected):
+    """Testa que uma nova conexão zera as janelas e a cobertura, em vez de deixar uma lacuna silenciosa"""
+    stream = WebSocketTradesCollector(['BTCUSDT', 'ETHUSDT'], 'futures')
+    now = time.time()
+    stream.aggregators['BTCUSDT'].reset(now=now - 600)  # Conectado há 10 minutos
+    stream._handle_message(agg_trade('BTCUSDT', 100, 2, False, now - 30))
+    stream._handle_message(agg_trade('ETHUSDT', 10, 1, True, now - 20))
+    assert stream.get_cvd('5m', symbol='BTCUSDT')['cvd'] == 200.0
+    assert stream.coverage_seconds(symbol='BTCUSDT') >= 600
+
+    stream._on_open(None)  # Reconexão: trades da desconexão foram perdidos
+    for symbol in ('BTCUSDT', 'ETHUSDT'):
+        assert stream.get_cvd('24h', symbol=symbol) == {'cvd': 0.0, 'buy_volume': 0.0, 'sell_volume': 0.0}
+        assert stream.coverage_seconds(symbol=symbol) < CVD_WINDOWS[CVD_PRIMARY_WINDOW]
+
+    stream._handle_message(agg_trade('BTCUSDT', 100, 1, True, time.time()))
+    assert stream.get_cvd('5m', symbol='BTCUSDT')['cvd'] == -100.0
+
+def test_cvd_uses_rest_until_primary_window_is_covered(connected):
+    """Testa que perp_cvd vem da amostra REST até o stream cobrir a janela principal"""
+    collector = BinanceFuturesCollector('BTCUSDT', warm_up_connections=0)
+    collector.ws_spot_trades = None
+    collector.spot_collector.get_agg_trades = lambda limit=1000: REST_TRADES
+    requests = []
+    collector._make_request = lambda endpoint, params=None, use_cache=True: requests.append(endpoint) or REST_TRADES
+
+    stream = collector.ws_perp_trades
+    stream._on_open(None)  # Acabou de conectar
+    stream._handle_message(agg_trade('BTCUSDT', 100, 5, False, time.time()))
+    cvd = collector.get_cvd_data()
+    assert cvd['perp_cvd'] == -200.0 and requests == ['/fapi/v1/aggTrades']
+    assert cvd['cvd_windows']['perp']['5m']['cvd'] == 500.0  # Janelas seguem disponíveis, com sua cobertura
+
+    # Janela principal coberta: leitura direto do stream, sem REST
+    stream.aggregators['BTCUSDT'].reset(now=time.time() - CVD_WINDOWS[CVD_PRIMARY_WINDOW] - 10)
+    stream._handle_message(agg_trade('BTCUSDT', 100, 5, False, time.time()))
+    cvd = collector.get_cvd_data()
+    assert cvd['perp_cvd'] == 500.0 and requests == ['/fapi/v1/aggTrades']
+    assert cvd['spot_cvd'] == -200.0
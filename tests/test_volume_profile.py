@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from src.indicators.volume_profile import calculate_volume_profile
+
+def reference_profile(high, low, volume, bins=50, value_area_pct=0.7):
+    """Implementação iterativa de referência (vela a vela, faixa a faixa)"""
+    edges = np.linspace(min(low), max(high), bins)
+    profile = {}
+    for h, l, v in zip(high, low, volume):
+        if h - l <= 0:
+            continue
+        for b in range(len(edges) - 1):
+            if edges[b] <= h and edges[b + 1] >= l:
+                mid = (edges[b] + edges[b + 1]) / 2
+                overlap = (min(edges[b + 1], h) - max(edges[b], l)) / (h - l)
+                profile[mid] = profile.get(mid, 0) + v * overlap
+    if not profile:
+        return {"poc": 0, "vah": 0, "val": 0}
+
+    poc = max(profile, key=profile.get)
+    target = sum(profile.values()) * value_area_pct
+    accumulated, prices = 0, []
+    for price, vol in sorted(profile.items(), key=lambda x: x[1], reverse=True):
+        accumulated += vol
+        prices.append(price)
+        if accumulated >= target:
+            break
+    return {"poc": float(poc), "vah": float(max(prices)), "val": float(min(prices))}
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_reference(seed):
+    """Testa POC/VAH/VAL contra a implementação iterativa, com empates e velas sem amplitude"""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 80))
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 1 if seed % 2 else 0)
+    high = close + np.abs(rng.normal(0, 1, n)) * (rng.random(n) > 0.2)
+    low = close - np.abs(rng.normal(0, 1, n)) * (rng.random(n) > 0.2)
+    volume = np.round(rng.random(n) * 10, seed % 3)
+
+    for bins, pct in ((50, 0.7), (24, 0.68)):
+        assert calculate_volume_profile(high, low, volume, bins, pct) == \
+            reference_profile(high, low, volume, bins, pct)
+
+def test_degenerate_inputs():
+    """Testa séries curtas e velas sem amplitude"""
+    assert calculate_volume_profile([1.0], [1.0], [5.0]) == {"poc": 0, "vah": 0, "val": 0}
+    assert calculate_volume_profile([2.0, 2.0], [2.0, 2.0], [1.0, 1.0]) == {"poc": 0, "vah": 0, "val": 0}
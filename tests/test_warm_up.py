@@ -0,0 +1,97 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.collectors.base_collector import BaseCollector
+from src.collectors.binance_spot_collector import BinanceSpotCollector
+from src.collectors.rate_limiter import WeightRateLimiter
+
+class PingServer(ThreadingHTTPServer):
+    """Servidor HTTP/1.1 local: registra a porta de origem de cada requisição e exige N simultâneas"""
+    daemon_threads = True
+
+    def __init__(self, parallel):
+        self.barrier = threading.Barrier(parallel, timeout=5)
+        self.client_ports = []
+        self.fail_next = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), PingHandler)
+
+class PingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.client_ports.append(self.client_address[1])
+            fail = server.fail_next > 0
+            server.fail_next -= 1
+        try:
+            server.barrier.wait()  # Só passa se as N requisições estiverem abertas ao mesmo tempo
+            status = 500 if fail else 200
+        except threading.BrokenBarrierError:
+            status = 503
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(parallel):
+        server = PingServer(parallel)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def make_collector(server, pool_size=4):
+    collector = BinanceSpotCollector('BTCUSDT', session=BaseCollector._create_session(pool_size))
+    collector.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    collector.rate_limiter = WeightRateLimiter(6000)
+    return collector
+
+def test_create_session_sizes_pool():
+    """Testa o adaptador com pool dimensionado para a coleta concorrente"""
+    session = BaseCollector._create_session(12)
+    assert session.get_adapter('https://fapi.binance.com')._pool_maxsize == 12
+    assert session.get_adapter('http://127.0.0.1')._pool_maxsize == 12
+
+def test_warm_up_opens_connections_in_parallel_and_reuses_them(server):
+    """Testa que o aquecimento abre N conexões simultâneas e que a coleta seguinte as reutiliza"""
+    ping_server = server(3)
+    collector = make_collector(ping_server)
+    assert collector.ping_endpoint == '/api/v3/ping'
+    assert collector.warm_up(3)
+    warmed = set(ping_server.client_ports)
+    assert len(warmed) == 3
+
+    # Três requisições simultâneas depois do aquecimento: nenhuma conexão nova
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        collector.session.get(f"{collector.base_url}/api/v3/ping", timeout=10).status_code)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert results == [200, 200, 200]
+    assert set(ping_server.client_ports) == warmed
+
+def test_warm_up_tolerates_failed_ping(server):
+    """Testa que um ping com erro só gera aviso: warm_up retorna False e a sessão continua utilizável"""
+    ping_server = server(2)
+    ping_server.fail_next = 1
+    collector = make_collector(ping_server)
+    assert collector.warm_up(2) is False
+    assert len(ping_server.client_ports) == 2
+
+    ping_server.barrier = threading.Barrier(1)
+    assert collector.session.get(f"{collector.base_url}/api/v3/ping", timeout=10).status_code == 200
+    assert BaseCollector('http://127.0.0.1:1').warm_up() is False  # Sem ping_endpoint: nada a aquecer